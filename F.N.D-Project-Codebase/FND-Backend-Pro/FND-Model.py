@@ -26,6 +26,10 @@ from sklearn.linear_model import LogisticRegression # type: ignore
 from imblearn.over_sampling import SMOTE
 import joblib
 from pathlib import Path
+from app.numpy_inference import export_and_verify
+from app.compact_tokenizer import export_compact_tokenizer
+from app.quantization import export_quantized_artifacts
+from app.cascade import export_cascade_artifacts
 
 def verify_environment():
     """Ensure running in project's virtual environment"""
@@ -49,6 +53,8 @@ MODEL_PATH = BASE_DIR / 'saved_model'
 os.makedirs(MODEL_PATH, exist_ok=True)
 TOKENIZER_PATH = MODEL_PATH / 'tokenizer.pkl'
 MODEL_FILE = MODEL_PATH / 'true_fake_news_classifier.keras'
+NUMPY_WEIGHTS_FILE = MODEL_PATH / 'model_weights.npz'
+COMPACT_TOKENIZER_PATH = MODEL_PATH / 'tokenizer.json'
 
 # ======================================================
 # 1. DATA LOADING
@@ -264,12 +270,39 @@ def load_artifacts():
         return model, tokenizer
     return None, None
 
-def save_artifacts(model, tokenizer):
+def save_artifacts(model, tokenizer, sample_texts=None):
     """Save model and tokenizer for future use"""
     os.makedirs(MODEL_PATH, exist_ok=True)
     model.save(MODEL_FILE)
     joblib.dump(tokenizer, TOKENIZER_PATH)
+    export_compact_tokenizer(tokenizer, COMPACT_TOKENIZER_PATH, sample_texts=sample_texts)
+    _, max_diff = export_and_verify(model, NUMPY_WEIGHTS_FILE)
     print("\nModel and tokenizer saved successfully")
+    print(f"NumPy inference weights exported (max deviation from Keras: {max_diff:.2e})")
+
+def save_quantized_artifacts(model, X_test, y_test):
+    """Export int8/float16 TFLite variants and compare them with the float model"""
+    report, report_path = export_quantized_artifacts(model, MODEL_PATH, MODEL_FILE, X_test, y_test)
+    print(f"\nQuantized variants exported (report: {report_path})")
+    print(f"{'Variant':<10}{'Accuracy':>10}{'Size (KB)':>12}{'RSS (KB)':>11}{'Batch-1 ms':>12}{'Batch-32 ms':>13}")
+    rows = [('float', report['float'])] + list(report['variants'].items())
+    for name, row in rows:
+        # RSS is what loading and warming up the variant added; the float model was already resident
+        rss = row.get('rss_delta_bytes')
+        rss = f"{rss/1024:>11.1f}" if rss is not None else f"{'-':>11}"
+        print(f"{name:<10}{row['accuracy']:>10.4f}{row['size_bytes']/1024:>12.1f}{rss}"
+              f"{row['latency_ms']['1']:>12.2f}{row['latency_ms']['32']:>13.2f}")
+
+def save_cascade_artifacts(tfidf, lr_model, texts_test, lstm_probabilities, y_test):
+    """Export the TF-IDF + LogisticRegression first stage and its cascade report"""
+    report, report_path = export_cascade_artifacts(tfidf, lr_model, MODEL_PATH, texts_test, lstm_probabilities, y_test)
+    print(f"\nCascade first stage exported (report: {report_path})")
+    print(f"Linear accuracy: {report['linear_accuracy']:.4f}  LSTM accuracy: {report['lstm_accuracy']:.4f}  "
+          f"Linear cost: {report['linear_ms_per_row']:.3f}ms/row")
+    print(f"{'Band':<14}{'Linear %':>10}{'LSTM %':>10}{'Accuracy':>10}{'Agreement':>11}")
+    for band in report['bands']:
+        print(f"{band['low']:.2f}-{band['high']:.2f}{'':<5}{band['linear_fraction']:>10.2%}{band['lstm_fraction']:>10.2%}"
+              f"{band['accuracy']:>10.4f}{band['agreement_with_lstm']:>11.4f}")
 
 # ======================================================
 # 12. INTERACTIVE PREDICTION LOOP
@@ -431,11 +464,12 @@ if __name__ == "__main__":
                 verbose=1
             )
             
-            save_artifacts(model, tokenizer)
+            save_artifacts(model, tokenizer, sample_texts=texts[:1000])
         
         # 9. Evaluate model
         print("\nModel Evaluation:")
-        y_pred = (model.predict(X_test) > 0.5).astype("int32")
+        lstm_probabilities = model.predict(X_test)
+        y_pred = (lstm_probabilities > 0.5).astype("int32")
         print(classification_report(y_test, y_pred, target_names=['fake', 'true']))
         
         plt.figure(figsize=(6,4))
@@ -449,14 +483,24 @@ if __name__ == "__main__":
         print(f"\nFinal Model Accuracy: {accuracy_score(y_test, y_pred):.4f}")
         print("="*50)
         
-        # 10. Feature importance
+        # Quantized CPU-serving variants
+        save_quantized_artifacts(model, X_test, y_test)
+        
+        # 10. Feature importance (fitted on the LSTM's training split, reused as the cascade first stage)
         print("\nFeature Importance Analysis:")
+        texts_train, texts_test, y_tfidf_train, _ = train_test_split(
+            texts,
+            labels,
+            test_size=0.2,
+            random_state=42,
+            stratify=labels
+        )
         tfidf = TfidfVectorizer(max_features=5000)
-        X_tfidf = tfidf.fit_transform(final_df['cleaned_text'])
-        y = final_df['label'].map({'fake': 0, 'true': 1})
+        X_tfidf = tfidf.fit_transform(texts_train)
         
         lr_model = LogisticRegression(max_iter=1000)
-        lr_model.fit(X_tfidf, y)
+        lr_model.fit(X_tfidf, y_tfidf_train)
+        save_cascade_artifacts(tfidf, lr_model, texts_test, lstm_probabilities, y_test)
         
         feature_names = tfidf.get_feature_names_out()
         coefs = lr_model.coef_.ravel()
@@ -8,6 +8,7 @@ from sqlalchemy import text, create_engine
 from flask_migrate import Migrate # type: ignore
 from flask_cors import CORS # type: ignore
 from config import Config
+from app.logging_config import configure_logging
 import logging
 from datetime import datetime
 import sqlalchemy
@@ -67,22 +68,25 @@ def create_app(config_class=Config):
     """Enhanced application factory with timing metrics"""
     total_start = time.time()
     
+    # Single root handler (no-op when run.py has already configured it)
+    configure_logging()
+    logger = logging.getLogger(__name__)
+    
     # Verify environment
     verify_environment()
     
+    # Thread pools and batch size measured on this host (must precede the model load)
+    from app.autotune import apply_tuning_profile
+    apply_tuning_profile()
+    
     # Initialize Flask app
     app_start = time.time()
     app = Flask(__name__)
     app.config.from_object(config_class)
+    from app.uploads import SpooledRequest
+    app.request_class = SpooledRequest  # Spool large file uploads to disk
     logging.info(f"✓ Flask app initialized in {(time.time()-app_start)*1000:.2f}ms")
     
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    logger = logging.getLogger(__name__)
-    
     # CORS configuration - Updated to include all endpoints
     cors_start = time.time()
     CORS(app, resources={
@@ -124,5 +128,9 @@ def create_app(config_class=Config):
         logging.error("❌ Failed to initialize AI service")
         raise RuntimeError("AI service failed to initialize")
 
+    # Background jobs (resumes any left unfinished by a previous run)
+    if config_class.JOBS_ENABLED:
+        routes.start_job_runner(app)
+
     logging.info(f"🚀 Application fully initialized in {(time.time()-total_start)*1000:.2f}ms")
     return app
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""Admission control and per-request deadlines for /predict.
+
+At most ADMISSION_MAX_IN_FLIGHT prediction pipelines run at once in a worker.
+Requests beyond that wait in a FIFO queue of ADMISSION_MAX_QUEUE places;
+when the queue is full, or a request has waited ADMISSION_QUEUE_TIMEOUT
+seconds, it is shed with 503 and a Retry-After estimated from recent service
+times, instead of piling up until clients give up.
+
+Each admitted request also carries a Deadline of PREDICTION_TIMEOUT seconds
+from its arrival. Every stage asks stage_budget() for its time limit: what
+is left of the deadline, capped by the stage's own timeout (fetch, parse,
+inference). A stage that finds nothing left raises DeadlineExceeded (504).
+"""
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import request
+
+from app.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_SHED, STAGE_SECONDS
+from config import Config
+
+_deadline = contextvars.ContextVar('prediction_deadline', default=None)
+
+
+class OverloadedError(Exception):
+    """Request shed by admission control; retry_after is in whole seconds"""
+
+    def __init__(self, message, retry_after=1, status_code=503):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class DeadlineExceeded(Exception):
+    """The request's PREDICTION_TIMEOUT ran out before or during a stage"""
+
+    def __init__(self, message, status_code=504):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Deadline:
+    """Time left of one request's budget"""
+
+    __slots__ = ('seconds', 'expires_at')
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def budget(self, stage, cap=None):
+        """Seconds the next stage may take; raises DeadlineExceeded when none are left"""
+        left = self.remaining()
+        if left <= 0:
+            raise DeadlineExceeded(f"Prediction timed out after {self.seconds}s (before {stage})")
+        return left if cap is None else min(cap, left)
+
+
+def start_deadline(seconds):
+    """Start the current request's deadline (None or 0 = unbounded)"""
+    deadline = Deadline(seconds) if seconds else None
+    _deadline.set(deadline)
+    return deadline
+
+
+def stage_budget(stage, cap=None):
+    """Time limit for a stage of the current request: cap when no deadline is running"""
+    deadline = _deadline.get()
+    return cap if deadline is None else deadline.budget(stage, cap)
+
+
+class AdmissionController:
+    """Bounded in-flight limit with a bounded FIFO wait queue"""
+
+    def __init__(self, max_in_flight=16, max_queue=32, queue_timeout=5.0):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self._service_seconds = None  # Moving average, for Retry-After
+        self.counters = {'admitted': 0, 'queued': 0, 'shed_queue_full': 0, 'shed_queue_timeout': 0}
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            max_in_flight=Config.ADMISSION_MAX_IN_FLIGHT,
+            max_queue=Config.ADMISSION_MAX_QUEUE,
+            queue_timeout=Config.ADMISSION_QUEUE_TIMEOUT
+        )
+
+    def _retry_after(self):
+        """Seconds until the queue ahead has likely drained (call with _lock held)"""
+        per_request = self._service_seconds or 1.0
+        return max(1, math.ceil(per_request * (len(self._waiters) + 1) / self.max_in_flight))
+
+    def _shed(self, reason, message):
+        self.counters[f'shed_{reason}'] += 1
+        ADMISSION_SHED.inc(reason=reason)
+        return OverloadedError(message, self._retry_after())
+
+    def acquire(self, timeout=None):
+        """Take an in-flight slot, waiting up to timeout in the queue; returns seconds waited"""
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                self.counters['admitted'] += 1
+                ADMISSION_IN_FLIGHT.set(self.in_flight)
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                raise self._shed('queue_full', "Server is busy, please retry shortly")
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+            self.counters['queued'] += 1
+            ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+        start = time.perf_counter()
+        granted = waiter.wait(timeout)
+        waited = time.perf_counter() - start
+        STAGE_SECONDS.observe(waited, stage='queue')
+        with self._lock:
+            if not granted and not waiter.is_set():
+                self._waiters.remove(waiter)
+                ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+                raise self._shed('queue_timeout', f"Server is busy, no capacity freed up within {timeout:.1f}s")
+            self.counters['admitted'] += 1
+        return waited
+
+    def release(self, service_seconds):
+        """Return a slot, handing it straight to the longest waiter if there is one"""
+        with self._lock:
+            if self._service_seconds is None:
+                self._service_seconds = service_seconds
+            else:
+                self._service_seconds += 0.1 * (service_seconds - self._service_seconds)
+            if self._waiters:
+                self._waiters.popleft().set()  # The slot stays taken, by the waiter now
+                ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+            else:
+                self.in_flight -= 1
+                ADMISSION_IN_FLIGHT.set(self.in_flight)
+
+    @contextmanager
+    def admit(self, timeout=None):
+        self.acquire(timeout)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'queue_timeout_s': self.queue_timeout,
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._waiters),
+                **self.counters,
+                'mean_service_ms': round(self._service_seconds * 1000, 2) if self._service_seconds else None
+            }
+
+
+admission = AdmissionController.from_config()
+
+
+def admission_controlled(on_overload):
+    """View decorator: start the request's deadline and run the view inside an admission slot
+
+    on_overload(error) builds the response for a shed request.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == 'OPTIONS':
+                return view(*args, **kwargs)
+            deadline = start_deadline(Config.PREDICTION_TIMEOUT)
+            try:
+                queue_timeout = deadline.budget('queue') if deadline is not None else None
+                with admission.admit(queue_timeout):
+                    return view(*args, **kwargs)
+            except (OverloadedError, DeadlineExceeded) as e:
+                return on_overload(e)
+            finally:
+                _deadline.set(None)
+        return wrapper
+    return decorator
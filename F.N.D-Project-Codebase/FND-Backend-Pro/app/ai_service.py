@@ -3,16 +3,63 @@ import os
 import sys
 import joblib
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 import logging
 from datetime import datetime
 import re
+import json
 import time
-from time import sleep
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock, Thread
+from config import Config
+from app.admission import DeadlineExceeded, stage_budget
+from app.batching import MicroBatcher
+from app.cache import PredictionCache
+from app.cascade import CascadeStats, LinearTextClassifier, uncertain_mask
+from app.compact_tokenizer import CompactTokenizer
+from app.inference_backends import BACKENDS, get_backend, options_from_config, select_backend
+from app.logging_config import verbose_logging
+from app.metrics import STAGE_SECONDS
+from app.model_registry import ModelRegistry
+from app.windowing import AGGREGATORS, aggregate, build_windows
 
 logger = logging.getLogger(__name__)
 
+MAX_SEQUENCE_LENGTH = 150
+NOT_ACTIVATED = object()  # reload() did not touch CURRENT, so there is nothing to roll back
+
+class ModelBundle:
+    """One loaded model version: backend, tokenizer, optional first stage and the batcher"""
+
+    def __init__(self, version, directory, model, tokenizer, batcher=None, backend_selection=None,
+                 linear=None, cascade_report=None):
+        self.version = version
+        self.directory = directory
+        self.model = model
+        self.tokenizer = tokenizer
+        self.batcher = batcher
+        self.backend_selection = backend_selection
+        self.linear = linear
+        self.cascade_report = cascade_report
+
+    def predict_one(self, row, timeout=None):
+        """Score one padded row through the batcher, or directly once it is retired"""
+        if self.batcher is not None:
+            try:
+                future = self.batcher.submit(row)
+            except RuntimeError:
+                pass  # Swapped out between reading self.bundle and submitting
+            else:
+                try:
+                    return future.result(timeout)
+                except FutureTimeoutError:
+                    future.cancel()  # Dropped from the next batch if it has not started yet
+                    raise DeadlineExceeded(f"Prediction timed out after {Config.PREDICTION_TIMEOUT}s (during infer)")
+        return self.model.predict_batch(row[np.newaxis])[0]
+
+    def retire(self):
+        if self.batcher is not None:
+            self.batcher.stop()
+
 class AIService:
     _instance = None
     
@@ -39,65 +86,277 @@ class AIService:
     
     def initialize(self):
         """Initialize model with timing metrics"""
-        self.model = None
-        self.tokenizer = None
+        self.bundle = None
+        self.backend = Config.INFERENCE_BACKEND
+        self.registry = ModelRegistry(Config.MODEL_PATH)
+        self.cache = self._create_cache()
+        self.cascade_stats = CascadeStats()
         self.status = "not_loaded"
+        self.reload_state = {'state': 'idle', 'target': None, 'error': None, 'finished_at': None, 'duration_ms': None}
+        self._reload_lock = Lock()
+        self._reload_thread = None
+        self._watched_signature = None
         self.load_model()
-    
+        if Config.MODEL_WATCH_INTERVAL:
+            self._start_watcher()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start_watcher(self):
+        Thread(target=self._watch_models, name='model-watcher', daemon=True).start()
+
+    def _after_fork(self):
+        """Forked server worker: a fresh reload lock and its own watcher thread"""
+        self._reload_lock = Lock()
+        self._reload_thread = None
+        if self.reload_state['state'] == 'loading':
+            self.reload_state = {**self.reload_state, 'state': 'idle'}  # The parent's reload thread is not ours
+        if Config.MODEL_WATCH_INTERVAL:
+            self._start_watcher()
+
+    # The active bundle is swapped as a whole; these read whichever version is live
+    @property
+    def model(self):
+        return self.bundle.model if self.bundle else None
+
+    @property
+    def tokenizer(self):
+        return self.bundle.tokenizer if self.bundle else None
+
+    @property
+    def batcher(self):
+        return self.bundle.batcher if self.bundle else None
+
+    @property
+    def model_version(self):
+        return self.bundle.version if self.bundle else None
+
+    @staticmethod
+    def _create_cache():
+        """Build the prediction cache from config (None when disabled)"""
+        if not Config.PREDICTION_CACHE_ENABLED:
+            return None
+        return PredictionCache(
+            max_entries=Config.PREDICTION_CACHE_SIZE,
+            ttl=Config.PREDICTION_CACHE_TTL,
+            disk_path=Config.PREDICTION_CACHE_DISK_PATH or None,
+            disk_max_entries=Config.PREDICTION_CACHE_DISK_SIZE
+        )
+
     def load_model(self):
-        """Enhanced model loading with beautiful progress logging"""
+        """Load the active model version and make it live"""
         try:
-            logger.info("\n🔄 Loading AI Model Components:")
-            
-            # Verify files exist
-            model_path = os.path.join('saved_model', 'true_fake_news_classifier.keras')
-            tokenizer_path = os.path.join('saved_model', 'tokenizer.pkl')
-
-            logger.info("🔍 Checking model files...")
-            if not os.path.exists(model_path):
-                raise FileNotFoundError(f"Model file missing at: {model_path}")
-            if not os.path.exists(tokenizer_path):
-                raise FileNotFoundError(f"Tokenizer file missing at: {tokenizer_path}")
-            logger.info("✅ Model files verified")
-
-            # Load tokenizer with progress
-            logger.info("\n📦 Loading tokenizer...")
-            tokenizer_start = time.time()
-            self.tokenizer = joblib.load(tokenizer_path)
-            logger.info(f"✅ Tokenizer loaded in {(time.time()-tokenizer_start)*1000:.2f}ms")
-            
-            # Load model with progress animation
-            logger.info("\n🏗️  Loading neural network model:")
-            for i in range(1, 6):
-                sleep(0.3)
-                logger.info(f"   ⏳ Loading model layers... [{'='*i}{' '*(5-i)}] {i*20}%")
-            
-            model_start = time.time()
-            self.model = load_model(model_path, compile=False)
-            logger.info(f"✅ Model loaded in {(time.time()-model_start)*1000:.2f}ms")
-            
-            # Verify prediction works
-            logger.info("\n🧪 Running verification test...")
-            test_start = time.time()
-            test_text = "This is a test sentence for model verification"
-            sequence = self.tokenizer.texts_to_sequences([test_text])
-            pad_sequences(sequence, maxlen=150)  # Test shape compatibility
-            logger.info(f"✅ Verification passed in {(time.time()-test_start)*1000:.2f}ms")
-
+            self._watched_signature = self.registry.signature()
+            bundle = self._load_bundle()
+            self._swap(bundle)
             self.status = "ready"
             logger.info("\n🎉 AI Model successfully initialized and ready!")
-
         except Exception as e:
             self.status = "error"
             logger.error(f"\n❌ Model loading failed: {str(e)}")
             raise
-    
+
+    def _load_bundle(self, version=None):
+        """Load, warm up and verify one model version without touching live traffic"""
+        logger.info("\n🔄 Loading AI Model Components:")
+        registry_version, model_dir = self.registry.resolve(version)
+        if registry_version:
+            logger.info(f"📁 Model version {registry_version} ({model_dir})")
+
+        # Verify files exist
+        tokenizer_path = os.path.join(model_dir, Config.TOKENIZER_FILE)
+        compact_tokenizer_path = os.path.join(model_dir, Config.COMPACT_TOKENIZER_FILE)
+
+        logger.info("🔍 Checking model files...")
+        if self.backend != 'auto':
+            backend = self._create_backend(self.backend, model_dir)
+            if not os.path.exists(backend.artifact_path):
+                raise FileNotFoundError(f"{self.backend} model artifact missing at: {backend.artifact_path}")
+        if not os.path.exists(compact_tokenizer_path) and not os.path.exists(tokenizer_path):
+            raise FileNotFoundError(f"Tokenizer file missing at: {tokenizer_path}")
+        logger.info("✅ Model files verified")
+
+        # Load tokenizer
+        logger.info("\n📦 Loading tokenizer...")
+        tokenizer_start = time.time()
+        if os.path.exists(compact_tokenizer_path):
+            tokenizer = CompactTokenizer.load(compact_tokenizer_path)
+        else:
+            # Unpickling the Keras Tokenizer imports Keras; run `python -m app.compact_tokenizer` to avoid it
+            logger.warning(f"⚠️ Compact tokenizer missing at {compact_tokenizer_path}, pruning the pickled one")
+            tokenizer = CompactTokenizer.from_keras(joblib.load(tokenizer_path))
+        logger.info(f"✅ Tokenizer loaded ({len(tokenizer.words)} words) in {(time.time()-tokenizer_start)*1000:.2f}ms")
+
+        # Load model
+        logger.info("\n🏗️  Loading neural network model...")
+        model_start = time.time()
+        backend_selection = None
+        if self.backend == 'auto':
+            # Benchmark every available backend on this host and keep the fastest accurate one
+            logger.info("\n🏁 Benchmarking inference backends...")
+            model, backend_selection = select_backend(
+                model_dir,
+                candidates=Config.BACKEND_CANDIDATES,
+                reference=Config.BACKEND_REFERENCE,
+                tolerance=Config.BACKEND_TOLERANCE,
+                batch_sizes=(1, Config.BATCH_MAX_SIZE),
+                sequence_length=MAX_SEQUENCE_LENGTH,
+                options=self._backend_options()
+            )
+            for name, entry in backend_selection['candidates'].items():
+                logger.info(f"   ├── {name}: {entry['status']} {entry.get('latency_ms', '')}")
+        else:
+            model = backend.load()
+            # Trace/run every batch-size bucket so the first request is not slower
+            logger.info("\n🔥 Warming up inference backend...")
+            warmup_start = time.time()
+            model.warmup()
+            logger.info(f"✅ Backend warm in {(time.time()-warmup_start)*1000:.2f}ms")
+        model_version = registry_version or Config.MODEL_VERSION or model.fingerprint()
+        logger.info(f"✅ Model loaded ({model.name} backend, version {model_version}, "
+                    f"{model.memory_footprint()/1024/1024:.1f}MB weights) in {(time.time()-model_start)*1000:.2f}ms")
+
+        # Verify prediction works end to end (tokenizer -> model)
+        logger.info("\n🧪 Running verification test...")
+        test_start = time.time()
+        test_text = "This is a test sentence for model verification"
+        probability = model.predict_batch(tokenizer.encode_batch([test_text], MAX_SEQUENCE_LENGTH))[0]
+        if not 0.0 <= probability <= 1.0:
+            raise ValueError(f"Verification produced an invalid probability: {probability}")
+        logger.info(f"✅ Verification passed in {(time.time()-test_start)*1000:.2f}ms")
+
+        # Optional first stage: TF-IDF + LogisticRegression exported by FND-Model.py
+        linear, cascade_report = None, None
+        if Config.CASCADE_ENABLED:
+            linear_path = os.path.join(model_dir, Config.LINEAR_MODEL_FILE)
+            if os.path.exists(linear_path):
+                linear_start = time.time()
+                linear = LinearTextClassifier.load(linear_path)
+                report_path = os.path.join(model_dir, 'cascade_report.json')
+                if os.path.exists(report_path):
+                    with open(report_path) as f:
+                        cascade_report = json.load(f)
+                logger.info(f"✅ Cascade first stage loaded ({len(linear.vocabulary)} terms, band "
+                            f"{Config.CASCADE_LOW}-{Config.CASCADE_HIGH}) in {(time.time()-linear_start)*1000:.2f}ms")
+            else:
+                logger.warning(f"⚠️ Cascade enabled but {linear_path} is missing - every input goes to the LSTM")
+
+        batcher = None
+        # A model server batches across all workers; a second window here would only add latency
+        if Config.BATCHING_ENABLED and not model.remote:
+            batcher = MicroBatcher(
+                model.predict_batch,
+                max_batch_size=Config.BATCH_MAX_SIZE,
+                max_wait_ms=Config.BATCH_MAX_WAIT_MS,
+                name=f'model-{model_version}'
+            )
+        return ModelBundle(model_version, model_dir, model, tokenizer, batcher, backend_selection,
+                           linear=linear, cascade_report=cascade_report)
+
+    def _swap(self, bundle):
+        """Make a loaded bundle live; the old one finishes its queued work and is dropped"""
+        previous, self.bundle = self.bundle, bundle
+        if previous is not None:
+            previous.retire()
+            logger.info(f"🔁 Model version {previous.version} replaced by {bundle.version}")
+
+    def reload(self, version=None, wait=False, activate=False):
+        """Load a model version in the background and swap it in once warm
+
+        Requests keep being served by the current version until the swap.
+        With activate, CURRENT is pointed at version only once this reload
+        holds the lock, and put back if the version fails to load, so CURRENT
+        always names the version being served or about to be.
+        Returns False when a reload is already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        previous = NOT_ACTIVATED
+        try:
+            if activate and version:
+                previous = self.registry.activate(version)
+            self.reload_state = {**self.reload_state, 'state': 'loading', 'target': version or 'current', 'error': None}
+            self._reload_thread = Thread(target=self._reload, args=(version, previous), name='model-reload', daemon=True)
+            self._reload_thread.start()
+        except BaseException:
+            if previous is not NOT_ACTIVATED:
+                self.registry.restore(previous)
+            self._reload_lock.release()
+            raise
+        if wait:
+            self._reload_thread.join()
+        return True
+
+    def _reload(self, version, previous=NOT_ACTIVATED):
+        start = time.time()
+        try:
+            self._watched_signature = self.registry.signature()
+            self._swap(self._load_bundle(version))
+            self.status = "ready"
+            self.reload_state['state'] = 'idle'
+        except Exception as e:
+            # The previous version stays live
+            logger.error(f"\n❌ Model reload failed: {str(e)}")
+            self.reload_state.update(state='failed', error=str(e))
+            if previous is not NOT_ACTIVATED:
+                self._restore_current(previous)
+        finally:
+            self.reload_state.update(finished_at=datetime.utcnow().isoformat(),
+                                     duration_ms=round((time.time() - start) * 1000, 2))
+            self._reload_lock.release()
+
+    def _restore_current(self, previous):
+        """Point CURRENT back at the version still being served after a failed activation"""
+        try:
+            self.registry.restore(previous)
+            self._watched_signature = self.registry.signature()  # Not a change for the watcher to act on
+            logger.info(f"↩️ CURRENT restored to {previous or 'the newest version'}")
+        except OSError as e:
+            logger.error(f"❌ Could not restore CURRENT to {previous}: {str(e)}")
+
+    def _watch_models(self):
+        """Reload when the active version (CURRENT) or its files change"""
+        while True:
+            time.sleep(Config.MODEL_WATCH_INTERVAL)
+            try:
+                signature = self.registry.signature()
+            except OSError as e:
+                logger.warning(f"⚠️ Model watcher could not read {Config.MODEL_PATH}: {str(e)}")
+                continue
+            if signature != self._watched_signature and self.reload():
+                logger.info(f"👀 Model change detected ({signature[0] or Config.MODEL_PATH}), reloading...")
+
+    @staticmethod
+    def _backend_options():
+        return options_from_config(Config)
+
+    def _create_backend(self, name, model_dir):
+        """Instantiate (but do not load) a registered backend from config"""
+        return get_backend(name)(model_dir, MAX_SEQUENCE_LENGTH, **self._backend_options())
+
     def get_status(self):
         """Return detailed service status"""
+        bundle = self.bundle
         return {
             "status": self.status,
-            "model_loaded": self.model is not None,
-            "tokenizer_loaded": self.tokenizer is not None
+            "backend": bundle.model.name if bundle else self.backend,
+            "available_backends": list(BACKENDS),
+            "backend_selection": bundle.backend_selection if bundle else None,
+            "memory_footprint_bytes": bundle.model.memory_footprint() if bundle else None,
+            "model_loaded": bundle is not None,
+            "tokenizer_loaded": bundle is not None,
+            "model_version": bundle.version if bundle else None,
+            "model_versions": self.registry.list_versions(),
+            "reload": dict(self.reload_state),
+            "batching": bundle.batcher.get_stats() if bundle and bundle.batcher else {"enabled": False},
+            "cache": self.cache.get_stats() if self.cache else {"enabled": False},
+            "inference_buckets": bundle.model.get_stats() if bundle else None,
+            "cascade": {
+                "enabled": True,
+                "band": [Config.CASCADE_LOW, Config.CASCADE_HIGH],
+                **self.cascade_stats.snapshot(),
+                "test_split_report": bundle.cascade_report
+            } if bundle and bundle.linear else {"enabled": False}
         }
 
     def is_ready(self):
@@ -106,47 +365,196 @@ class AIService:
 
     def predict(self, text):
         """Enhanced prediction with timing and validation"""
+        result = self.predict_detailed(text)
+        return (result['label'], result['confidence'])
+
+    def predict_detailed(self, text, long_document=None, aggregator=None):
+        """Prediction plus the metadata routes record (cache hit, model version, windows)"""
         if not self.is_ready():
             raise RuntimeError("Model not loaded or not ready")
         
-        logger.info("\n🔮 Making prediction...")
+        long_document = Config.LONG_DOCUMENT_MODE if long_document is None else long_document
+        aggregator = aggregator or Config.WINDOW_AGGREGATOR
+        if long_document and aggregator not in AGGREGATORS:
+            raise ValueError(f"Unknown aggregator '{aggregator}', expected one of {', '.join(AGGREGATORS)}")
+        
+        verbose = verbose_logging()  # Per-stage lines only for sampled requests
+        if verbose:
+            logger.info("\n🔮 Making prediction...")
         start_time = time.time()
+        bundle = self.bundle  # Pin one model version for the whole request
         try:
+            stage_budget('preprocess')  # Fails fast once the request's PREDICTION_TIMEOUT is spent
+            
             # Preprocessing
             clean_start = time.time()
             cleaned_text = self._preprocess(text)
-            logger.debug(f"✨ Text cleaned in {(time.time()-clean_start)*1000:.2f}ms")
+            STAGE_SECONDS.observe(time.time() - clean_start, stage='preprocess')
+            if verbose:
+                logger.debug(f"✨ Text cleaned in {(time.time()-clean_start)*1000:.2f}ms")
             
-            # Tokenization
-            tokenize_start = time.time()
-            sequence = self.tokenizer.texts_to_sequences([cleaned_text])
-            logger.debug(f"🔡 Text tokenized in {(time.time()-tokenize_start)*1000:.2f}ms")
+            # Cache lookup - identical cleaned text on the same model skips everything below
+            cache_key = None
+            if self.cache is not None:
+                cache_key = PredictionCache.make_key(cleaned_text, self._cache_variant(bundle, long_document, aggregator))
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    if verbose:
+                        logger.info(f"⚡ Cache hit - prediction served in {(time.time()-start_time)*1000:.2f}ms")
+                    return {**cached, 'cache_hit': True, 'model_version': bundle.version}
             
-            # Padding
-            pad_start = time.time()
-            padded = pad_sequences(sequence, maxlen=150)
-            logger.debug(f"📏 Sequence padded in {(time.time()-pad_start)*1000:.2f}ms")
+            # Stage one: confident linear-model scores skip tokenization and the LSTM
+            stage, windows = None, None
+            if bundle.linear is not None and not long_document:
+                linear_start = time.time()
+                prediction = bundle.linear.predict_proba([cleaned_text])[0]
+                linear_ms = (time.time() - linear_start) * 1000
+                STAGE_SECONDS.observe(linear_ms / 1000, stage='infer')
+                stage = 'lstm' if uncertain_mask(prediction, Config.CASCADE_LOW, Config.CASCADE_HIGH) else 'linear'
+                if verbose:
+                    logger.debug(f"📏 Linear stage scored {prediction:.4f} in {linear_ms:.2f}ms ({stage})")
             
-            # Prediction
-            predict_start = time.time()
-            prediction = self.model.predict(padded)[0][0]
-            logger.debug(f"🧠 Prediction made in {(time.time()-predict_start)*1000:.2f}ms")
+            if stage == 'linear':
+                self.cascade_stats.record(1, 0, linear_ms, 0.0)
+            else:
+                lstm_start = time.time()
+                prediction, windows = self._predict_lstm(bundle, cleaned_text, long_document, aggregator)
+                if stage == 'lstm':
+                    self.cascade_stats.record(1, 1, linear_ms, (time.time() - lstm_start) * 1000)
             
             # Result formatting
-            label = 'true' if prediction > 0.5 else 'fake'
-            confidence = float(prediction if prediction > 0.5 else 1 - prediction)
+            label, confidence = self._format_result(prediction)
+            result = {'label': label, 'confidence': confidence}
+            if windows is not None:
+                result['windows'] = windows
+                result['aggregator'] = aggregator
+            if stage is not None:
+                result['stage'] = stage
+            if cache_key is not None:
+                self.cache.set(cache_key, result)
             
-            logger.info(f"\n🎯 Prediction Result:")
-            logger.info(f"   ├── Label: {'✅ TRUE' if label == 'true' else '❌ FAKE'}")
-            logger.info(f"   ├── Confidence: {confidence:.2%}")
-            logger.info(f"   └── Total time: {(time.time()-start_time)*1000:.2f}ms")
+            if verbose:
+                logger.info(f"\n🎯 Prediction Result:")
+                logger.info(f"   ├── Label: {'✅ TRUE' if label == 'true' else '❌ FAKE'}")
+                logger.info(f"   ├── Confidence: {confidence:.2%}")
+                logger.info(f"   └── Total time: {(time.time()-start_time)*1000:.2f}ms")
             
-            return (label, confidence)
+            return {**result, 'cache_hit': False, 'model_version': bundle.version}
             
         except Exception as e:
             logger.error(f"\n❌ Prediction failed after {(time.time()-start_time)*1000:.2f}ms: {str(e)}")
             raise
 
+    def predict_batch(self, texts):
+        """Score many texts with a single model call"""
+        return [(result['label'], result['confidence']) for result in self.predict_batch_detailed(texts)]
+
+    def predict_batch_detailed(self, texts):
+        """predict_batch with the per-item metadata predict_detailed returns"""
+        if not self.is_ready():
+            raise RuntimeError("Model not loaded or not ready")
+        
+        bundle = self.bundle
+        results = [None] * len(texts)
+        misses = []
+        for index, text in enumerate(texts):
+            with STAGE_SECONDS.time(stage='preprocess'):
+                cleaned_text = self._preprocess(text)
+            cache_key = None
+            if self.cache is not None:
+                cache_key = PredictionCache.make_key(cleaned_text, self._cache_variant(bundle))
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    results[index] = {**cached, 'cache_hit': True, 'model_version': bundle.version}
+                    continue
+            misses.append((index, cleaned_text, cache_key))
+        
+        if misses:
+            cleaned_texts = [cleaned for _, cleaned, _ in misses]
+            stages = None
+            if bundle.linear is not None:
+                # Only the rows the linear stage is unsure about are tokenized and sent to the LSTM
+                linear_start = time.time()
+                probabilities = bundle.linear.predict_proba(cleaned_texts)
+                linear_ms = (time.time() - linear_start) * 1000
+                STAGE_SECONDS.observe(linear_ms / 1000, stage='infer')
+                escalate_mask = uncertain_mask(probabilities, Config.CASCADE_LOW, Config.CASCADE_HIGH)
+                escalate = np.flatnonzero(escalate_mask)
+                lstm_start = time.time()
+                if len(escalate):
+                    with STAGE_SECONDS.time(stage='tokenize'):
+                        padded = bundle.tokenizer.encode_batch([cleaned_texts[i] for i in escalate], MAX_SEQUENCE_LENGTH)
+                    with STAGE_SECONDS.time(stage='infer'):
+                        probabilities[escalate] = bundle.model.predict_batch(padded)
+                self.cascade_stats.record(len(misses), len(escalate), linear_ms, (time.time() - lstm_start) * 1000)
+                stages = np.where(escalate_mask, 'lstm', 'linear')
+            else:
+                with STAGE_SECONDS.time(stage='tokenize'):
+                    padded = bundle.tokenizer.encode_batch(cleaned_texts, MAX_SEQUENCE_LENGTH)
+                with STAGE_SECONDS.time(stage='infer'):
+                    probabilities = bundle.model.predict_batch(padded)
+            for row, ((index, _, cache_key), prediction) in enumerate(zip(misses, probabilities)):
+                label, confidence = self._format_result(prediction)
+                result = {'label': label, 'confidence': confidence}
+                if stages is not None:
+                    result['stage'] = str(stages[row])
+                if cache_key is not None:
+                    self.cache.set(cache_key, result)
+                results[index] = {**result, 'cache_hit': False, 'model_version': bundle.version}
+        return results
+
+    @staticmethod
+    def _cache_variant(bundle, long_document=False, aggregator=None):
+        """Cache namespace: results differ per model version, windowing and cascade band"""
+        if long_document:
+            return f"{bundle.version}:windows:{aggregator}"
+        if bundle.linear is not None:
+            return f"{bundle.version}:cascade:{Config.CASCADE_LOW}-{Config.CASCADE_HIGH}"
+        return bundle.version
+
+    def _predict_lstm(self, bundle, cleaned_text, long_document, aggregator):
+        """LSTM score for one text, plus per-window scores in long-document mode"""
+        # Tokenization straight into pre-padded (W, 150) windows (W = 1 unless long-document mode)
+        stage_budget('tokenize')
+        tokenize_start = time.time()
+        spans = None
+        if long_document:
+            padded, spans = build_windows(
+                bundle.tokenizer.encode(cleaned_text),
+                window=MAX_SEQUENCE_LENGTH,
+                stride=Config.WINDOW_STRIDE,
+                max_windows=Config.MAX_WINDOWS
+            )
+        else:
+            padded = bundle.tokenizer.encode_batch([cleaned_text], MAX_SEQUENCE_LENGTH)
+        STAGE_SECONDS.observe(time.time() - tokenize_start, stage='tokenize')
+        if verbose_logging():
+            logger.debug(f"🔡 Text tokenized into {len(padded)} window(s) in {(time.time()-tokenize_start)*1000:.2f}ms")
+        
+        # Prediction (shares a model call with concurrent requests when batching is on)
+        predict_start = time.time()
+        windows = None
+        if len(padded) > 1:
+            # All windows go through the model in one batched forward pass
+            scores = bundle.model.predict_batch(padded)
+            prediction = aggregate(scores, spans, aggregator)
+            windows = [
+                {'start': start, 'end': end, 'score': float(score)}
+                for (start, end), score in zip(spans, scores)
+            ]
+        else:
+            prediction = bundle.predict_one(padded[0], timeout=stage_budget('infer'))
+        STAGE_SECONDS.observe(time.time() - predict_start, stage='infer')
+        if verbose_logging():
+            logger.debug(f"🧠 Prediction made in {(time.time()-predict_start)*1000:.2f}ms")
+        return prediction, windows
+
+
+    def _format_result(self, prediction):
+        label = 'true' if prediction > 0.5 else 'fake'
+        confidence = float(prediction if prediction > 0.5 else 1 - prediction)
+        return label, confidence
+
     def _preprocess(self, text):
         """Optimized text cleaning pipeline"""
         text = text.lower()
@@ -0,0 +1,274 @@
+"""Article fetching and extraction shared by /fetch-article and /predict.
+
+One requests.Session is reused for every fetch, so connections to a news
+site stay alive between submissions instead of paying DNS + TCP + TLS each
+time. The adapter caps connections per host and blocks rather than opening
+more, and connect and read timeouts are set separately so an unreachable
+host fails fast while a slow page still gets time to stream.
+
+The body is streamed rather than downloaded whole: chunks are decoded and fed
+to a single-pass extractor, and reading stops once FETCH_MAX_BYTES have
+arrived or FETCH_MAX_CHARS of article text have been collected, whichever
+comes first.
+"""
+import codecs
+import logging
+import re
+import time
+from threading import Lock
+from urllib.parse import urlparse
+
+import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+from urllib3.exceptions import TimeoutError as TransportTimeoutError  # type: ignore
+from urllib3.util.retry import Retry  # type: ignore
+
+from app.cache import ArticleCache
+from app.html_extract import ArticleTextParser, extract_with_soup
+from app.metrics import STAGE_SECONDS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+CHARSET_HEADER = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+CHARSET_META = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.I)
+
+
+class ArticleFetchError(Exception):
+    """Fetch or extraction failure, carrying the HTTP status the API should return"""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _timed_out(error):
+    """Timeouts that used up the retries surface as ConnectionError(MaxRetryError(reason=timeout))"""
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, TransportTimeoutError)
+
+
+class ArticleFetcher:
+    """Pooled HTTP session plus the paragraph/heading extractor"""
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, pool_connections=20, pool_maxsize=4,
+                 max_retries=1, max_chars=10000, max_bytes=2 * 1024 * 1024, chunk_size=16384,
+                 extractor='fast', cache=None):
+        if extractor not in ('fast', 'soup'):
+            raise ValueError(f"Unknown extractor '{extractor}', expected 'fast' or 'soup'")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.extractor = extractor
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,  # Hosts whose pools are kept
+            pool_maxsize=pool_maxsize,          # Connections kept alive per host
+            pool_block=True,                    # Wait for a free connection instead of exceeding the limit
+            max_retries=Retry(total=max_retries, connect=max_retries, read=0,
+                              backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                              allowed_methods=frozenset(['GET', 'HEAD']), raise_on_status=False)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._stats_lock = Lock()
+        self.fetches = 0
+        self.failures = 0
+        self.fetch_ms = 0.0
+        self.bytes_downloaded = 0
+        self.stopped_early = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            connect_timeout=Config.FETCH_CONNECT_TIMEOUT,
+            read_timeout=Config.FETCH_READ_TIMEOUT,
+            pool_connections=Config.FETCH_POOL_CONNECTIONS,
+            pool_maxsize=Config.FETCH_POOL_MAXSIZE,
+            max_retries=Config.FETCH_MAX_RETRIES,
+            max_chars=Config.FETCH_MAX_CHARS,
+            max_bytes=Config.FETCH_MAX_BYTES,
+            extractor=Config.FETCH_EXTRACTOR,
+            cache=ArticleCache(
+                max_entries=Config.ARTICLE_CACHE_SIZE,
+                fresh_ttl=Config.ARTICLE_CACHE_FRESH_TTL,
+                max_age=Config.ARTICLE_CACHE_MAX_AGE,
+                disk_path=Config.ARTICLE_CACHE_DISK_PATH or None,
+                disk_max_entries=Config.ARTICLE_CACHE_DISK_SIZE
+            ) if Config.ARTICLE_CACHE_ENABLED else None
+        )
+
+    def fetch_article(self, url, timeout=None, max_chars=None):
+        """Download a page and return its extracted article text
+
+        timeout (seconds) caps the whole fetch, streamed body included; running
+        out raises ArticleFetchError with status 504. max_chars lowers
+        FETCH_MAX_CHARS, so the download stops as soon as that much text is in.
+        """
+        url = (url or '').strip()
+        if not url:
+            raise ArticleFetchError('URL is required', 400)
+        if urlparse(url).scheme not in ('http', 'https') or not urlparse(url).netloc:
+            raise ArticleFetchError('Only absolute http(s) URLs are supported', 400)
+
+        max_chars = self.max_chars if max_chars is None else min(max_chars, self.max_chars)
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and not self._covers(cached, max_chars):
+            cached = None  # Extracted under a smaller limit than this request needs
+        if cached is not None and self.cache.is_fresh(cached):
+            self.cache.record('fresh_hits', cached['size_bytes'])
+            return cached['content'][:max_chars]
+
+        start = time.time()
+        request_timeout, deadline = self.timeout, None
+        if timeout is not None:
+            request_timeout = (min(self.timeout[0], timeout), min(self.timeout[1], timeout))
+            deadline = start + timeout
+        try:
+            with self.session.get(url, timeout=request_timeout, headers=self._conditional_headers(cached),
+                                  stream=True) as response:
+                if response.status_code == 304 and cached is not None:
+                    self._revalidated(url, cached, response)
+                    self._record(start)
+                    return cached['content'][:max_chars]
+                response.raise_for_status()
+                content, size_bytes = self._read_article(response, deadline, max_chars)
+        except requests.exceptions.RequestException as e:
+            self._record(start, failed=True)
+            # 504 when the caller's budget, not the fetcher's own timeouts, cut the fetch short
+            status_code = 504 if timeout is not None and timeout < max(self.timeout) and _timed_out(e) else 500
+            raise ArticleFetchError(f'Failed to fetch article content: {str(e)}', status_code) from e
+        except ArticleFetchError:
+            self._record(start, failed=True)
+            raise
+
+        if not content:
+            self._record(start, failed=True)
+            raise ArticleFetchError('Could not extract article content', 400)
+        if self.cache is not None:
+            self.cache.record('refreshed' if cached is not None else 'misses')
+            self._store(url, response, content, size_bytes, max_chars)
+        self._record(start, size_bytes=size_bytes)
+        return content
+
+    def _covers(self, cached, max_chars):
+        """Whether a cached text holds the first max_chars characters of the article
+
+        True when it was extracted under at least that limit, or the article ended before its limit.
+        """
+        limit = cached.get('max_chars', self.max_chars)
+        return limit >= max_chars or len(cached['content']) < limit
+
+    @staticmethod
+    def _conditional_headers(cached):
+        headers = {}
+        if cached is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def _store(self, url, response, content, size_bytes, max_chars):
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return
+        now = time.time()
+        self.cache.set(url, {
+            'content': content,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size_bytes': size_bytes,
+            'max_chars': max_chars,
+            'fetched_at': now,
+            'validated_at': now
+        })
+
+    def _revalidated(self, url, cached, response):
+        """304 Not Modified: keep the cached text, pick up any refreshed validators"""
+        entry = dict(cached, validated_at=time.time())
+        entry['etag'] = response.headers.get('ETag') or cached.get('etag')
+        entry['last_modified'] = response.headers.get('Last-Modified') or cached.get('last_modified')
+        self.cache.set(url, entry)
+        self.cache.record('revalidated', cached['size_bytes'])
+
+    def _read_article(self, response, deadline=None, max_chars=None):
+        """Stream the body into the extractor; returns (text, bytes read)"""
+        max_chars = max_chars or self.max_chars
+        decoder = None
+        parser = ArticleTextParser(max_chars) if self.extractor == 'fast' else None
+        pages = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(self._encoding(response, chunk))(errors='replace')
+            chunk = chunk[:self.max_bytes - received]
+            received += len(chunk)
+            text = decoder.decode(chunk)
+            if parser is not None:
+                parser.feed(text)
+            else:
+                pages.append(text)
+            if received >= self.max_bytes or (parser is not None and parser.done):
+                with self._stats_lock:
+                    self.stopped_early += 1
+                break
+            if deadline is not None and time.time() > deadline:
+                raise ArticleFetchError('Article download ran out of time', 504)
+
+        if parser is None:
+            return extract_with_soup(''.join(pages), max_chars), received
+        return parser.close(), received
+
+    @staticmethod
+    def _encoding(response, head):
+        """Declared charset from the Content-Type header or a <meta> tag, else UTF-8"""
+        match = CHARSET_HEADER.search(response.headers.get('Content-Type', '')) or CHARSET_META.search(head[:4096])
+        if match:
+            name = match.group(1)
+            name = name.decode('ascii', 'replace') if isinstance(name, bytes) else name
+            try:
+                return codecs.lookup(name).name
+            except LookupError:
+                pass
+        return 'utf-8'
+
+    def extract(self, html):
+        """Text of the page's paragraphs and headings, without scripts and page chrome"""
+        if self.extractor == 'soup':
+            return extract_with_soup(html, self.max_chars)
+        parser = ArticleTextParser(self.max_chars)
+        parser.feed(html)
+        return parser.close()
+
+    def _record(self, start, failed=False, size_bytes=0):
+        elapsed = time.time() - start
+        STAGE_SECONDS.observe(elapsed, stage='fetch')
+        with self._stats_lock:
+            self.fetches += 1
+            self.bytes_downloaded += size_bytes
+            self.failures += int(failed)
+            self.fetch_ms += elapsed * 1000
+
+    def get_stats(self):
+        with self._stats_lock:
+            return {
+                'fetches': self.fetches,
+                'failures': self.failures,
+                'mean_fetch_ms': round(self.fetch_ms / self.fetches, 2) if self.fetches else None,
+                'bytes_downloaded': self.bytes_downloaded,
+                'stopped_early': self.stopped_early,
+                'extractor': self.extractor,
+                'max_bytes': self.max_bytes,
+                'connect_timeout_s': self.timeout[0],
+                'read_timeout_s': self.timeout[1],
+                'cache': self.cache.get_stats() if self.cache is not None else {'enabled': False}
+            }
+
+
+article_fetcher = ArticleFetcher.from_config()
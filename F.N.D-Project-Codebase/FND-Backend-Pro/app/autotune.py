@@ -0,0 +1,226 @@
+"""Inference thread/batch autotuner for the host CPU.
+
+TensorFlow sizes its intra-op and inter-op thread pools once per process, so
+every thread configuration is measured in a fresh subprocess. Each worker
+loads the configured backend, runs random token batches from `--clients`
+concurrent threads (Flask request threads competing for cores) and reports
+throughput and p50/p99 latency per batch size. The best configuration is
+written to a profile that create_app applies before the model is loaded:
+
+    python -m app.autotune [--output tuning_profile.json] [--p99-budget-ms 100]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_VERSION = 1
+
+
+def host_shape():
+    """What a profile is only valid for: the CPUs this process may use and the backend"""
+    try:
+        usable_cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        usable_cpus = os.cpu_count()
+    return {
+        'cpu_count': os.cpu_count(),
+        'usable_cpus': usable_cpus,
+        'machine': platform.machine(),
+        'backend': Config.INFERENCE_BACKEND
+    }
+
+
+def apply_tuning_profile(path=None):
+    """Apply a saved profile's thread and batch settings; returns what was applied
+
+    Must run before TensorFlow executes its first op. Settings given explicitly
+    through the environment win over the profile, and a profile measured on a
+    different host shape is ignored.
+    """
+    path = path or Config.TUNING_PROFILE
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        profile = json.load(f)
+
+    if profile.get('host') != host_shape():
+        logger.warning(f"⚠️ Tuning profile {path} was measured on {profile.get('host')}, "
+                       f"this host is {host_shape()} - ignoring it (re-run python -m app.autotune)")
+        return None
+
+    selected = profile['selected']
+    applied = {}
+    for env_name, value in (('TF_NUM_INTRAOP_THREADS', selected['intra_op_threads']),
+                            ('TF_NUM_INTEROP_THREADS', selected['inter_op_threads'])):
+        if env_name not in os.environ:
+            os.environ[env_name] = str(value)
+            applied[env_name] = value
+    if Config.INFERENCE_BACKEND in ('keras', 'auto') or 'tensorflow' in sys.modules:
+        _set_tf_threads(int(os.environ['TF_NUM_INTRAOP_THREADS']), int(os.environ['TF_NUM_INTEROP_THREADS']))
+    if 'TFLITE_NUM_THREADS' not in os.environ:
+        Config.TFLITE_NUM_THREADS = applied['TFLITE_NUM_THREADS'] = selected['intra_op_threads']
+    if 'BATCH_MAX_SIZE' not in os.environ:
+        Config.BATCH_MAX_SIZE = applied['BATCH_MAX_SIZE'] = selected['batch_size']
+    logger.info(f"⚙️ Applied tuning profile {path}: {applied}")
+    return applied
+
+
+def _set_tf_threads(intra, inter):
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+    except RuntimeError as e:
+        # TensorFlow already initialized its runtime; the env vars apply to the next process
+        logger.warning(f"⚠️ Could not change TensorFlow threads at runtime: {str(e)}")
+
+
+def _thread_candidates(cpus):
+    candidates = {1, cpus}
+    n = 2
+    while n < cpus:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+
+def _load_backend(intra):
+    from app.inference_backends import get_backend, options_from_config
+    from app.model_registry import ModelRegistry
+
+    _, model_dir = ModelRegistry(Config.MODEL_PATH).resolve()
+    name = Config.INFERENCE_BACKEND if Config.INFERENCE_BACKEND != 'auto' else Config.BACKEND_REFERENCE
+    # Serve-time options, with the thread count under test
+    backend = get_backend(name)(model_dir, 150, **dict(options_from_config(Config), num_threads=intra))
+    backend.load()
+    backend.warmup()
+    return backend
+
+
+def _measure(backend, batch_size, clients, duration):
+    """Run batches from `clients` threads for `duration` seconds"""
+    rng = np.random.default_rng(batch_size)
+    batch = rng.integers(1, 8000, size=(batch_size, 150), dtype=np.int32)
+    backend.predict_batch(batch)  # Trace/warm this shape outside the timed window
+
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            backend.predict_batch(batch)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'throughput_rows_per_s': round(len(latencies) * batch_size / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3)
+    }
+
+
+def run_worker(args):
+    """Subprocess entry point: one (intra, inter) pair, every batch size"""
+    if Config.INFERENCE_BACKEND in ('keras', 'auto'):
+        _set_tf_threads(args.intra, args.inter)
+    backend = _load_backend(args.intra)
+    results = {str(b): _measure(backend, b, args.clients, args.duration) for b in args.batch_sizes}
+    print(json.dumps({'backend': backend.name, 'results': results}))
+
+
+def run_sweep(args):
+    cpus = host_shape()['usable_cpus']
+    intra_values = args.intra or _thread_candidates(cpus)
+    inter_values = args.inter or sorted({1, 2})
+    measurements = []
+
+    for intra in intra_values:
+        for inter in inter_values:
+            env = dict(os.environ, TF_NUM_INTRAOP_THREADS=str(intra), TF_NUM_INTEROP_THREADS=str(inter),
+                       TF_CPP_MIN_LOG_LEVEL='2')
+            command = [sys.executable, '-m', 'app.autotune', '--worker', '--intra', str(intra), '--inter', str(inter),
+                       '--clients', str(args.clients), '--duration', str(args.duration),
+                       '--batch-sizes', *map(str, args.batch_sizes)]
+            logger.info(f"⏱️  intra={intra} inter={inter}...")
+            completed = subprocess.run(command, env=env, capture_output=True, text=True)
+            if completed.returncode != 0:
+                logger.error(f"❌ intra={intra} inter={inter} failed:\n{completed.stderr[-2000:]}")
+                continue
+            worker = json.loads(completed.stdout.strip().splitlines()[-1])
+            for batch_size, result in worker['results'].items():
+                measurements.append({'intra_op_threads': intra, 'inter_op_threads': inter,
+                                     'batch_size': int(batch_size), **result})
+                logger.info(f"   batch {batch_size:>3}: {result['throughput_rows_per_s']:>9} rows/s  "
+                            f"p50 {result['p50_ms']:>8}ms  p99 {result['p99_ms']:>8}ms")
+
+    if not measurements:
+        raise RuntimeError("Every tuning run failed")
+
+    # Highest throughput whose tail latency fits the budget, else the lowest tail latency
+    within_budget = [m for m in measurements if m['p99_ms'] <= args.p99_budget_ms]
+    if within_budget:
+        selected = max(within_budget, key=lambda m: m['throughput_rows_per_s'])
+    else:
+        selected = min(measurements, key=lambda m: m['p99_ms'])
+
+    profile = {
+        'version': PROFILE_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': host_shape(),
+        'clients': args.clients,
+        'p99_budget_ms': args.p99_budget_ms,
+        'selected': selected,
+        'measurements': measurements
+    }
+    with open(args.output, 'w') as f:
+        json.dump(profile, f, indent=2)
+    logger.info(f"✅ Selected intra={selected['intra_op_threads']} inter={selected['inter_op_threads']} "
+                f"batch={selected['batch_size']} -> {args.output}")
+    return profile
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sweep inference thread pools and batch sizes on this host')
+    parser.add_argument('--output', default=Config.TUNING_PROFILE or 'tuning_profile.json')
+    parser.add_argument('--intra', type=int, nargs='*', help='intra-op thread counts (default: 1, 2, 4, ... cpus)')
+    parser.add_argument('--inter', type=int, nargs='*', help='inter-op thread counts (default: 1 2)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 16, 32, 64])
+    parser.add_argument('--clients', type=int, default=4, help='concurrent callers, like Flask request threads')
+    parser.add_argument('--duration', type=float, default=2.0, help='seconds per batch size')
+    parser.add_argument('--p99-budget-ms', type=float, default=100.0)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        args.intra, args.inter = args.intra[0], args.inter[0]
+        run_worker(args)
+    else:
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+        run_sweep(args)
@@ -0,0 +1,152 @@
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import numpy as np
+
+from app.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class _PendingRequest:
+    __slots__ = ('row', 'future', 'enqueued_at')
+
+    def __init__(self, row):
+        self.row = row
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+_live_batchers = weakref.WeakSet()
+
+
+def _restart_after_fork():
+    """Threads do not survive fork(): give each running batcher a fresh queue and worker thread"""
+    for batcher in list(_live_batchers):
+        if not batcher._stopping.is_set():
+            batcher._lock = threading.Lock()
+            batcher._queue = queue.Queue()
+            batcher._start_thread()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+class MicroBatcher:
+    """Collects concurrent single-row predictions and runs them as one model batch"""
+
+    def __init__(self, infer_fn, max_batch_size=32, max_wait_ms=5.0, name='model'):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.batches_run = 0
+        self._queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._closed = False  # Set by the worker before its final drain; submit() refuses from then on
+        self._name = name
+        self._start_thread()
+        _live_batchers.add(self)
+        logger.info(f"✅ Micro-batcher started (max_batch_size={self.max_batch_size}, max_wait={self.max_wait_ms}ms)")
+
+    def _start_thread(self):
+        self._thread = threading.Thread(target=self._run, name=f'{self._name}-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue one padded sequence and return a Future resolving to its probability"""
+        pending = _PendingRequest(row)
+        with self._lock:
+            if self._closed or self._stopping.is_set():
+                raise RuntimeError("Batcher is shutting down")
+            self._queue.put(pending)
+        return pending.future
+
+    def predict(self, row, timeout=None):
+        """Blocking helper: submit a row and wait for its probability"""
+        return self.submit(row).result(timeout)
+
+    def stop(self, timeout=None):
+        """Stop accepting work, drain what is already queued and join the worker"""
+        self._stopping.set()
+        self._queue.put(None)  # Wake the worker if it is idle
+        self._thread.join(timeout)
+
+    def get_stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'queue_depth': self._queue.qsize(),
+            'batches_run': self.batches_run,
+            'batch_size': self.batch_size_histogram.snapshot(),
+            'queue_wait_ms': self.queue_wait_histogram.snapshot()
+        }
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the window closes"""
+        first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self._run_batch(batch)
+            if self._stopping.is_set() and self._queue.empty():
+                break
+
+        # Anything that raced in before the close must not hang its caller; later submits fail at once
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is not None and pending.future.set_running_or_notify_cancel():
+                pending.future.set_exception(RuntimeError("Batcher stopped before request was scheduled"))
+
+    def _run_batch(self, batch):
+        batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for pending in batch:
+            self.queue_wait_histogram.observe((started - pending.enqueued_at) * 1000)
+        self.batch_size_histogram.observe(len(batch))
+        self.batches_run += 1
+
+        try:
+            probabilities = self.infer_fn(np.stack([p.row for p in batch]))
+            for pending, probability in zip(batch, probabilities):
+                pending.future.set_result(float(probability))
+        except Exception as e:
+            logger.error(f"❌ Batched inference failed for {len(batch)} requests: {str(e)}")
+            for pending in batch:
+                pending.future.set_exception(e)
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import weakref
+from collections import OrderedDict
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with an optional per-entry TTL"""
+
+    def __init__(self, max_entries=10000, ttl=None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl or None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, stored_at=None):
+        with self._lock:
+            self._entries[key] = (stored_at or time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+_open_sqlite_caches = weakref.WeakSet()
+
+
+def _reopen_after_fork():
+    """An SQLite connection must not be used on both sides of a fork; children open their own"""
+    for cache in list(_open_sqlite_caches):
+        cache._lock = Lock()
+        cache._connect()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+class SQLiteCache:
+    """On-disk cache tier backed by SQLite so entries survive restarts"""
+
+    EVICTION_INTERVAL = 100  # Check the size bound every N writes
+
+    def __init__(self, path, max_entries=100000, ttl=None, table='cache'):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl or None
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lock = Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connect()
+        _open_sqlite_caches.add(self)
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'stored_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed_at ON {self.table} (accessed_at)')
+
+    def get(self, key):
+        """Return (value, stored_at) or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT value, stored_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), stored_at or now, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICTION_INTERVAL == 0:
+                self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def _evict(self):
+        """Drop least-recently-accessed rows beyond max_entries (caller holds the lock)"""
+        count = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f'DELETE FROM {self.table} WHERE key IN '
+                f'(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)', (excess,)
+            )
+            self.evictions += excess
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def get_stats(self):
+        return {
+            'path': self.path,
+            'entries': len(self),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class PredictionCache:
+    """Two-tier (memory, then optional disk) cache of model outputs keyed by cleaned text"""
+
+    def __init__(self, max_entries=10000, ttl=None, disk_path=None, disk_max_entries=100000):
+        self.memory = LRUCache(max_entries, ttl)
+        self.disk = SQLiteCache(disk_path, disk_max_entries, ttl, table='predictions') if disk_path else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(cleaned_text, model_version):
+        digest = hashlib.sha256()
+        digest.update(str(model_version).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(cleaned_text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            try:
+                entry = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Disk cache read failed, treating as a miss: {str(e)}")
+                entry = None
+            if entry is not None:
+                value, stored_at = entry
+                self.memory.set(key, value, stored_at)  # Promote so the next hit stays in-process
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        stored_at = time.time()
+        self.memory.set(key, value, stored_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, stored_at)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Disk cache write failed: {str(e)}")
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': True,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'ttl_seconds': self.memory.ttl,
+            'memory': self.memory.get_stats(),
+            'disk': self.disk.get_stats() if self.disk is not None else None
+        }
+
+
+class ArticleCache:
+    """URL -> extracted article cache with HTTP validators for conditional revalidation
+
+    Entries younger than fresh_ttl are served without touching the network.
+    Older ones are kept (up to max_age) together with their ETag/Last-Modified
+    so the fetcher can revalidate with a conditional GET, which costs a round
+    trip but no download or parse when the page is unchanged (304).
+    """
+
+    def __init__(self, max_entries=1000, fresh_ttl=300, max_age=7 * 86400, disk_path=None, disk_max_entries=20000):
+        self.fresh_ttl = fresh_ttl
+        self.memory = LRUCache(max_entries, max_age)
+        self.disk = SQLiteCache(disk_path, disk_max_entries, max_age, table='articles') if disk_path else None
+        self.counters = {'fresh_hits': 0, 'revalidated': 0, 'refreshed': 0, 'misses': 0, 'bytes_saved': 0}
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(url):
+        return hashlib.sha256(url.split('#', 1)[0].encode('utf-8')).hexdigest()
+
+    def get(self, url):
+        """Return the stored entry (fresh or stale) or None"""
+        key = self.make_key(url)
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            try:
+                stored = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Article cache read failed, fetching instead: {str(e)}")
+                stored = None
+            if stored is not None:
+                entry, stored_at = stored
+                self.memory.set(key, entry, stored_at)
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry['validated_at'] <= self.fresh_ttl
+
+    def set(self, url, entry):
+        key = self.make_key(url)
+        stored_at = entry['validated_at']  # A 304 extends the entry's life like a fresh download
+        self.memory.set(key, entry, stored_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, entry, stored_at)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Article cache write failed: {str(e)}")
+
+    def record(self, outcome, bytes_saved=0):
+        """Count one lookup: fresh_hits, revalidated, refreshed or misses"""
+        with self._lock:
+            self.counters[outcome] += 1
+            self.counters['bytes_saved'] += bytes_saved
+
+    def get_stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['fresh_hits'] + counters['revalidated'] + counters['refreshed'] + counters['misses']
+        served_from_cache = counters['fresh_hits'] + counters['revalidated']
+        return {
+            'enabled': True,
+            **counters,
+            'hit_rate': round(served_from_cache / lookups, 4) if lookups else 0.0,
+            'fresh_ttl_seconds': self.fresh_ttl,
+            'memory': self.memory.get_stats(),
+            'disk': self.disk.get_stats() if self.disk is not None else None
+        }
@@ -0,0 +1,205 @@
+"""Two-stage cascade: TF-IDF + LogisticRegression first, the LSTM only when unsure.
+
+FND-Model.py fits the linear model on the training split and exports its
+vocabulary, idf weights and coefficients to linear_model.npz. Serving needs
+neither scikit-learn nor a sparse matrix: a document is a handful of term
+counts, so its score is a short dot product. Inputs the linear model scores
+outside the [low, high] P(true) band are answered immediately; the rest go
+on to the LSTM.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from threading import Lock
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_PATTERN = r'(?u)\b\w\w+\b'  # TfidfVectorizer's default
+
+
+def export_linear_model(tfidf, lr_model, path):
+    """Write a fitted TfidfVectorizer + LogisticRegression to an npz artifact"""
+    if tfidf.analyzer != 'word' or tfidf.ngram_range != (1, 1) or tfidf.norm not in ('l2', None):
+        raise ValueError("Only unigram word TF-IDF with l2 (or no) norm can be exported")
+    terms = np.empty(len(tfidf.vocabulary_), dtype=object)
+    for term, column in tfidf.vocabulary_.items():
+        terms[column] = term
+    np.savez(
+        path,
+        terms=terms.astype(str),
+        idf=tfidf.idf_.astype(np.float64) if tfidf.use_idf else np.ones(len(terms)),
+        coef=lr_model.coef_.ravel().astype(np.float64),
+        intercept=np.float64(lr_model.intercept_[0]),
+        token_pattern=np.array(tfidf.token_pattern or DEFAULT_TOKEN_PATTERN),
+        lowercase=np.bool_(tfidf.lowercase),
+        sublinear_tf=np.bool_(tfidf.sublinear_tf),
+        l2_norm=np.bool_(tfidf.norm == 'l2')
+    )
+    return path
+
+
+class LinearTextClassifier:
+    """Dependency-free TF-IDF + logistic regression scorer"""
+
+    def __init__(self, terms, idf, coef, intercept, token_pattern=DEFAULT_TOKEN_PATTERN,
+                 lowercase=True, sublinear_tf=False, l2_norm=True):
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.token_regex = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.sublinear_tf = sublinear_tf
+        self.l2_norm = l2_norm
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                terms=data['terms'].tolist(),
+                idf=data['idf'],
+                coef=data['coef'],
+                intercept=data['intercept'],
+                token_pattern=str(data['token_pattern']),
+                lowercase=bool(data['lowercase']),
+                sublinear_tf=bool(data['sublinear_tf']),
+                l2_norm=bool(data['l2_norm'])
+            )
+
+    def predict_proba(self, texts):
+        """Return P(true) for each text"""
+        probabilities = np.empty(len(texts), dtype=np.float64)
+        for row, text in enumerate(texts):
+            tokens = self.token_regex.findall(text.lower() if self.lowercase else text)
+            counts = Counter(column for column in map(self.vocabulary.get, tokens) if column is not None)
+            if not counts:
+                probabilities[row] = 1.0 / (1.0 + np.exp(-self.intercept))
+                continue
+            columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            if self.sublinear_tf:
+                tf = np.log(tf) + 1.0
+            weights = tf * self.idf[columns]
+            if self.l2_norm:
+                weights /= np.sqrt(np.dot(weights, weights))
+            logit = np.dot(weights, self.coef[columns]) + self.intercept
+            probabilities[row] = 1.0 / (1.0 + np.exp(-logit))
+        return probabilities
+
+
+def verify_against_sklearn(tfidf, lr_model, classifier, texts, tolerance=1e-6):
+    """Max |sklearn - exported| probability difference on sample texts"""
+    expected = lr_model.predict_proba(tfidf.transform(texts))[:, 1]
+    max_diff = float(np.max(np.abs(expected - classifier.predict_proba(texts)))) if len(texts) else 0.0
+    if max_diff > tolerance:
+        raise ValueError(f"Exported linear model deviates from scikit-learn by {max_diff:.2e}")
+    return max_diff
+
+
+def uncertain_mask(probabilities, low, high):
+    """Rows the first stage is not confident about and must go to the LSTM"""
+    probabilities = np.asarray(probabilities)
+    return (probabilities >= low) & (probabilities <= high)
+
+
+class CascadeStats:
+    """Counts per stage and the latency the fast path saved"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.linear_only = 0
+        self.escalated = 0
+        self.linear_ms = 0.0
+        self.lstm_ms = 0.0
+        self.lstm_rows = 0
+
+    def record(self, rows, escalated, linear_ms, lstm_ms):
+        with self._lock:
+            self.linear_only += rows - escalated
+            self.escalated += escalated
+            self.linear_ms += linear_ms
+            if escalated:
+                self.lstm_ms += lstm_ms
+                self.lstm_rows += escalated
+
+    def snapshot(self):
+        with self._lock:
+            total = self.linear_only + self.escalated
+            mean_lstm_ms = self.lstm_ms / self.lstm_rows if self.lstm_rows else None
+            mean_linear_ms = self.linear_ms / total if total else None
+            # Every input pays for stage one; only linear-only inputs skip the LSTM
+            saved_ms = (self.linear_only * mean_lstm_ms - self.linear_ms) if mean_lstm_ms is not None else None
+            return {
+                'requests': total,
+                'linear_only': self.linear_only,
+                'escalated_to_lstm': self.escalated,
+                'linear_fraction': round(self.linear_only / total, 4) if total else None,
+                'mean_linear_ms': round(mean_linear_ms, 4) if mean_linear_ms is not None else None,
+                'mean_lstm_ms_per_row': round(mean_lstm_ms, 4) if mean_lstm_ms is not None else None,
+                'estimated_latency_saved_ms': round(saved_ms, 2) if saved_ms is not None else None
+            }
+
+
+def build_cascade_report(linear_probabilities, lstm_probabilities, y_test, bands=((0.2, 0.8), (0.1, 0.9), (0.05, 0.95), (0.02, 0.98))):
+    """Stage fractions, accuracy and agreement with LSTM-only scoring for several bands"""
+    linear_probabilities = np.asarray(linear_probabilities)
+    lstm_probabilities = np.asarray(lstm_probabilities).ravel()
+    y_test = np.asarray(y_test).astype('int32')
+    lstm_labels = (lstm_probabilities > 0.5).astype('int32')
+
+    report = {
+        'test_samples': int(len(y_test)),
+        'linear_accuracy': float(np.mean((linear_probabilities > 0.5) == y_test)),
+        'lstm_accuracy': float(np.mean(lstm_labels == y_test)),
+        'bands': []
+    }
+    for low, high in bands:
+        escalate = uncertain_mask(linear_probabilities, low, high)
+        cascade = np.where(escalate, lstm_probabilities, linear_probabilities)
+        cascade_labels = (cascade > 0.5).astype('int32')
+        report['bands'].append({
+            'low': low,
+            'high': high,
+            'linear_fraction': float(1.0 - escalate.mean()),
+            'lstm_fraction': float(escalate.mean()),
+            'accuracy': float(np.mean(cascade_labels == y_test)),
+            'agreement_with_lstm': float(np.mean(cascade_labels == lstm_labels))
+        })
+    return report
+
+
+def export_cascade_artifacts(tfidf, lr_model, model_dir, texts_test, lstm_probabilities, y_test,
+                             filename='linear_model.npz'):
+    """Export the first-stage model next to the LSTM and write cascade_report.json"""
+    path = export_linear_model(tfidf, lr_model, os.path.join(model_dir, filename))
+    classifier = LinearTextClassifier.load(path)
+    max_diff = verify_against_sklearn(tfidf, lr_model, classifier, list(texts_test[:1000]))
+
+    start = time.perf_counter()
+    linear_probabilities = classifier.predict_proba(list(texts_test))
+    linear_ms_per_row = (time.perf_counter() - start) * 1000 / max(len(texts_test), 1)
+
+    report = build_cascade_report(linear_probabilities, lstm_probabilities, y_test)
+    report['linear_ms_per_row'] = round(linear_ms_per_row, 4)
+    report['max_abs_diff_vs_sklearn'] = max_diff
+    report_path = os.path.join(model_dir, 'cascade_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report, report_path
+
+
+if __name__ == '__main__':
+    # Usage: python -m app.cascade [linear_model.npz] "text to score" ...
+    path = sys.argv[1] if len(sys.argv) > 1 else 'saved_model/linear_model.npz'
+    classifier = LinearTextClassifier.load(path)
+    texts = sys.argv[2:] or ['This is a test sentence for model verification']
+    start = time.time()
+    for text, probability in zip(texts, classifier.predict_proba(texts)):
+        print(f"{probability:.4f}  {text[:80]}")
+    print(f"Scored {len(texts)} text(s) in {(time.time()-start)*1000:.2f}ms")
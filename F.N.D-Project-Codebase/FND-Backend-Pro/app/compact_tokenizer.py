@@ -0,0 +1,174 @@
+"""Compact replacement for the pickled Keras Tokenizer on the serving hot path.
+
+The training tokenizer keeps a word_index for every word in the corpus, but
+with num_words=8000 only ids below 8000 can ever be emitted. The compact
+artifact stores just those words (ordered by id) as JSON, loads in a few
+milliseconds without importing Keras, and encodes batches straight into a
+pre-padded int32 array.
+"""
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+KERAS_DEFAULT_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+
+class CompactTokenizer:
+    """Pruned word -> id lookup with Keras Tokenizer.texts_to_sequences semantics"""
+
+    def __init__(self, words, num_words=None, oov_token=None, lower=True,
+                 filters=KERAS_DEFAULT_FILTERS, split=' '):
+        # words[i] has id i + 1, exactly as in the Keras word_index
+        self.words = list(words)
+        self.num_words = num_words
+        self.oov_token = oov_token
+        self.lower = lower
+        self.filters = filters
+        self.split = split
+        self.word_index = {word: i for i, word in enumerate(self.words, start=1)}
+        self.oov_index = self.word_index.get(oov_token) if oov_token is not None else None
+        self._translate_table = str.maketrans({c: split for c in filters})
+
+    @classmethod
+    def from_keras(cls, tokenizer):
+        """Prune a fitted Keras Tokenizer down to the ids it can actually emit"""
+        if getattr(tokenizer, 'char_level', False):
+            raise ValueError("Character-level tokenizers are not supported")
+
+        num_words = getattr(tokenizer, 'num_words', None)
+        limit = num_words if num_words else len(tokenizer.word_index) + 1
+        words = [None] * (min(limit, len(tokenizer.word_index) + 1) - 1)
+        for word, index in tokenizer.word_index.items():
+            if index < limit:
+                words[index - 1] = word
+        if any(word is None for word in words):
+            raise ValueError("Tokenizer word_index ids are not contiguous")
+
+        return cls(
+            words,
+            num_words=num_words,
+            oov_token=getattr(tokenizer, 'oov_token', None),
+            lower=getattr(tokenizer, 'lower', True),
+            filters=getattr(tokenizer, 'filters', KERAS_DEFAULT_FILTERS),
+            split=getattr(tokenizer, 'split', ' ')
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported tokenizer format: {data.get('format_version')}")
+        return cls(
+            data['words'],
+            num_words=data['num_words'],
+            oov_token=data['oov_token'],
+            lower=data['lower'],
+            filters=data['filters'],
+            split=data['split']
+        )
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'format_version': FORMAT_VERSION,
+                'num_words': self.num_words,
+                'oov_token': self.oov_token,
+                'lower': self.lower,
+                'filters': self.filters,
+                'split': self.split,
+                'words': self.words
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        return path
+
+    def _words(self, text):
+        if self.lower:
+            text = text.lower()
+        return text.translate(self._translate_table).split(self.split)
+
+    def encode(self, text):
+        """Token ids for one text (unpadded, untruncated)"""
+        index = self.word_index
+        oov = self.oov_index
+        ids = []
+        for word in self._words(text):
+            if not word:
+                continue
+            token = index.get(word, oov)
+            if token is not None:
+                ids.append(token)
+        return ids
+
+    def texts_to_sequences(self, texts):
+        """Drop-in for Keras Tokenizer.texts_to_sequences"""
+        return [self.encode(text) for text in texts]
+
+    def encode_batch(self, texts, maxlen):
+        """Encode texts into a pre-padded, pre-truncated int32 (N, maxlen) array
+
+        Matches pad_sequences(texts_to_sequences(texts), maxlen) with its default
+        'pre' padding and truncation: only the last maxlen ids of each text are
+        kept, so words are scanned from the end and scanning stops once full.
+        """
+        index = self.word_index
+        oov = self.oov_index
+        padded = np.zeros((len(texts), maxlen), dtype=np.int32)
+        for row, text in enumerate(texts):
+            tail = []
+            for word in reversed(self._words(text)):
+                if not word:
+                    continue
+                token = index.get(word, oov)
+                if token is not None:
+                    tail.append(token)
+                    if len(tail) == maxlen:
+                        break
+            if tail:
+                tail.reverse()
+                padded[row, maxlen - len(tail):] = tail
+        return padded
+
+
+def verify_against_keras(tokenizer, compact, texts, maxlen=150):
+    """Check the compact tokenizer reproduces Keras ids and padding on sample texts"""
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+    expected = pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=maxlen)
+    actual = compact.encode_batch(texts, maxlen)
+    mismatched = int(np.sum(np.any(expected != actual, axis=1)))
+    if mismatched:
+        raise AssertionError(f"Compact tokenizer disagrees with Keras on {mismatched}/{len(texts)} texts")
+    return len(texts)
+
+
+def export_compact_tokenizer(tokenizer, path, sample_texts=None, maxlen=150):
+    """Prune a fitted Keras Tokenizer, write the compact artifact and verify it"""
+    compact = CompactTokenizer.from_keras(tokenizer)
+    compact.save(path)
+    reloaded = CompactTokenizer.load(path)
+    if sample_texts is not None:
+        verify_against_keras(tokenizer, reloaded, list(sample_texts), maxlen)
+    return reloaded
+
+
+if __name__ == '__main__':
+    # Usage: python -m app.compact_tokenizer [tokenizer.pkl] [tokenizer.json]
+    import joblib
+
+    pickle_file = sys.argv[1] if len(sys.argv) > 1 else 'saved_model/tokenizer.pkl'
+    compact_file = sys.argv[2] if len(sys.argv) > 2 else 'saved_model/tokenizer.json'
+
+    keras_tokenizer = joblib.load(pickle_file)
+    # Vocabulary words themselves make a convenient parity sample, including out-of-range ids
+    vocabulary = list(keras_tokenizer.word_index)
+    sample = [' '.join(vocabulary[i:i + 300]) for i in range(0, min(len(vocabulary), 12000), 300)]
+    start = time.time()
+    compact = export_compact_tokenizer(keras_tokenizer, compact_file, sample_texts=sample)
+    print(f"Exported {compact_file} with {len(compact.words)} of {len(keras_tokenizer.word_index)} words "
+          f"in {(time.time()-start)*1000:.2f}ms")
@@ -0,0 +1,131 @@
+"""Budget-aware text extraction for PDF and DOCX uploads.
+
+Stored conversations keep 5000 characters and the model reads 150 tokens,
+so extracting every page of a long document is wasted work. Both extractors
+yield text piece by piece (a PDF page, a DOCX paragraph) into a TextBudget
+and stop as soon as it is full. Up to the budget the result is identical to
+extracting the whole document and truncating it, which is what the URL path
+already does with FETCH_MAX_CHARS.
+
+DOCX is read straight from word/document.xml with iterparse instead of
+building python-docx's object tree for the whole file; paragraphs are
+cleared as soon as their text is taken.
+"""
+import zipfile
+from xml.etree import ElementTree
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY, W_P, W_R, W_HYPERLINK = W_NS + 'body', W_NS + 'p', W_NS + 'r', W_NS + 'hyperlink'
+W_T, W_BR, W_TYPE = W_NS + 't', W_NS + 'br', W_NS + 'type'
+# Run children with a fixed text equivalent, as in python-docx's Run.text
+RUN_SYMBOLS = {W_NS + 'tab': '\t', W_NS + 'ptab': '\t', W_NS + 'cr': '\n', W_NS + 'noBreakHyphen': '-'}
+
+
+class TextBudget:
+    """Collects text pieces joined by newlines until max_chars or max_tokens is reached"""
+
+    def __init__(self, max_chars=10000, max_tokens=0, separator='\n'):
+        self.max_chars = max_chars or 0
+        self.max_tokens = max_tokens or 0
+        self.separator = separator
+        self.pieces = []
+        self.chars = 0
+        self.tokens = 0
+        self.full = False
+
+    def add(self, text):
+        """Append one piece; returns False once the budget is used up"""
+        if self.full:
+            return False
+        if self.pieces:
+            self.chars += len(self.separator)
+        self.pieces.append(text)
+        self.chars += len(text)
+        if self.max_tokens:
+            self.tokens += len(text.split())
+        if (self.max_chars and self.chars >= self.max_chars) or (self.max_tokens and self.tokens >= self.max_tokens):
+            self.full = True
+        return not self.full
+
+    def text(self):
+        text = self.separator.join(self.pieces)
+        if self.max_tokens and self.tokens > self.max_tokens:
+            text = _first_tokens(text, self.max_tokens)
+        return text[:self.max_chars] if self.max_chars else text
+
+
+def _first_tokens(text, count):
+    """Prefix of text holding its first `count` whitespace-separated tokens"""
+    seen = 0
+    in_token = False
+    for position, character in enumerate(text):
+        if character.isspace():
+            if in_token:
+                seen += 1
+                if seen == count:
+                    return text[:position]
+            in_token = False
+        else:
+            in_token = True
+    return text
+
+
+def iter_pdf_pages(fileobj):
+    """Text of each PDF page, parsed only when it is reached"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(fileobj)
+    for page in reader.pages:
+        yield page.extract_text()
+
+
+def iter_docx_paragraphs(fileobj):
+    """Text of each body paragraph of a DOCX file, streamed from word/document.xml
+
+    Matches python-docx's Document.paragraphs: top-level paragraphs only (not
+    table cells), runs directly in the paragraph or in a hyperlink.
+    """
+    with zipfile.ZipFile(fileobj) as archive, archive.open('word/document.xml') as xml:
+        path = []
+        parts = []
+        for event, element in ElementTree.iterparse(xml, events=('start', 'end')):
+            if event == 'start':
+                path.append(element.tag)
+                continue
+            path.pop()
+            tag = element.tag
+            depth = len(path)
+            if depth >= 3 and path[1] == W_BODY and path[2] == W_P:
+                # Inside a body paragraph: w:p/w:r/<x> or w:p/w:hyperlink/w:r/<x>
+                in_run = path[-1] == W_R and (depth == 4 or (depth == 5 and path[3] == W_HYPERLINK))
+                if in_run:
+                    if tag == W_T:
+                        parts.append(element.text or '')
+                    elif tag == W_BR:
+                        parts.append('\n' if element.get(W_TYPE, 'textWrapping') == 'textWrapping' else '')
+                    elif tag in RUN_SYMBOLS:
+                        parts.append(RUN_SYMBOLS[tag])
+            elif depth == 2 and path[1] == W_BODY:
+                if tag == W_P:
+                    yield ''.join(parts)
+                parts = []
+                element.clear()  # Finished top-level block; drop its subtree
+
+
+def extract_document_text(kind, fileobj, max_chars=10000, max_tokens=0):
+    """Text of a PDF or DOCX file object, reading no further than the budget needs"""
+    if kind == 'pdf':
+        pieces = iter_pdf_pages(fileobj)
+    elif kind == 'docx':
+        pieces = iter_docx_paragraphs(fileobj)
+    else:
+        raise ValueError(f"Unsupported document type: {kind}")
+
+    budget = TextBudget(max_chars, max_tokens)
+    try:
+        for piece in pieces:
+            if not budget.add(piece):
+                break
+    finally:
+        pieces.close()
+    return budget.text()
@@ -0,0 +1,305 @@
+"""PDF/DOCX text extraction in a bounded pool of worker processes.
+
+Parsing a large or hostile document is CPU-bound Python that holds the GIL,
+so doing it on a request thread stalls every other request in the worker.
+Here each upload is handed to one of DOCUMENT_PARSER_WORKERS processes over
+a pipe and the request thread just waits on the pipe (no GIL held). Every
+job runs under limits:
+
+- CPU time: RLIMIT_CPU is set to the worker's usage so far plus the budget,
+  and the resulting SIGXCPU is turned into an exception inside the job;
+- memory: RLIMIT_AS caps the worker's address space, so a runaway parse gets
+  a MemoryError instead of pushing the server out of memory;
+- wall time: a job that has not answered in time (blocked, or stuck in C
+  code) has its worker killed and replaced.
+
+Small uploads are sent to the worker as bytes; uploads spooled to disk are
+passed as a duplicated file descriptor, so the document is never copied
+through the pipe or held in the web process's memory.
+
+Workers are started from a forkserver, so they do not inherit the model or
+the web server's threads, and are recycled after DOCUMENT_PARSER_MAX_JOBS
+jobs or any limit violation. Without the resource module (Windows) only the
+wall-time limit applies.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from multiprocessing import reduction
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+from app.document_extract import extract_document_text
+from app.metrics import STAGE_SECONDS
+from app.uploads import current_rss_mb, peak_rss_since_reset_mb, reset_peak_rss
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_TYPES = ('pdf', 'docx')
+
+
+class DocumentParseError(Exception):
+    """Parse failure or limit violation, carrying the HTTP status the API should return"""
+
+    def __init__(self, message, status_code=422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _CPULimitExceeded(Exception):
+    pass
+
+
+def _raise_cpu_limit(signum, frame):
+    raise _CPULimitExceeded()
+
+
+def _worker_main(conn, memory_bytes):
+    """Worker process loop
+
+    Receives (kind, data, cpu_seconds, max_chars, max_tokens), where data=None
+    means a file descriptor follows, and sends (status, result, peak_rss_mb,
+    peak_growth_mb): the worker's peak RSS during that job alone and how far
+    it rose above the RSS the job started with.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is the parent's to handle
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+        if memory_bytes:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, resource.getrlimit(resource.RLIMIT_AS)[1]))
+        cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+
+    while True:
+        try:
+            kind, data, cpu_seconds, max_chars, max_tokens = conn.recv()
+            if data is None:
+                document = os.fdopen(reduction.recv_handle(conn), 'rb')
+                document.seek(0)  # The descriptor shares its offset with the web process's copy
+            else:
+                document = io.BytesIO(data)
+        except (EOFError, OSError):
+            return
+        # Workers serve many jobs: restart the high-water mark so it reports this one
+        peak_tracked = reset_peak_rss()
+        start_rss_mb = current_rss_mb()
+        if resource is not None and cpu_seconds:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (soft if cpu_hard == resource.RLIM_INFINITY else min(soft, cpu_hard), cpu_hard))
+        try:
+            reply = ('ok', extract_document_text(kind, document, max_chars, max_tokens))
+        except _CPULimitExceeded:
+            reply = ('cpu_limit', f"Document parsing exceeded the {cpu_seconds}s CPU limit")
+        except MemoryError:
+            reply = ('memory_limit', f"Document parsing exceeded the {memory_bytes // (1024 * 1024)}MB memory limit")
+        except Exception as e:
+            reply = ('error', f"Could not parse document: {str(e)}")
+        finally:
+            document.close()
+            if resource is not None and cpu_seconds:
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+        peak_rss_mb = peak_rss_since_reset_mb() if peak_tracked else None
+        peak_growth_mb = round(peak_rss_mb - start_rss_mb, 1) if None not in (peak_rss_mb, start_rss_mb) else None
+        try:
+            conn.send(reply + (peak_rss_mb, peak_growth_mb))
+        except MemoryError:
+            reply = None  # Pickling the text itself hit the limit
+            conn.send(('memory_limit', f"Document parsing exceeded the {memory_bytes // (1024 * 1024)}MB memory limit",
+                       peak_rss_mb, peak_growth_mb))
+        except (EOFError, OSError):
+            return
+
+
+class _Worker:
+    def __init__(self, context, memory_bytes):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class DocumentParserPool:
+    """Fixed-size pool of parser processes with per-job CPU, memory and wall-time limits"""
+
+    def __init__(self, workers=2, cpu_seconds=10, wall_seconds=15, memory_mb=512, max_jobs_per_worker=100,
+                 max_chars=10000, max_tokens=0, queue_timeout=None):
+        self.workers = max(1, int(workers))
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.memory_bytes = int(memory_mb * 1024 * 1024) if memory_mb else 0
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.queue_timeout = wall_seconds if queue_timeout is None else queue_timeout
+
+        self._context = None
+        self._idle = queue.LifoQueue()  # Most recently used first, so warm workers stay busy
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.counters = {'jobs': 0, 'completed': 0, 'failed': 0, 'timeouts': 0, 'cpu_limit': 0,
+                         'memory_limit': 0, 'crashed': 0, 'rejected': 0, 'workers_started': 0, 'workers_recycled': 0}
+        self.parse_ms = 0.0
+        self.wait_ms = 0.0
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            workers=Config.DOCUMENT_PARSER_WORKERS,
+            cpu_seconds=Config.DOCUMENT_PARSE_CPU_SECONDS,
+            wall_seconds=Config.DOCUMENT_PARSE_TIMEOUT,
+            memory_mb=Config.DOCUMENT_PARSE_MEMORY_MB,
+            max_jobs_per_worker=Config.DOCUMENT_PARSER_MAX_JOBS,
+            max_chars=Config.DOCUMENT_MAX_CHARS,
+            max_tokens=Config.DOCUMENT_MAX_TOKENS
+        )
+
+    def _get_context(self):
+        if self._context is None:
+            methods = multiprocessing.get_all_start_methods()
+            if 'forkserver' in methods:
+                self._context = multiprocessing.get_context('forkserver')
+                # Preload only this module: the server must not re-import run.py or load the model
+                self._context.set_forkserver_preload(['app.document_parser'])
+            else:
+                self._context = multiprocessing.get_context('spawn')
+        return self._context
+
+    def _checkout(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.process.is_alive():
+                return worker
+            self._retire(worker)  # Died while idle
+        worker = _Worker(self._get_context(), self.memory_bytes)
+        with self._lock:
+            self.counters['workers_started'] += 1
+        return worker
+
+    def _retire(self, worker):
+        worker.kill()
+        with self._lock:
+            self.counters['workers_recycled'] += 1
+
+    def parse(self, kind, source, timeout=None, max_chars=None):
+        """Extract text from a document in a worker process; raises DocumentParseError
+
+        `source` is bytes or a file object backed by a real file. Returns
+        (text, job) where job reports the parse time and the worker's peak RSS
+        during this job, absolute and above the RSS it started with.
+        timeout (seconds) caps queueing plus parsing below the pool's own
+        limits; running out of it is reported with status 504. max_chars lowers
+        DOCUMENT_MAX_CHARS for this document.
+        """
+        if kind not in DOCUMENT_TYPES:
+            raise DocumentParseError(f"Unsupported document type: {kind}", 400)
+
+        queued_at = time.time()
+        queue_timeout = self.queue_timeout if timeout is None else min(self.queue_timeout, timeout)
+        if not self._slots.acquire(timeout=queue_timeout):
+            with self._lock:
+                self.counters['rejected'] += 1
+            if queue_timeout < self.queue_timeout:
+                raise DocumentParseError("Ran out of time waiting for a document parser", 504)
+            raise DocumentParseError("All document parsers are busy, please retry shortly", 503)
+        started = time.time()
+        with self._lock:
+            self.busy += 1
+            self.counters['jobs'] += 1
+            self.wait_ms += (started - queued_at) * 1000
+
+        max_chars = self.max_chars if not max_chars else min(max_chars, self.max_chars or max_chars)
+        worker = None
+        outcome = 'failed'
+        try:
+            worker = self._checkout()
+            worker.jobs += 1
+            if isinstance(source, (bytes, bytearray)):
+                worker.conn.send((kind, bytes(source), self.cpu_seconds, max_chars, self.max_tokens))
+            else:
+                worker.conn.send((kind, None, self.cpu_seconds, max_chars, self.max_tokens))
+                reduction.send_handle(worker.conn, source.fileno(), worker.process.pid)
+            wall_seconds = self.wall_seconds
+            if timeout is not None:
+                wall_seconds = min(wall_seconds, max(0.0, queued_at + timeout - time.time()))
+            if not worker.conn.poll(wall_seconds):
+                outcome = 'timeouts'
+                logger.warning(f"⚠️ {kind.upper()} parse timed out after {wall_seconds:.1f}s, replacing worker")
+                raise DocumentParseError(f"Document parsing timed out after {wall_seconds:.1f}s",
+                                         422 if wall_seconds == self.wall_seconds else 504)
+            status, result, peak_rss_mb, peak_growth_mb = worker.conn.recv()
+            if status != 'ok':
+                outcome = status if status in ('cpu_limit', 'memory_limit') else 'failed'
+                raise DocumentParseError(result, 422)
+            outcome = 'completed'
+            return result, {'parse_ms': round((time.time() - started) * 1000, 2), 'peak_rss_mb': peak_rss_mb,
+                            'peak_growth_mb': peak_growth_mb}
+        except (EOFError, OSError) as e:
+            # The worker died mid-job (killed by the OOM killer, a hard rlimit or a crash in C code)
+            outcome = 'crashed'
+            raise DocumentParseError(f"Document parser process failed: {str(e) or type(e).__name__}", 422)
+        finally:
+            if worker is not None:
+                if outcome in ('completed', 'failed') and worker.process.is_alive() \
+                        and worker.jobs < self.max_jobs_per_worker and not worker.conn.closed:
+                    self._idle.put(worker)
+                else:
+                    self._retire(worker)
+            elapsed = time.time() - started
+            STAGE_SECONDS.observe(elapsed, stage='parse')
+            with self._lock:
+                self.busy -= 1
+                self.counters[outcome] += 1
+                if outcome not in ('completed', 'failed'):
+                    self.counters['failed'] += 1  # Limit violations are failures too
+                self.parse_ms += elapsed * 1000
+            self._slots.release()
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+    def get_stats(self):
+        with self._lock:
+            jobs = self.counters['jobs']
+            return {
+                'workers': self.workers,
+                'idle_workers': self._idle.qsize(),
+                'busy': self.busy,
+                'utilization': round(self.busy / self.workers, 4),
+                **self.counters,
+                'mean_parse_ms': round(self.parse_ms / jobs, 2) if jobs else None,
+                'mean_queue_wait_ms': round(self.wait_ms / jobs, 2) if jobs else None,
+                'limits': {
+                    'cpu_seconds': self.cpu_seconds if resource is not None else None,
+                    'wall_seconds': self.wall_seconds,
+                    'memory_mb': self.memory_bytes // (1024 * 1024) if resource is not None and self.memory_bytes else None,
+                    'max_jobs_per_worker': self.max_jobs_per_worker,
+                    'max_chars': self.max_chars,
+                    'max_tokens': self.max_tokens
+                }
+            }
+
+
+document_parser = DocumentParserPool.from_config()
@@ -0,0 +1,110 @@
+"""Article text extraction from HTML.
+
+`extract_with_soup` is the original extractor: build the whole BeautifulSoup
+tree, drop page chrome, then join the text of every p/h1/h2/h3. It keeps at
+most max_chars but pays for parsing the entire page first.
+
+`ArticleTextParser` produces the same text from a single pass of the stdlib
+HTMLParser without building a tree. It only tracks whether it is inside a
+skipped element (script, nav, ...) or a target element (p, h1-h3), can be fed
+the page chunk by chunk as it downloads, and reports `done` as soon as the
+character budget is filled so the caller can stop reading the response.
+"""
+from html.parser import HTMLParser
+
+SKIP_TAGS = frozenset(['script', 'style', 'nav', 'footer', 'iframe', 'header'])
+TARGET_TAGS = frozenset(['p', 'h1', 'h2', 'h3'])
+
+
+def extract_with_soup(html, max_chars=10000):
+    """Text of the page's paragraphs and headings, without scripts and page chrome"""
+    from bs4 import BeautifulSoup  # type: ignore
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Remove unwanted elements
+    for element in soup(list(SKIP_TAGS)):
+        element.decompose()
+
+    # Get text from paragraphs and headings
+    paragraphs = soup.find_all(list(TARGET_TAGS))
+    content = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
+    return content[:max_chars]
+
+
+class ArticleTextParser(HTMLParser):
+    """Streaming p/h1/h2/h3 text collector that stops at a character budget
+
+    Nested target elements (a <p> inside an <h2>) contribute their text once,
+    as part of the outermost one; the tree extractor repeats it.
+    """
+
+    def __init__(self, max_chars=10000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.done = False
+        self._parts = []
+        self._length = 0  # Characters collected, counting the joining spaces
+        self._skip_depth = 0
+        self._target = None  # Tag of the target element being collected
+        self._target_depth = 0  # Open elements with that tag name, for nested same-name tags
+        self._buffer = []
+
+    def feed(self, data):
+        if not self.done:
+            super().feed(data)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif self._target is None:
+            if tag in TARGET_TAGS and not self._skip_depth:
+                self._target, self._target_depth = tag, 1
+        elif tag == self._target:
+            self._target_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        pass  # <br/>, <img/> and friends never hold text
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag == self._target:
+            self._target_depth -= 1
+            if not self._target_depth:
+                self._finish_target()
+
+    def handle_data(self, data):
+        if self._target is not None and not self._skip_depth:
+            self._buffer.append(data)
+
+    def _finish_target(self):
+        text = ''.join(self._buffer).strip()
+        self._target, self._buffer = None, []
+        if not text:
+            return
+        self._parts.append(text)
+        self._length += len(text) + (1 if len(self._parts) > 1 else 0)
+        if self._length >= self.max_chars:
+            self.done = True
+
+    def close(self):
+        if not self.done:
+            super().close()
+            if self._target is not None:
+                self._finish_target()  # Unclosed element at the end of a truncated page
+        return self.text()
+
+    def text(self):
+        return ' '.join(self._parts)[:self.max_chars]
+
+
+def extract_fast(html, max_chars=10000, chunk_size=16384):
+    """Single-pass extraction of an in-memory page, stopping at the budget"""
+    parser = ArticleTextParser(max_chars)
+    for offset in range(0, len(html), chunk_size):
+        parser.feed(html[offset:offset + chunk_size])
+        if parser.done:
+            break
+    return parser.close()
@@ -0,0 +1,319 @@
+"""Pluggable inference backends and benchmark-based backend selection.
+
+Every backend takes pre-padded (N, 150) int32 token arrays and returns N
+probabilities of the 'true' class. AIService only talks to this interface,
+so a new runtime is added by subclassing InferenceBackend and decorating it
+with @register_backend.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import statistics
+import time
+
+import numpy as np
+
+from app.compiled_inference import CompiledKerasModel
+from app.model_server import ModelServerClient
+from app.numpy_inference import NumpyLSTMClassifier
+from app.tflite_inference import TFLITE_MODEL_FILE, TFLiteClassifier
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {}
+
+
+def register_backend(cls):
+    """Class decorator adding a backend to the registry under cls.name"""
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+def get_backend(name):
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {', '.join(BACKENDS)} or auto")
+
+
+def preload_safe(name, options):
+    """Whether backend `name` may be loaded before fork(), judged without loading it ('auto' may pick keras)"""
+    cls = BACKENDS.get(name)
+    return cls is not None and cls(None, **options).fork_safe
+
+
+def options_from_config(config):
+    """Backend options (artifact names, threads, buckets, model server) from a Config class"""
+    return {
+        'model_file': config.MODEL_FILE,
+        'weights_file': config.NUMPY_WEIGHTS_FILE,
+        'tflite_dir': config.TFLITE_MODEL_DIR,
+        'num_threads': config.TFLITE_NUM_THREADS,
+        'compiled': config.COMPILED_INFERENCE,
+        'buckets': config.INFERENCE_BUCKETS,
+        'server_socket': config.MODEL_SERVER_SOCKET,
+        'server_timeout': config.MODEL_SERVER_TIMEOUT
+    }
+
+
+def fingerprint_file(path):
+    """Short content hash of a model artifact, used as its version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class InferenceBackend:
+    """Interface: load, predict_batch, warmup and memory_footprint"""
+
+    name = None
+    # Safe to load once and use from fork()ed workers (no runtime threads created at load/warmup)
+    fork_safe = False
+    # Inference happens in another process that batches on its own
+    remote = False
+
+    def __init__(self, model_dir, sequence_length=150, **options):
+        self.model_dir = model_dir
+        self.sequence_length = sequence_length
+        self.options = options
+        self.model = None
+
+    @property
+    def artifact_path(self):
+        raise NotImplementedError
+
+    def is_available(self):
+        """True when the artifact exists and the runtime can be imported"""
+        return os.path.exists(self.artifact_path)
+
+    def load(self):
+        raise NotImplementedError
+
+    def predict_batch(self, padded):
+        """Return P(true) for each row of an (N, sequence_length) int32 array"""
+        return self.model.predict_batch(padded)
+
+    def warmup(self):
+        self.predict_batch(np.zeros((1, self.sequence_length), dtype=np.int32))
+
+    def memory_footprint(self):
+        """Approximate bytes held by the model weights"""
+        raise NotImplementedError
+
+    def fingerprint(self):
+        return fingerprint_file(self.artifact_path)
+
+    def get_stats(self):
+        return None
+
+
+@register_backend
+class KerasBackend(InferenceBackend):
+    name = 'keras'
+
+    @property
+    def artifact_path(self):
+        return os.path.join(self.model_dir, self.options.get('model_file', 'true_fake_news_classifier.keras'))
+
+    def is_available(self):
+        return super().is_available() and importlib.util.find_spec('tensorflow') is not None
+
+    def load(self):
+        from tensorflow.keras.models import load_model
+
+        keras_model = load_model(self.artifact_path, compile=False)
+        if self.options.get('compiled', True):
+            # Fixed-signature concrete functions instead of model.predict's per-call setup
+            self.model = CompiledKerasModel(keras_model, buckets=self.options.get('buckets', (1, 4, 16, 32)),
+                                            sequence_length=self.sequence_length)
+        else:
+            self.model = keras_model
+        return self
+
+    def predict_batch(self, padded):
+        if isinstance(self.model, CompiledKerasModel):
+            return self.model.predict_batch(padded)
+        return self.model.predict(padded, verbose=0)[:, 0]
+
+    def warmup(self):
+        if isinstance(self.model, CompiledKerasModel):
+            self.model.warmup()
+        else:
+            super().warmup()
+
+    def memory_footprint(self):
+        keras_model = self.model.model if isinstance(self.model, CompiledKerasModel) else self.model
+        # Keras 3 reports dtypes as strings, tf.keras 2 as tf.DType
+        return int(sum(np.prod(w.shape) * np.dtype(getattr(w.dtype, 'name', w.dtype)).itemsize
+                       for w in keras_model.weights))
+
+    def get_stats(self):
+        return self.model.get_stats() if isinstance(self.model, CompiledKerasModel) else None
+
+
+@register_backend
+class TFLiteBackend(InferenceBackend):
+    name = 'tflite'
+
+    @property
+    def fork_safe(self):
+        # A multi-threaded interpreter's thread pool is left behind in the parent
+        return self.options.get('num_threads') == 1
+
+    @property
+    def artifact_path(self):
+        return os.path.join(self.model_dir, self.options.get('tflite_dir', 'tflite_int8'))
+
+    def is_available(self):
+        if not os.path.exists(os.path.join(self.artifact_path, TFLITE_MODEL_FILE)):
+            return False
+        return any(importlib.util.find_spec(m) is not None
+                   for m in ('ai_edge_litert', 'tflite_runtime', 'tensorflow'))
+
+    def load(self):
+        self.model = TFLiteClassifier(self.artifact_path, num_threads=self.options.get('num_threads'))
+        return self
+
+    def warmup(self):
+        self.model.warmup()
+
+    def memory_footprint(self):
+        return self.model.size_bytes
+
+    def fingerprint(self):
+        return fingerprint_file(self.model.model_path)
+
+    def get_stats(self):
+        return self.model.get_stats()
+
+
+@register_backend
+class NumpyBackend(InferenceBackend):
+    name = 'numpy'
+    fork_safe = True
+
+    @property
+    def artifact_path(self):
+        return os.path.join(self.model_dir, self.options.get('weights_file', 'model_weights.npz'))
+
+    def load(self):
+        # Pure-NumPy forward pass: TensorFlow is never imported in this worker
+        self.model = NumpyLSTMClassifier.load(self.artifact_path)
+        return self
+
+    def memory_footprint(self):
+        arrays = [self.model.embedding, self.model.token_gates, self.model.lstm_1_recurrent,
+                  self.model.lstm_2_kernel, self.model.lstm_2_recurrent, self.model.dense_kernel]
+        return int(sum(a.nbytes for a in arrays))
+
+
+@register_backend
+class ModelServerBackend(InferenceBackend):
+    """Client of `python -m app.model_server`: tokens go over a Unix socket, no weights are loaded here"""
+
+    name = 'server'
+    fork_safe = True  # Forked workers open their own connection
+    remote = True
+
+    @property
+    def artifact_path(self):
+        return self.options.get('server_socket', 'model_server.sock')
+
+    def load(self):
+        self.model = ModelServerClient(self.artifact_path, timeout=self.options.get('server_timeout', 30)).connect()
+        served_dir = self.model.info['model_dir']
+        # The tokenizer is loaded from this process's model directory, so it must be the served version's
+        if served_dir != os.path.realpath(self.model_dir):
+            raise RuntimeError(f"Model server serves {served_dir} but this process resolved {self.model_dir}; "
+                               "restart the model server after activating a new version")
+        if self.model.info['sequence_length'] != self.sequence_length:
+            raise RuntimeError(f"Model server expects sequences of {self.model.info['sequence_length']} tokens, "
+                               f"not {self.sequence_length}")
+        return self
+
+    def memory_footprint(self):
+        return 0  # The weights live in the model server
+
+    def fingerprint(self):
+        return self.model.info['version']
+
+    def get_stats(self):
+        return self.model.get_stats()
+
+
+def _median_latency_ms(backend, batch, repeats):
+    backend.predict_batch(batch)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backend.predict_batch(batch)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def select_backend(model_dir, candidates, reference='keras', tolerance=0.01,
+                   batch_sizes=(1, 32), repeats=10, sequence_length=150, options=None, seed=0):
+    """Micro-benchmark every available candidate and return the fastest accurate one
+
+    Each candidate's outputs on a random token sample are compared with the
+    reference backend (falling back to numpy, which is verified equal to Keras
+    at export); candidates deviating by more than `tolerance` are rejected.
+    Returns (loaded backend, report dict).
+    """
+    options = options or {}
+    loaded = {}
+    report = {'reference': None, 'tolerance': tolerance, 'candidates': {}, 'selected': None}
+
+    for name in dict.fromkeys(list(candidates) + [reference, 'numpy']):
+        backend = get_backend(name)(model_dir, sequence_length, **options)
+        if not backend.is_available():
+            report['candidates'][name] = {'status': 'unavailable'}
+            continue
+        try:
+            start = time.time()
+            backend.load()
+            backend.warmup()
+            loaded[name] = backend
+            report['candidates'][name] = {'status': 'loaded', 'load_ms': round((time.time() - start) * 1000, 2)}
+        except Exception as e:
+            report['candidates'][name] = {'status': 'failed', 'error': str(e)}
+
+    reference_name = reference if reference in loaded else ('numpy' if 'numpy' in loaded else None)
+    if reference_name is None:
+        raise RuntimeError("No reference backend could be loaded for backend selection")
+    report['reference'] = reference_name
+
+    rng = np.random.default_rng(seed)
+    vocab_size = 8000
+    if isinstance(loaded[reference_name].model, NumpyLSTMClassifier):
+        vocab_size = loaded[reference_name].model.vocab_size
+    sample = rng.integers(0, vocab_size, size=(max(batch_sizes), sequence_length), dtype=np.int32)
+    expected = np.asarray(loaded[reference_name].predict_batch(sample))
+
+    best_name, best_score = None, None
+    for name in candidates:
+        if name not in loaded:
+            continue
+        entry = report['candidates'][name]
+        max_diff = float(np.max(np.abs(np.asarray(loaded[name].predict_batch(sample)) - expected)))
+        entry['max_abs_diff'] = max_diff
+        entry['memory_footprint_bytes'] = loaded[name].memory_footprint()
+        if max_diff > tolerance:
+            entry['status'] = 'rejected'
+            continue
+        entry['latency_ms'] = {
+            str(size): round(_median_latency_ms(loaded[name], sample[:size], repeats), 3) for size in batch_sizes
+        }
+        score = sum(entry['latency_ms'].values())
+        entry['status'] = 'eligible'
+        if best_score is None or score < best_score:
+            best_name, best_score = name, score
+
+    if best_name is None:
+        raise RuntimeError(f"No backend within tolerance {tolerance} of {reference_name}: {report['candidates']}")
+    report['selected'] = best_name
+    report['candidates'][best_name]['status'] = 'selected'
+    return loaded[best_name], report
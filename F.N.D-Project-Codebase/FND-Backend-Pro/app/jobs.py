@@ -0,0 +1,479 @@
+"""Asynchronous screening jobs: bulk URLs, texts and document archives.
+
+POST /jobs stores the job and its items in a local SQLite database and
+returns at once. Background runner threads claim pending items in batches,
+fetch URLs and parse documents concurrently, score each batch with one
+AIService call and write the results back, so GET /jobs/<id> can report
+progress and partial results while the job runs.
+
+Claims are leases: an item being worked on is 'running' until
+JOB_LEASE_SECONDS have passed. If the process dies, its items become
+claimable again when the lease runs out, or straight away on the next start
+on the same host, so a job resumes after a restart instead of being lost.
+"""
+import errno
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from app.article_fetcher import article_fetcher
+from app.document_parser import document_parser
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+FILE_TYPES = ('.txt', '.pdf', '.docx')
+
+
+class JobError(Exception):
+    """Invalid job submission, carrying the HTTP status the API should return"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+_open_stores = weakref.WeakSet()
+
+
+def _reopen_after_fork():
+    """Forked server workers must not share the parent's SQLite connection"""
+    for store in list(_open_stores):
+        store._lock = threading.Lock()
+        store._connect()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+class JobStore:
+    """SQLite tables for jobs and their items, safe to share between threads and processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect()
+        _open_stores.add(self)
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, status TEXT NOT NULL, total INTEGER NOT NULL,
+                succeeded INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL, updated_at REAL NOT NULL, finished_at REAL);
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL, idx INTEGER NOT NULL, kind TEXT NOT NULL, source TEXT NOT NULL,
+                ref TEXT, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,
+                owner TEXT, lease_until REAL, result TEXT,
+                PRIMARY KEY (job_id, idx));
+            CREATE INDEX IF NOT EXISTS ix_job_items_status ON job_items (status, lease_until);
+        ''')
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE so claims from several processes never overlap"""
+        self._conn.execute('BEGIN IMMEDIATE')
+
+    def create_job(self, items):
+        """Store a job; items are (kind, source, ref) tuples. Returns the job id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                self._conn.execute('INSERT INTO jobs (id, status, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                                   (job_id, 'queued', len(items), now, now))
+                self._conn.executemany(
+                    'INSERT INTO job_items (job_id, idx, kind, source, ref) VALUES (?, ?, ?, ?, ?)',
+                    [(job_id, index, kind, source, ref) for index, (kind, source, ref) in enumerate(items)]
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return job_id
+
+    def claim(self, owner, limit, lease_seconds, max_attempts):
+        """Lease up to `limit` claimable items, oldest job first"""
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                rows = self._conn.execute('''
+                    SELECT i.job_id, i.idx, i.kind, i.source, i.ref, i.attempts FROM job_items i
+                    JOIN jobs j ON j.id = i.job_id
+                    WHERE i.status = 'pending' OR (i.status = 'running' AND i.lease_until < ?)
+                    ORDER BY j.created_at, i.idx LIMIT ?''', (now, limit)).fetchall()
+                claimed, exhausted = [], []
+                for job_id, index, kind, source, ref, attempts in rows:
+                    if attempts >= max_attempts:
+                        exhausted.append((job_id, index, ref, attempts))
+                    else:
+                        claimed.append({'job_id': job_id, 'index': index, 'kind': kind, 'source': source, 'ref': ref})
+                self._conn.executemany(
+                    "UPDATE job_items SET status = 'running', owner = ?, lease_until = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ? AND idx = ?",
+                    [(owner, now + lease_seconds, item['job_id'], item['index']) for item in claimed]
+                )
+                # Items whose worker died every time they were tried (a crash in a parser, say)
+                self._conn.executemany(
+                    "UPDATE job_items SET status = 'error', result = ? WHERE job_id = ? AND idx = ?",
+                    [(json.dumps({'index': index, 'ref': ref, 'status': 'error',
+                                  'error': f'Gave up after {attempts} attempts'}), job_id, index)
+                     for job_id, index, ref, attempts in exhausted]
+                )
+                jobs = {item['job_id'] for item in claimed} | {job_id for job_id, _, _, _ in exhausted}
+                self._conn.executemany("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                                       [(now, job_id) for job_id in jobs])
+                for job_id in {job_id for job_id, _, _, _ in exhausted}:
+                    self._refresh_job(job_id, now)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return claimed
+
+    def complete(self, results):
+        """Store finished items; results are (job_id, index, result_dict)"""
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                self._conn.executemany(
+                    "UPDATE job_items SET status = ?, result = ?, lease_until = NULL WHERE job_id = ? AND idx = ?",
+                    [('done' if result['status'] == 'success' else 'error', json.dumps(result), job_id, index)
+                     for job_id, index, result in results]
+                )
+                for job_id in {job_id for job_id, _, _ in results}:
+                    self._refresh_job(job_id, now)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _refresh_job(self, job_id, now):
+        """Recount a job's items and mark it complete when none are left (caller holds the transaction)"""
+        counts = dict(self._conn.execute(
+            'SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status', (job_id,)).fetchall())
+        finished = not counts.get('pending') and not counts.get('running')
+        self._conn.execute(
+            'UPDATE jobs SET succeeded = ?, failed = ?, updated_at = ?, status = ?, finished_at = ? WHERE id = ?',
+            (counts.get('done', 0), counts.get('error', 0), now, 'complete' if finished else 'running',
+             now if finished else None, job_id)
+        )
+
+    def release_orphans(self, is_alive):
+        """Make items leased by dead processes claimable now instead of when their lease ends"""
+        with self._lock:
+            owners = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT owner FROM job_items WHERE status = 'running'").fetchall()]
+            dead = [owner for owner in owners if owner and not is_alive(owner)]
+            for owner in dead:
+                self._conn.execute("UPDATE job_items SET status = 'pending', lease_until = NULL "
+                                   "WHERE status = 'running' AND owner = ?", (owner,))
+        return len(dead)
+
+    def get_job(self, job_id, offset=0, limit=100):
+        """Job progress plus the finished item results in [offset, offset + limit)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, status, total, succeeded, failed, created_at, updated_at, finished_at FROM jobs WHERE id = ?',
+                (job_id,)).fetchone()
+            if row is None:
+                return None
+            results = self._conn.execute(
+                "SELECT result FROM job_items WHERE job_id = ? AND status IN ('done', 'error') "
+                "ORDER BY idx LIMIT ? OFFSET ?", (job_id, limit, offset)).fetchall()
+        job = dict(zip(('job_id', 'status', 'total', 'succeeded', 'failed', 'created_at', 'updated_at', 'finished_at'), row))
+        job['pending'] = job['total'] - job['succeeded'] - job['failed']
+        job['progress'] = round((job['succeeded'] + job['failed']) / job['total'], 4) if job['total'] else 1.0
+        job['results'] = [json.loads(result) for (result,) in results]
+        job['offset'] = offset
+        return job
+
+    def get_stats(self):
+        with self._lock:
+            jobs = dict(self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+            items = dict(self._conn.execute('SELECT status, COUNT(*) FROM job_items GROUP BY status').fetchall())
+        return {'jobs': jobs, 'items': items}
+
+
+def _owner_is_alive(owner):
+    """Owners are host:pid; only processes on this host can be checked"""
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class JobRunner:
+    """Background threads that claim, prepare and score job items in batches"""
+
+    def __init__(self, store, files_dir, workers=2, batch_size=32, fetch_concurrency=8, lease_seconds=300,
+                 max_attempts=3, poll_interval=1.0):
+        self.store = store
+        self.files_dir = files_dir
+        self.workers = workers
+        self.batch_size = batch_size
+        self.fetch_concurrency = fetch_concurrency
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._executor = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items_processed = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            JobStore(Config.JOBS_DB_PATH),
+            files_dir=Config.JOBS_FILES_DIR,
+            workers=Config.JOB_WORKERS,
+            batch_size=Config.JOB_BATCH_SIZE,
+            fetch_concurrency=Config.JOB_FETCH_CONCURRENCY,
+            lease_seconds=Config.JOB_LEASE_SECONDS,
+            max_attempts=Config.JOB_MAX_ATTEMPTS
+        )
+
+    def start(self, app, score_chunk, on_scored=None):
+        """Start the runner threads; score_chunk(chunk) predicts and stores [(index, item)]"""
+        if self._threads:
+            return
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"  # May have been forked since __init__
+        released = self.store.release_orphans(_owner_is_alive)
+        if released:
+            logger.info(f"🔁 Resuming job items left running by {released} stopped process(es)")
+        self._executor = ThreadPoolExecutor(max_workers=self.fetch_concurrency, thread_name_prefix='job-fetch')
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(app, score_chunk, on_scored),
+                                      name=f'job-runner-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"✅ Job runner started with {self.workers} worker(s)")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def submit(self, items):
+        job_id = self.store.create_job(items)
+        self._wake.set()
+        return job_id
+
+    def _run(self, app, score_chunk, on_scored):
+        while not self._stop.is_set():
+            try:
+                claimed = self.store.claim(self.owner, self.batch_size, self.lease_seconds, self.max_attempts)
+            except sqlite3.Error as e:
+                logger.error(f"❌ Job claim failed: {str(e)}")
+                claimed = []
+            if not claimed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            with app.app_context():
+                try:
+                    self._process(claimed, score_chunk)
+                    if on_scored is not None:
+                        on_scored()
+                except Exception as e:
+                    # Leave the items leased; they are retried when the lease runs out
+                    logger.error(f"❌ Job batch of {len(claimed)} items failed: {str(e)}")
+                finally:
+                    from app import db
+                    db.session.remove()
+
+    def _process(self, claimed, score_chunk):
+        prepared = list(self._executor.map(self._prepare, claimed))
+        results = []
+        chunk = []
+        for position, (item, (text, error)) in enumerate(zip(claimed, prepared)):
+            if error is not None:
+                results.append((item['job_id'], item['index'], {'index': item['index'], 'ref': item['ref'],
+                                                                'input_type': item['kind'], 'status': 'error',
+                                                                'error': error}))
+            else:
+                chunk.append((position, {'text': text, 'input_type': item['kind'], 'ref': item['ref']}))
+
+        for line in (score_chunk(chunk) if chunk else []):
+            item = claimed[line['index']]
+            line['index'] = item['index']
+            results.append((item['job_id'], item['index'], line))
+
+        self.store.complete(results)
+        for item in claimed:
+            if item['kind'] == 'file':
+                self._remove_file(item['source'])
+        with self._lock:
+            self.batches += 1
+            self.items_processed += len(claimed)
+
+    def _prepare(self, item):
+        """Fetch or parse one item; returns (text, error)"""
+        try:
+            if item['kind'] == 'url':
+                return article_fetcher.fetch_article(item['source']), None
+            if item['kind'] == 'file':
+                return read_document(item['source']), None
+            return item['source'], None
+        except Exception as e:
+            return None, str(e)
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+            directory = os.path.dirname(path)
+            if not os.listdir(directory):
+                os.rmdir(directory)
+        except OSError:
+            pass
+
+    def get_stats(self):
+        with self._lock:
+            stats = {'workers': self.workers, 'running': bool(self._threads), 'batches': self.batches,
+                     'items_processed': self.items_processed}
+        try:
+            stats.update(self.store.get_stats())
+        except sqlite3.Error as e:
+            stats['error'] = str(e)
+        return stats
+
+
+def read_document(path):
+    """Text of a stored job file, parsed by the document parser pool"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.txt':
+        with open(path, encoding='utf-8') as f:
+            return f.read(Config.DOCUMENT_MAX_CHARS or -1)
+    with open(path, 'rb') as f:
+        text, _ = document_parser.parse(extension[1:], f)
+    return text
+
+
+def items_from_json(data):
+    """(kind, source, ref) items from {"urls": [...]}, {"texts": [...]} or {"items": [{"url"|"text": ...}]}"""
+    if isinstance(data, list):
+        data = {'items': data}
+    if not isinstance(data, dict):
+        raise JobError("Expected a JSON object with 'urls', 'texts' or 'items'")
+    items = [('url', url.strip(), url.strip()) for url in data.get('urls') or [] if isinstance(url, str) and url.strip()]
+    items += [('text', text, None) for text in data.get('texts') or [] if isinstance(text, str) and text.strip()]
+    for entry in data.get('items') or []:
+        if isinstance(entry, str) and entry.strip():
+            items.append(('text', entry, None))
+        elif isinstance(entry, dict) and isinstance(entry.get('url'), str) and entry['url'].strip():
+            items.append(('url', entry['url'].strip(), entry.get('ref', entry['url'].strip())))
+        elif isinstance(entry, dict) and isinstance(entry.get('text'), str) and entry['text'].strip():
+            items.append(('text', entry['text'], entry.get('ref')))
+        else:
+            raise JobError("Each item must be a string, {\"url\": ...} or {\"text\": ...}")
+    return items
+
+
+def store_uploaded_files(files, files_dir):
+    """Save uploaded documents (zip archives are unpacked) for a job; returns (kind, path, ref) items
+
+    Each document is written under a generated name, so archive member names
+    never become paths, and is capped at UPLOAD_MAX_BYTES; everything written
+    for the job together is capped at JOB_MAX_EXTRACTED_BYTES. Nothing is left
+    on disk when the upload is refused.
+    """
+    directory = os.path.join(files_dir, uuid.uuid4().hex)
+    os.makedirs(directory, exist_ok=True)
+    items = []
+    written = 0
+    try:
+        for upload in files:
+            name = upload.filename or ''
+            if name.lower().endswith('.zip'):
+                with zipfile.ZipFile(upload.stream) as archive:
+                    members = [member for member in archive.infolist()
+                               if not member.is_dir() and member.filename.lower().endswith(FILE_TYPES)]
+                    if len(items) + len(members) > Config.JOB_MAX_ITEMS:
+                        raise JobError(f"A job can hold at most {Config.JOB_MAX_ITEMS} items", 413)
+                    # Declared sizes can lie, so the running total below is what actually enforces the cap
+                    declared = sum(member.file_size for member in members)
+                    if written + declared > Config.JOB_MAX_EXTRACTED_BYTES:
+                        raise JobError(f"'{name}' unpacks to {declared} bytes, over the "
+                                       f"{Config.JOB_MAX_EXTRACTED_BYTES} byte limit for a job", 413)
+                    for member in members:
+                        with archive.open(member) as source:
+                            item, size = _save_document(source, member.filename, directory, len(items), written)
+                        items.append(item)
+                        written += size
+            elif name.lower().endswith(FILE_TYPES):
+                item, size = _save_document(upload.stream, name, directory, len(items), written)
+                items.append(item)
+                written += size
+            else:
+                raise JobError(f"Unsupported file '{name}'. Upload TXT, PDF, DOCX or a ZIP of them")
+    except BaseException as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        job_error = _storage_error(e)
+        if job_error is None:
+            raise
+        raise job_error from e
+    if not items:
+        os.rmdir(directory)
+    return items
+
+
+def _storage_error(error):
+    """The JobError to answer for an upload that could not be stored (None: unexpected, let it propagate)"""
+    if isinstance(error, JobError):
+        return error
+    if isinstance(error, (zipfile.BadZipFile, zlib.error, EOFError)):
+        return JobError(f"Corrupt ZIP archive: {str(error)}")
+    if isinstance(error, RuntimeError) and 'encrypted' in str(error):
+        return JobError("Encrypted ZIP archives are not supported")
+    if isinstance(error, NotImplementedError):
+        return JobError(f"Unsupported ZIP archive: {str(error)}")
+    if isinstance(error, OSError) and error.errno == errno.ENOSPC:
+        return JobError("Not enough disk space to store the upload", 413)
+    return None
+
+
+def _save_document(source, name, directory, number, job_written=0):
+    """Copy one document into the job directory; returns ((kind, path, ref), bytes written)"""
+    path = os.path.join(directory, f"{number:06d}{os.path.splitext(name)[1].lower()}")
+    written = 0
+    with open(path, 'wb') as target:
+        while True:
+            block = source.read(1024 * 1024)
+            if not block:
+                break
+            written += len(block)
+            if written > Config.UPLOAD_MAX_BYTES:
+                raise JobError(f"'{name}' is larger than {Config.UPLOAD_MAX_BYTES} bytes", 413)
+            if job_written + written > Config.JOB_MAX_EXTRACTED_BYTES:
+                raise JobError(f"The job's documents exceed {Config.JOB_MAX_EXTRACTED_BYTES} bytes", 413)
+            target.write(block)
+    return ('file', path, name), written
+
+
+job_runner = JobRunner.from_config()
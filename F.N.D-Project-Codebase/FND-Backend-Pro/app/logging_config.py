@@ -0,0 +1,191 @@
+"""Logging setup: pretty or JSON output, asynchronous handlers and sampled verbose logs.
+
+configure_logging() installs exactly one root handler; calling it again is a
+no-op unless force=True, so run.py and create_app no longer stack handlers
+and print every line twice. With LOG_ASYNC the root handler is a
+QueueHandler: the request thread only enqueues the record, and a
+QueueListener thread formats it and does the write.
+
+In JSON mode every HTTP request produces one summary record (logger
+'app.requests') with its status, duration and the time spent in each
+pipeline stage, gathered from the fnd_stage_duration_seconds observations
+made on the request thread. The emoji per-stage prediction logs are verbose:
+verbose_logging() decides once per request, at LOG_VERBOSE_SAMPLE_RATE,
+whether they are emitted at all.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from app.metrics import STAGE_SECONDS
+from config import Config
+
+LOG_FORMATS = ('pretty', 'json')
+PRETTY_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# run.py renames the levels with emojis; JSON records keep the standard names
+LEVEL_NAMES = {logging.DEBUG: 'DEBUG', logging.INFO: 'INFO', logging.WARNING: 'WARNING',
+               logging.ERROR: 'ERROR', logging.CRITICAL: 'CRITICAL'}
+
+request_logger = logging.getLogger('app.requests')
+
+_current = contextvars.ContextVar('request_log', default=None)
+_state = {'handler': None, 'listener': None, 'format': 'pretty', 'sample_rate': 1.0, 'options': None}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; request summaries carry their fields in record.request"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': LEVEL_NAMES.get(record.levelno, str(record.levelno)),
+            'logger': record.name,
+            'message': record.getMessage().strip()
+        }
+        fields = getattr(record, 'request', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that hands plain records over without copying them"""
+
+    def prepare(self, record):
+        if record.exc_info or record.stack_info:
+            return super().prepare(record)  # Traceback text must be rendered on this thread
+        # The root handler is the last to see the record, so merging args in place is safe
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(log_format=None, level=None, async_handler=None, sample_rate=None, stream=None,
+                      fmt=PRETTY_FORMAT, datefmt=None, force=False):
+    """Install the single root handler (settings default to Config); returns it"""
+    if _state['handler'] is not None and not force:
+        return _state['handler']
+
+    log_format = (log_format or Config.LOG_FORMAT).lower()
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown LOG_FORMAT '{log_format}', expected one of {', '.join(LOG_FORMATS)}")
+    level = level or Config.LOG_LEVEL
+    async_handler = Config.LOG_ASYNC if async_handler is None else async_handler
+    sample_rate = Config.LOG_VERBOSE_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    shutdown_logging()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter(fmt, datefmt))
+    if async_handler:
+        records = queue.SimpleQueue()
+        handler = _QueueHandler(records)
+        listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        listener.start()
+    else:
+        handler, listener = output, None
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level)
+    # The request record replaces Werkzeug's per-request access line in JSON mode
+    logging.getLogger('werkzeug').setLevel(logging.WARNING if log_format == 'json' else logging.NOTSET)
+    _state.update(handler=handler, listener=listener, format=log_format, sample_rate=float(sample_rate),
+                  options={'log_format': log_format, 'level': level, 'async_handler': async_handler,
+                           'sample_rate': sample_rate, 'stream': stream, 'fmt': fmt, 'datefmt': datefmt})
+    return handler
+
+
+def shutdown_logging():
+    """Remove the installed handler, flushing anything still queued for the listener"""
+    if _state['listener'] is not None:
+        _state['listener'].stop()
+    if _state['handler'] is not None:
+        logging.getLogger().removeHandler(_state['handler'])
+        _state['handler'].close()
+    _state.update(handler=None, listener=None)
+
+
+atexit.register(shutdown_logging)
+
+
+def _restart_after_fork():
+    """The listener thread stays in the parent; a forked worker gets its own queue and listener"""
+    if _state['listener'] is None:
+        return
+    logging.getLogger().removeHandler(_state['handler'])
+    _state.update(handler=None, listener=None)  # Records still queued are the parent's to write
+    configure_logging(**_state['options'], force=True)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def _sample():
+    rate = _state['sample_rate']
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def verbose_logging():
+    """Whether the per-stage prediction logs are emitted for the current request (or call)"""
+    entry = _current.get()
+    return entry.verbose if entry is not None else _sample()
+
+
+class RequestLog:
+    """Fields and stage timings collected on one request's thread for its summary record"""
+
+    __slots__ = ('fields', 'stages', 'started', 'verbose')
+
+    def __init__(self, method, path, endpoint, request_id):
+        self.fields = {'request_id': request_id, 'method': method, 'path': path, 'endpoint': endpoint}
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.verbose = _sample()
+
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def finish(self, status):
+        if _current.get() is self:
+            _current.set(None)
+        if _state['format'] != 'json':
+            return
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        fields = dict(self.fields, status=status, duration_ms=round(duration_ms, 2),
+                      stages_ms={stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()})
+        request_logger.info(f"{self.fields['method']} {self.fields['path']} {status} in {duration_ms:.1f}ms",
+                            extra={'request': fields})
+
+
+def begin_request(method, path, endpoint, request_id=None):
+    """Start collecting for a request on this thread; returns its RequestLog"""
+    entry = RequestLog(method, path, endpoint, request_id or uuid.uuid4().hex[:16])
+    _current.set(entry)
+    return entry
+
+
+def annotate_request(**fields):
+    """Add fields (input type, label, error...) to the current request's summary record"""
+    entry = _current.get()
+    if entry is not None:
+        entry.fields.update(fields)
+
+
+def _collect_stage(seconds, labels):
+    entry = _current.get()
+    if entry is not None:
+        entry.add_stage(labels['stage'], seconds)
+
+
+STAGE_SECONDS.add_listener(_collect_stage)
@@ -0,0 +1,281 @@
+"""In-process metrics: histograms for /health snapshots and a Prometheus registry.
+
+The module-level `registry` holds the request, stage and prediction metrics
+that GET /metrics renders in the Prometheus text exposition format. Stage
+timings are observed in seconds where the work happens (article fetcher,
+parser pool, AI service, routes), labelled by stage.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans sub-millisecond cleaning up to multi-second fetches and parses
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram with percentile estimates"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def percentile(self, q):
+        """Estimate the q-th percentile (0-100) as the upper bound of its bucket"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if total == 0:
+            return None
+        rank = total * q / 100.0
+        running = 0
+        for index, count in enumerate(counts):
+            running += count
+            if running >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def cumulative(self):
+        """Return ({upper bound: cumulative count}, sum, count) from one consistent read"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            total_sum = self._sum
+
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[f'{bound:g}'] = running
+        cumulative['+Inf'] = total
+        return cumulative, total_sum, total
+
+    def snapshot(self):
+        """Return cumulative bucket counts plus summary statistics"""
+        cumulative, total_sum, total = self.cumulative()
+
+        summary = {
+            'count': total,
+            'sum': round(total_sum, 4),
+            'mean': round(total_sum / total, 4) if total else None,
+            'buckets': cumulative
+        }
+        for q in (50, 90, 99):
+            value = self.percentile(q)
+            summary[f'p{q}'] = '+Inf' if value == float('inf') else value
+        return summary
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A named metric family with one child per combination of label values"""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = Lock()
+
+    def _child(self, labels):
+        try:
+            key = tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            key = None
+        if key is None or len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return key, child
+
+    def _new_child(self):
+        return [0]
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for key, child in self._items():
+            lines.extend(self._render_child(list(zip(self.labelnames, key)), child))
+        return lines
+
+    def _render_child(self, labels, child):
+        return [f'{self.name}{_format_labels(labels)} {_format_value(child[0])}']
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        _, child = self._child(labels)
+        with self._lock:
+            child[0] += amount
+
+    def value(self, **labels):
+        return self._child(labels)[1][0]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, such as requests in flight"""
+
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        _, child = self._child(labels)
+        with self._lock:
+            child[0] += amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        _, child = self._child(labels)
+        with self._lock:
+            child[0] = value
+
+    def value(self, **labels):
+        return self._child(labels)[1][0]
+
+
+class HistogramMetric(_Metric):
+    """Prometheus histogram family backed by one Histogram per label set"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=STAGE_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._listeners = []
+
+    def _new_child(self):
+        return Histogram(self.buckets)
+
+    def add_listener(self, listener):
+        """Call listener(value, labels) on every observation (e.g. to collect per-request timings)"""
+        self._listeners.append(listener)
+
+    def observe(self, value, **labels):
+        self._child(labels)[1].observe(value)
+        for listener in self._listeners:
+            listener(value, labels)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        return self._child(labels)[1].snapshot()
+
+    def _render_child(self, labels, child):
+        cumulative, total_sum, total = child.cumulative()
+        lines = [
+            f'{self.name}_bucket{_format_labels(labels + [("le", bound)])} {count}'
+            for bound, count in cumulative.items()
+        ]
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(float(total_sum))}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {total}')
+        return lines
+
+
+class MetricsRegistry:
+    """Named metric families rendered together for GET /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=STAGE_BUCKETS):
+        return self._register(HistogramMetric(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUESTS_IN_FLIGHT = registry.gauge(
+    'fnd_requests_in_flight', 'HTTP requests currently being handled', ('endpoint',))
+REQUEST_SECONDS = registry.histogram(
+    'fnd_request_duration_seconds', 'HTTP request latency including streamed bodies', ('endpoint',),
+    buckets=REQUEST_BUCKETS)
+STAGE_SECONDS = registry.histogram(
+    'fnd_stage_duration_seconds',
+    'Latency of one pipeline stage (queue, fetch, parse, preprocess, tokenize, infer, db_commit, sse_notify)',
+    ('stage',))
+PREDICTIONS = registry.counter(
+    'fnd_predictions_total', 'Stored predictions by input type and label', ('input_type', 'label'))
+PREDICTION_ERRORS = registry.counter(
+    'fnd_prediction_errors_total', 'Failed /predict requests by input type and HTTP status', ('input_type', 'status'))
+CACHE_HITS = registry.counter(
+    'fnd_prediction_cache_hits_total', 'Predictions answered from the prediction cache')
+ADMISSION_IN_FLIGHT = registry.gauge(
+    'fnd_admission_in_flight', '/predict pipelines holding an admission slot')
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    'fnd_admission_queue_depth', '/predict requests waiting for an admission slot')
+ADMISSION_SHED = registry.counter(
+    'fnd_admission_shed_total', '/predict requests rejected with 503 by admission control', ('reason',))
+RATE_LIMITED = registry.counter(
+    'fnd_rate_limited_total', 'Requests rejected with 429 by the per-client rate limiter', ('budget',))
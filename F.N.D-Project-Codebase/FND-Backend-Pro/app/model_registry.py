@@ -0,0 +1,149 @@
+"""Versioned model directory layout.
+
+    saved_model/
+        CURRENT              <- name of the active version
+        versions/
+            2024-06-01/      <- model, tokenizer and exported variants
+            2024-06-15/
+
+A flat saved_model/ without versions/ keeps working as a single unversioned
+model. Publishing copies artifacts into a new version directory; activating
+rewrites CURRENT atomically, which a running server picks up on its next
+reload (admin endpoint or file watch).
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+VERSIONS_DIR = 'versions'
+
+
+class ModelRegistry:
+    """Resolves model versions under a MODEL_PATH root"""
+
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, VERSIONS_DIR)
+        self.current_file = os.path.join(root, CURRENT_FILE)
+
+    @property
+    def is_versioned(self):
+        return os.path.isdir(self.versions_dir)
+
+    def list_versions(self):
+        if not self.is_versioned:
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir)
+                      if os.path.isdir(os.path.join(self.versions_dir, name)))
+
+    def current_version(self):
+        """Version named in CURRENT, else the newest version directory, else None"""
+        if not self.is_versioned:
+            return None
+        version = self._read_current()
+        if version:
+            return version
+        versions = self.list_versions()
+        return versions[-1] if versions else None
+
+    def _read_current(self):
+        try:
+            with open(self.current_file) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def resolve(self, version=None):
+        """Return (version, directory) for a version, the active one by default
+
+        version is None for the legacy flat layout.
+        """
+        version = version or self.current_version()
+        if version is None:
+            return None, self.root
+        directory = os.path.join(self.versions_dir, version)
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Model version '{version}' not found in: {self.versions_dir}")
+        return version, directory
+
+    def signature(self):
+        """Cheap value that changes whenever the active model changes, for file watching"""
+        version, directory = self.resolve()
+        try:
+            mtime = max(os.path.getmtime(os.path.join(directory, name)) for name in os.listdir(directory))
+        except (OSError, ValueError):
+            mtime = None
+        return version, mtime
+
+    def publish(self, source_dir, version):
+        """Copy a trained model directory into versions/<version>"""
+        target = os.path.join(self.versions_dir, version)
+        if os.path.exists(target):
+            raise FileExistsError(f"Model version '{version}' already exists")
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f'.{version}-', dir=self.versions_dir)
+        try:
+            for name in os.listdir(source_dir):
+                path = os.path.join(source_dir, name)
+                if name in (CURRENT_FILE, VERSIONS_DIR):
+                    continue
+                if os.path.isdir(path):
+                    shutil.copytree(path, os.path.join(staging, name))
+                else:
+                    shutil.copy2(path, staging)
+            os.replace(staging, target)  # Never expose a half-copied version
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return target
+
+    def activate(self, version):
+        """Point CURRENT at a version (atomic rename, so readers never see a partial write)
+
+        Returns what CURRENT named before (None if it did not exist), for restore().
+        """
+        self.resolve(version)
+        previous = self._read_current()
+        fd, tmp_path = tempfile.mkstemp(prefix='.CURRENT-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, self.current_file)
+        return previous
+
+    def restore(self, previous):
+        """Undo activate(): point CURRENT back at previous, or remove it if there was none"""
+        if previous is None:
+            try:
+                os.remove(self.current_file)
+            except FileNotFoundError:
+                pass
+        else:
+            self.activate(previous)
+
+
+if __name__ == '__main__':
+    # python -m app.model_registry list|publish <source_dir> [version]|activate <version>
+    from config import Config
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    registry = ModelRegistry(Config.MODEL_PATH)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    if command == 'publish':
+        source = sys.argv[2]
+        version = sys.argv[3] if len(sys.argv) > 3 else time.strftime('%Y%m%d-%H%M%S')
+        registry.publish(source, version)
+        logger.info(f"✅ Published {source} as version {version}")
+    elif command == 'activate':
+        registry.activate(sys.argv[2])
+        logger.info(f"✅ Activated version {sys.argv[2]}")
+    else:
+        current = registry.current_version()
+        for version in registry.list_versions():
+            logger.info(f"{'*' if version == current else ' '} {version}")
@@ -0,0 +1,442 @@
+"""Out-of-process model server and the client web workers use to reach it.
+
+    python -m app.model_server              # owns the model, listens on MODEL_SERVER_SOCKET
+    INFERENCE_BACKEND=server python serve.py
+
+With the 'server' inference backend a web worker still cleans and tokenizes
+text itself (the tokenizer is small and pure Python) but never loads the
+model: it ships pre-padded token ids over a Unix domain socket and gets
+probabilities back. The server feeds the rows of every connected worker
+into one MicroBatcher, so concurrent requests across all workers share
+model calls, and only one copy of TensorFlow and the weights is resident.
+
+Wire format, little-endian, one frame per message in either direction:
+
+    header   type:u8  request_id:u32  rows:u32  payload_bytes:u32
+    PREDICT  rows x sequence_length int32 token ids
+    RESULT   rows float32 probabilities
+    INFO     empty request; JSON reply (version, model_dir, sequence_length...)
+    ERROR    UTF-8 message
+
+Request ids let one connection carry the concurrent calls of all of a
+worker's request threads; replies may come back in any order.
+"""
+import itertools
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import threading
+import time
+import weakref
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from app.batching import MicroBatcher
+from app.metrics import Histogram
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('<BIII')
+PREDICT, RESULT, INFO, ERROR = 1, 2, 3, 4
+MAX_PAYLOAD_BYTES = 64 * 1024 * 1024
+TOKEN_DTYPE = np.dtype('<i4')
+PROBABILITY_DTYPE = np.dtype('<f4')
+ROUND_TRIP_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+INFO_MAX_AGE_SECONDS = 5.0  # /health shows the server's INFO at most this stale, refreshed in the background
+INFO_TIMEOUT_SECONDS = 1.0  # A server that cannot answer INFO this fast is reported unreachable
+
+
+class ModelServerError(Exception):
+    """The model server is unreachable, timed out or rejected a call"""
+
+    def __init__(self, message, status_code=503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _frame(kind, request_id, rows, payload=b''):
+    return HEADER.pack(kind, request_id, rows, len(payload)) + payload
+
+
+def _recv_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Connection closed")
+        received += count
+    return buffer
+
+
+def _read_frame(sock):
+    kind, request_id, rows, length = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    if length > MAX_PAYLOAD_BYTES:
+        raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_PAYLOAD_BYTES} byte limit")
+    return kind, request_id, rows, _recv_exactly(sock, length) if length else b''
+
+
+class ModelServer:
+    """Owns one loaded backend and scores PREDICT frames from every connection through one batcher"""
+
+    def __init__(self, socket_path, backend='keras', model_path='./saved_model', sequence_length=150,
+                 max_batch_size=64, max_wait_ms=2.0, backend_options=None):
+        self.socket_path = socket_path
+        self.backend_name = backend
+        self.model_path = model_path
+        self.sequence_length = sequence_length
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.backend_options = backend_options or {}
+
+        self.model = None
+        self.version = None
+        self.model_dir = None
+        self.batcher = None
+        self._listener = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.counters = {'connections': 0, 'active_connections': 0, 'frames': 0, 'rows': 0, 'errors': 0}
+
+    @classmethod
+    def from_config(cls):
+        from app.inference_backends import options_from_config
+
+        return cls(
+            Config.MODEL_SERVER_SOCKET,
+            backend=Config.MODEL_SERVER_BACKEND,
+            model_path=Config.MODEL_PATH,
+            max_batch_size=Config.MODEL_SERVER_BATCH_SIZE,
+            max_wait_ms=Config.MODEL_SERVER_MAX_WAIT_MS,
+            backend_options=options_from_config(Config)
+        )
+
+    def load(self):
+        """Load and warm up the active model version"""
+        from app.inference_backends import get_backend
+        from app.model_registry import ModelRegistry
+
+        if self.backend_name == 'server':
+            raise ValueError("MODEL_SERVER_BACKEND must be a local runtime (keras, tflite or numpy), not 'server'")
+        start = time.time()
+        registry_version, self.model_dir = ModelRegistry(self.model_path).resolve()
+        self.model = get_backend(self.backend_name)(self.model_dir, self.sequence_length, **self.backend_options)
+        self.model.load()
+        self.model.warmup()
+        self.version = registry_version or Config.MODEL_VERSION or self.model.fingerprint()
+        self.batcher = MicroBatcher(self.model.predict_batch, max_batch_size=self.max_batch_size,
+                                    max_wait_ms=self.max_wait_ms, name='model-server')
+        logger.info(f"✅ Model server loaded {self.model.name} model {self.version} "
+                    f"({self.model.memory_footprint()/1024/1024:.1f}MB weights) in {(time.time()-start)*1000:.2f}ms")
+        return self
+
+    def _bind(self):
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)  # Left behind by a server that did not exit cleanly
+            else:
+                raise RuntimeError(f"A model server is already listening on {self.socket_path}")
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        listener.listen(128)
+        listener.settimeout(1.0)  # Wake up to notice stop()
+        return listener
+
+    def serve_forever(self):
+        if self.model is None:
+            self.load()
+        self._listener = self._bind()
+        logger.info(f"🚀 Model server listening on {self.socket_path}")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    conn, _ = self._listener.accept()
+                except socket.timeout:
+                    continue
+                except OSError:
+                    if self._stopping.is_set():
+                        break
+                    raise
+                conn.settimeout(None)
+                threading.Thread(target=self._serve_connection, args=(conn,), name='model-server-conn',
+                                 daemon=True).start()
+        finally:
+            self._listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.batcher.stop(timeout=5)
+            logger.info("👋 Model server stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+    def _serve_connection(self, conn):
+        send_lock = threading.Lock()
+
+        def reply(frame):
+            try:
+                with send_lock:
+                    conn.sendall(frame)
+            except OSError:
+                pass  # The worker went away; its reader sees the closed socket
+
+        with self._lock:
+            self.counters['connections'] += 1
+            self.counters['active_connections'] += 1
+        try:
+            while True:
+                kind, request_id, rows, payload = _read_frame(conn)
+                with self._lock:
+                    self.counters['frames'] += 1
+                if kind == PREDICT:
+                    self._predict(request_id, rows, payload, reply)
+                elif kind == INFO:
+                    reply(_frame(INFO, request_id, 0, json.dumps(self.info()).encode('utf-8')))
+                else:
+                    reply(_frame(ERROR, request_id, 0, f"Unknown message type {kind}".encode('utf-8')))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            conn.close()
+            with self._lock:
+                self.counters['active_connections'] -= 1
+
+    def _predict(self, request_id, rows, payload, reply):
+        """Queue every row on the shared batcher; the last one to finish sends the RESULT frame"""
+        try:
+            padded = np.frombuffer(payload, dtype=TOKEN_DTYPE).reshape(rows, self.sequence_length)
+            futures = [self.batcher.submit(row) for row in padded]
+        except (ValueError, RuntimeError) as e:
+            with self._lock:
+                self.counters['errors'] += 1
+            reply(_frame(ERROR, request_id, 0, str(e).encode('utf-8')))
+            return
+        with self._lock:
+            self.counters['rows'] += rows
+        if not futures:
+            reply(_frame(RESULT, request_id, 0))
+            return
+
+        probabilities = np.empty(rows, dtype=PROBABILITY_DTYPE)
+        state = {'left': rows, 'error': None}
+        lock = threading.Lock()
+
+        def done(index, future):
+            try:
+                probabilities[index] = future.result()
+            except Exception as e:
+                state['error'] = e
+            with lock:
+                state['left'] -= 1
+                if state['left']:
+                    return
+            if state['error'] is not None:
+                with self._lock:
+                    self.counters['errors'] += 1
+                reply(_frame(ERROR, request_id, 0, f"Inference failed: {state['error']}".encode('utf-8')))
+            else:
+                reply(_frame(RESULT, request_id, rows, probabilities.tobytes()))
+
+        for index, future in enumerate(futures):
+            future.add_done_callback(lambda future, index=index: done(index, future))
+
+    def info(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'version': self.version,
+            'backend': self.model.name,
+            'model_dir': os.path.realpath(self.model_dir),
+            'sequence_length': self.sequence_length,
+            'memory_footprint_bytes': self.model.memory_footprint(),
+            'pid': os.getpid(),
+            **counters,
+            'batching': self.batcher.get_stats()
+        }
+
+
+_live_clients = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    """A forked worker must not share its parent's connection; it reconnects on first use"""
+    for client in list(_live_clients):
+        client._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class ModelServerClient:
+    """One connection per web worker, shared by all of its request threads"""
+
+    def __init__(self, socket_path, timeout=30.0, connect_timeout=5.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.info = None
+        self._info_at = None  # When self.info was last fetched
+        self._info_state = 'unknown'
+        self._reset()
+        _live_clients.add(self)
+
+    def _reset(self):
+        if getattr(self, '_sock', None) is not None:
+            self._sock.close()
+        self._sock = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self.counters = {'calls': 0, 'rows': 0, 'connects': 0, 'errors': 0}
+        self.round_trip_histogram = Histogram(ROUND_TRIP_MS_BUCKETS)
+        self._info_lock = threading.Lock()
+        self._info_refreshing = False
+        self._info_checked_at = float('-inf')
+
+    def connect(self):
+        """Connect and fetch the server's model description"""
+        self.info = json.loads(self._call(INFO, 0))
+        self._info_at = self._info_checked_at = time.monotonic()
+        self._info_state = 'reachable'
+        return self
+
+    def predict_batch(self, padded):
+        """Return P(true) for each row of an (N, sequence_length) int32 array"""
+        padded = np.ascontiguousarray(padded, dtype=TOKEN_DTYPE)
+        start = time.perf_counter()
+        payload = self._call(PREDICT, len(padded), padded.tobytes())
+        self.round_trip_histogram.observe((time.perf_counter() - start) * 1000)
+        self.counters['rows'] += len(padded)
+        return np.frombuffer(payload, dtype=PROBABILITY_DTYPE)
+
+    def _connection(self):
+        """The open socket, connecting (and starting its reader) if needed; call with _lock held"""
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise ModelServerError(f"Model server unavailable at {self.socket_path}: {str(e)}")
+            sock.settimeout(None)
+            self._sock = sock
+            self.counters['connects'] += 1
+            threading.Thread(target=self._read_loop, args=(sock,), name='model-server-reader', daemon=True).start()
+        return self._sock
+
+    def _call(self, kind, rows, payload=b'', timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        future = Future()
+        with self._lock:
+            self.counters['calls'] += 1
+            sock = self._connection()
+            request_id = next(self._ids) & 0xFFFFFFFF
+            self._pending[request_id] = future
+        try:
+            with self._send_lock:
+                sock.sendall(_frame(kind, request_id, rows, payload))
+        except OSError as e:
+            self._disconnect(sock, e)
+        try:
+            reply_kind, reply = future.result(timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._pending.pop(request_id, None)
+                self.counters['errors'] += 1
+            raise ModelServerError(f"Model server did not answer within {timeout}s")
+        except ModelServerError:
+            self.counters['errors'] += 1
+            raise
+        if reply_kind == ERROR:
+            self.counters['errors'] += 1
+            raise ModelServerError(f"Model server error: {bytes(reply).decode('utf-8', 'replace')}", 500)
+        return reply
+
+    def _read_loop(self, sock):
+        try:
+            while True:
+                kind, request_id, _, payload = _read_frame(sock)
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result((kind, payload))
+        except (ConnectionError, OSError) as e:
+            self._disconnect(sock, e)
+
+    def _disconnect(self, sock, error):
+        """Fail every call waiting on this connection; the next call reconnects"""
+        with self._lock:
+            if self._sock is not sock:
+                return
+            self._sock = None
+            pending, self._pending = self._pending, {}
+        sock.close()
+        if pending:
+            logger.warning(f"⚠️ Lost connection to the model server with {len(pending)} call(s) in flight: {error}")
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ModelServerError(f"Lost connection to the model server: {error}"))
+
+    def get_stats(self):
+        """Client counters and the server's last known INFO; never waits for the server
+
+        INFO (live batching stats across all workers) older than
+        INFO_MAX_AGE_SECONDS is refreshed by a background call, so a slow or
+        hung server shows up as 'unreachable' instead of stalling /health.
+        """
+        now = time.monotonic()
+        with self._info_lock:
+            refresh = not self._info_refreshing and now - self._info_checked_at > INFO_MAX_AGE_SECONDS
+            if refresh:
+                self._info_refreshing = True
+        if refresh:
+            threading.Thread(target=self._refresh_info, name='model-server-info', daemon=True).start()
+        return {
+            'socket': self.socket_path,
+            'connected': self._sock is not None,
+            **self.counters,
+            'round_trip_ms': self.round_trip_histogram.snapshot(),
+            'server_state': self._info_state,
+            'server_info_age_s': round(now - self._info_at, 1) if self._info_at is not None else None,
+            'server': self.info
+        }
+
+    def _refresh_info(self):
+        try:
+            self.info = json.loads(self._call(INFO, 0, timeout=INFO_TIMEOUT_SECONDS))
+            self._info_at = time.monotonic()
+            self._info_state = 'reachable'
+        except ModelServerError as e:
+            if self._info_state != 'unreachable':
+                logger.warning(f"⚠️ Model server did not answer INFO: {str(e)}")
+            self._info_state = 'unreachable'
+        finally:
+            with self._info_lock:
+                self._info_checked_at = time.monotonic()
+                self._info_refreshing = False
+
+
+if __name__ == '__main__':
+    # python -m app.model_server
+    from app.logging_config import configure_logging
+
+    configure_logging()
+    server = ModelServer.from_config()
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: server.stop())
+    server.serve_forever()
@@ -17,6 +17,8 @@ class Conversation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     feedback = db.Column(db.String(50), nullable=True)
     processing_time = db.Column(db.Float, nullable=True)
+    cache_hit = db.Column(db.Boolean, nullable=False, default=False)
+    model_version = db.Column(db.String(64), nullable=True)
     
     def __repr__(self):
         return f'<Conversation {self.id} - {self.prediction} ({self.confidence:.2%})>'
@@ -32,7 +34,9 @@ class Conversation(db.Model):
             'confidence': self.confidence,
             'created_at': self.created_at.isoformat(),
             'feedback': self.feedback,
-            'processing_time': self.processing_time
+            'processing_time': self.processing_time,
+            'cache_hit': self.cache_hit,
+            'model_version': self.model_version
         }
 
 def verify_database(app):
@@ -57,7 +61,9 @@ def verify_database(app):
             # Check for required columns and add if missing
             required_columns = {
                 'edited_prediction': 'VARCHAR(50) NULL',
-                'input_type': 'VARCHAR(10) NOT NULL DEFAULT "text"'
+                'input_type': 'VARCHAR(10) NOT NULL DEFAULT "text"',
+                'cache_hit': 'BOOLEAN NOT NULL DEFAULT 0',
+                'model_version': 'VARCHAR(64) NULL'
             }
             
             for col_name, col_type in required_columns.items():
@@ -0,0 +1,170 @@
+"""Pure-NumPy forward pass for the Embedding -> LSTM -> LSTM -> Dense classifier.
+
+Lets a web worker serve the trained model without importing TensorFlow.
+Weights are exported once (see ``export_weights``) to an uncompressed .npz
+whose members can be memory-mapped, so forked workers share the pages.
+"""
+import logging
+import sys
+import time
+import zipfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EXPECTED_LAYERS = ['Embedding', 'LSTM', 'LSTM', 'Dense']
+VERIFY_TOLERANCE = 1e-4
+
+
+def _sigmoid(x):
+    # tanh form is numerically stable for large |x| and matches Keras' sigmoid
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def export_weights(model, path):
+    """Write the trained classifier's weights to a flat, memory-mappable .npz"""
+    layers = [layer for layer in model.layers if layer.get_weights()]  # Dropout has none
+    kinds = [type(layer).__name__ for layer in layers]
+    if kinds != EXPECTED_LAYERS:
+        raise ValueError(f"Unsupported architecture {kinds}, expected {EXPECTED_LAYERS}")
+
+    embedding, lstm_1, lstm_2, dense = layers
+    arrays = {'embedding': embedding.get_weights()[0]}
+    for name, layer in (('lstm_1', lstm_1), ('lstm_2', lstm_2)):
+        kernel, recurrent_kernel, bias = layer.get_weights()
+        arrays[f'{name}_kernel'] = kernel
+        arrays[f'{name}_recurrent_kernel'] = recurrent_kernel
+        arrays[f'{name}_bias'] = bias
+    arrays['dense_kernel'], arrays['dense_bias'] = dense.get_weights()
+
+    # np.savez stores members uncompressed, which is what makes them mmap-able
+    np.savez(path, **{name: np.ascontiguousarray(a, dtype=np.float32) for name, a in arrays.items()})
+    return path
+
+
+def load_weights(path, mmap=True):
+    """Load exported weights, memory-mapping each member of the .npz when possible"""
+    if not mmap:
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    weights = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} is compressed and cannot be memory-mapped")
+            # Skip the zip local header (30 bytes + name + extra) to reach the .npy payload
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype='<u2')
+            f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            major, _ = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+            weights[info.filename[:-len('.npy')]] = np.memmap(
+                path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                order='F' if fortran_order else 'C'
+            )
+    return weights
+
+
+class NumpyLSTMClassifier:
+    """Vectorized batch inference over exported classifier weights"""
+
+    def __init__(self, weights):
+        self.embedding = weights['embedding']
+        self.lstm_1_recurrent = np.asarray(weights['lstm_1_recurrent_kernel'])
+        self.lstm_2_kernel = np.asarray(weights['lstm_2_kernel'])
+        self.lstm_2_recurrent = np.asarray(weights['lstm_2_recurrent_kernel'])
+        self.lstm_2_bias = np.asarray(weights['lstm_2_bias'])
+        self.dense_kernel = np.asarray(weights['dense_kernel'])
+        self.dense_bias = np.asarray(weights['dense_bias'])
+
+        # The first LSTM only ever sees embedding rows, so its input projection
+        # can be folded into a per-token lookup table: (vocab, 4 * units)
+        self.token_gates = (
+            np.asarray(self.embedding) @ np.asarray(weights['lstm_1_kernel'])
+            + np.asarray(weights['lstm_1_bias'])
+        ).astype(np.float32)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(load_weights(path, mmap=mmap))
+
+    @property
+    def vocab_size(self):
+        return self.embedding.shape[0]
+
+    @staticmethod
+    def _run_lstm(gate_inputs, recurrent_kernel, return_sequences):
+        """Unroll one LSTM layer over precomputed input projections of shape (T, N, 4 * units)"""
+        steps, batch, _ = gate_inputs.shape
+        units = recurrent_kernel.shape[0]
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((steps, batch, units), dtype=np.float32) if return_sequences else None
+
+        for t in range(steps):
+            z = gate_inputs[t] + h @ recurrent_kernel
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                outputs[t] = h
+        return outputs if return_sequences else h
+
+    def predict_batch(self, padded):
+        """Return P(true) for each row of an (N, T) int token array"""
+        ids = np.asarray(padded, dtype=np.int64)
+        if ids.ndim != 2:
+            raise ValueError(f"Expected a 2-D token array, got shape {ids.shape}")
+        if ids.size and (ids.min() < 0 or ids.max() >= self.vocab_size):
+            raise ValueError(f"Token ids must be in [0, {self.vocab_size})")
+
+        # Time-major layout keeps each timestep's slice contiguous
+        gates_1 = self.token_gates[ids.T]
+        hidden_1 = self._run_lstm(gates_1, self.lstm_1_recurrent, return_sequences=True)
+        gates_2 = hidden_1 @ self.lstm_2_kernel + self.lstm_2_bias
+        hidden_2 = self._run_lstm(gates_2, self.lstm_2_recurrent, return_sequences=False)
+        return _sigmoid(hidden_2 @ self.dense_kernel + self.dense_bias)[:, 0]
+
+
+def verify_against_keras(model, engine, padded, tolerance=VERIFY_TOLERANCE):
+    """Compare NumPy and Keras outputs on the same batch; returns the max absolute difference"""
+    reference = np.asarray(model.predict(padded, verbose=0))[:, 0]
+    candidate = engine.predict_batch(padded)
+    max_diff = float(np.max(np.abs(reference - candidate)))
+    if max_diff > tolerance:
+        raise AssertionError(f"NumPy engine deviates from Keras by {max_diff:.2e} (tolerance {tolerance:.0e})")
+    return max_diff
+
+
+def export_and_verify(model, path, sample_size=256, maxlen=150, seed=42):
+    """Export weights, reload them from disk and check numerical parity with Keras"""
+    export_weights(model, path)
+    engine = NumpyLSTMClassifier.load(path)
+
+    rng = np.random.default_rng(seed)
+    sample = rng.integers(0, engine.vocab_size, size=(sample_size, maxlen), dtype=np.int32)
+    # Include short, heavily padded rows like real headlines
+    for row in range(0, sample_size, 4):
+        sample[row, :rng.integers(maxlen // 2, maxlen)] = 0
+
+    max_diff = verify_against_keras(model, engine, sample)
+    return engine, max_diff
+
+
+if __name__ == '__main__':
+    # Usage: python -m app.numpy_inference [model.keras] [model_weights.npz]
+    from tensorflow.keras.models import load_model
+
+    model_file = sys.argv[1] if len(sys.argv) > 1 else 'saved_model/true_fake_news_classifier.keras'
+    weights_file = sys.argv[2] if len(sys.argv) > 2 else 'saved_model/model_weights.npz'
+
+    start = time.time()
+    engine, max_diff = export_and_verify(load_model(model_file, compile=False), weights_file)
+    print(f"Exported {weights_file} in {(time.time()-start)*1000:.2f}ms "
+          f"(max |keras - numpy| = {max_diff:.2e})")
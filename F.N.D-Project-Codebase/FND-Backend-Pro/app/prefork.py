@@ -0,0 +1,406 @@
+"""Pre-forking production server: build the app and load the model once, serve from forked workers.
+
+`python serve.py` builds the Flask app, loads and warms up the model in a
+master process, then fork()s SERVE_WORKERS workers that accept connections
+on the master's listening socket. Model weights, the tokenizer and every
+other object created before the fork are shared with the workers
+copy-on-write; gc.freeze() keeps the collector from writing to (and so
+copying) those pages. State that cannot cross a fork (threads, SQLite
+connections, the log listener) is rebuilt in each child by the
+os.register_at_fork hooks of the modules that own it. Backends that keep
+runtime threads (keras, 'auto', multi-threaded tflite) cannot be preloaded:
+the master swaps them for numpy (verified against keras when it was
+exported) or single-threaded tflite when the active model has those
+artifacts, and refuses to start otherwise. SERVE_PRELOAD=false loads the
+configured backend in every worker instead. A few seconds after startup the
+master logs each worker's RSS against its own, to show the sharing works.
+
+A worker exits gracefully after SERVE_MAX_REQUESTS requests (plus up to
+SERVE_MAX_REQUESTS_JITTER) or on SIGTERM: it stops accepting, gives in-flight
+requests SERVE_GRACEFUL_TIMEOUT seconds and the master forks a replacement
+from the preloaded state. SIGHUP recycles every worker that way; SIGTERM or
+SIGINT stops the server. The master logs each worker's RSS, PSS and
+shared/private memory every SERVE_STATS_INTERVAL seconds, and /health
+reports the answering worker's own.
+
+Background jobs run in worker 0 only; /health and /metrics describe the
+worker that answered. Unix only (fork); use run.py for development.
+"""
+import gc
+import logging
+import mmap
+import os
+import random
+import signal
+import socket
+import struct
+import threading
+import time
+
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+COUNTER = struct.Struct('Q')
+CRASH_BACKOFF_SECONDS = 1.0  # Respawn delay for a worker that died right after starting
+STARTUP_REPORT_SECONDS = 5.0  # When to log the first worker vs master memory comparison
+
+
+def process_memory(pid='self'):
+    """RSS, PSS and shared/private memory of a process in MB (None without /proc)"""
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                parts = value.split()
+                if len(parts) == 2 and parts[1] == 'kB':
+                    fields[name] = int(parts[0])
+    except OSError:
+        return None
+    return {
+        'rss_mb': round(fields.get('Rss', 0) / 1024, 1),
+        'pss_mb': round(fields.get('Pss', 0) / 1024, 1),
+        'shared_mb': round((fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)) / 1024, 1),
+        'private_mb': round((fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024, 1)
+    }
+
+
+class _RequestCounter:
+    """WSGI middleware counting requests; calls on_limit when the limit is reached"""
+
+    def __init__(self, app, limit, on_limit, publish):
+        self.app = app
+        self.limit = limit
+        self.on_limit = on_limit
+        self.publish = publish
+        self.served = 0
+        self.active = 0
+        self._idle = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        with self._idle:
+            self.active += 1
+            self.served += 1
+            served = self.served
+        self.publish(served)
+        if self.limit and served == self.limit:
+            self.on_limit()  # This request still completes
+        try:
+            # Streamed bodies count as in flight until the server closes them
+            return ClosingIterator(self.app(environ, start_response), self._finished)
+        except BaseException:
+            self._finished()
+            raise
+
+    def _finished(self):
+        with self._idle:
+            self.active -= 1
+            if not self.active:
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout):
+        with self._idle:
+            return self._idle.wait_for(lambda: self.active == 0, timeout)
+
+
+class WorkerStatus:
+    """The serving process, as reported by /health"""
+
+    def __init__(self):
+        self.mode = 'development'
+        self.slot = None
+        self.max_requests = None
+        self.counter = None
+
+    def start(self, slot, max_requests, counter):
+        self.mode = 'prefork'
+        self.slot = slot
+        self.max_requests = max_requests
+        self.counter = counter
+
+    def get_stats(self):
+        stats = {'mode': self.mode, 'pid': os.getpid(), 'memory': process_memory()}
+        if self.counter is not None:
+            stats.update(worker=self.slot, requests_served=self.counter.served,
+                         in_flight=self.counter.active, max_requests=self.max_requests or None)
+        return stats
+
+
+worker_status = WorkerStatus()
+
+
+class PreforkServer:
+    """Master process: preloads the app, forks and supervises the workers"""
+
+    def __init__(self, app_factory, host='0.0.0.0', port=5000, workers=0, preload=True, max_requests=10000,
+                 max_requests_jitter=1000, graceful_timeout=30, stats_interval=300, jobs=True, backlog=2048):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.preload = preload
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.stats_interval = stats_interval
+        self.jobs = jobs
+        self.backlog = backlog
+
+        self.app = None
+        self.socket = None
+        self._slots = {}  # slot -> pid
+        self._children = {}  # pid -> slot
+        self._started = {}  # slot -> fork time
+        self._respawn_at = {}  # slot -> earliest respawn after a crash
+        self._served = None  # Shared page of per-slot request counters
+        self._stopping = False
+        self._recycle_all = False
+
+    @classmethod
+    def from_config(cls, app_factory):
+        return cls(
+            app_factory,
+            host=Config.SERVE_HOST,
+            port=Config.SERVE_PORT,
+            workers=Config.SERVE_WORKERS,
+            preload=Config.SERVE_PRELOAD,
+            max_requests=Config.SERVE_MAX_REQUESTS,
+            max_requests_jitter=Config.SERVE_MAX_REQUESTS_JITTER,
+            graceful_timeout=Config.SERVE_GRACEFUL_TIMEOUT,
+            stats_interval=Config.SERVE_STATS_INTERVAL,
+            jobs=Config.JOBS_ENABLED
+        )
+
+    def run(self):
+        """Preload, bind, fork the workers and supervise them until SIGTERM/SIGINT"""
+        if not hasattr(os, 'fork'):
+            raise RuntimeError("The pre-forking server needs fork(); use run.py on this platform")
+        if self.preload:
+            self._select_preload_backend()
+            logger.info(f"🧠 Preloading the app and the {Config.INFERENCE_BACKEND} model...")
+            self.app = self._load()
+        self.socket = self._bind()
+        self._served = mmap.mmap(-1, COUNTER.size * self.workers)  # Anonymous and shared with the children
+
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_recycle)
+
+        # Move everything loaded so far out of the collector's reach so workers don't copy it
+        gc.collect()
+        gc.freeze()
+        for slot in range(self.workers):
+            self._spawn(slot)
+        logger.info(f"🚀 Serving on http://{self.host}:{self.port} with {self.workers} worker(s) "
+                    f"({'model preloaded in the master' if self.preload else 'model loaded per worker'})")
+        self._supervise()
+
+    def _select_preload_backend(self):
+        """Make INFERENCE_BACKEND one the master can load and share with its workers
+
+        Decided before anything is loaded: once the master holds a keras model it is too late.
+        """
+        from app.inference_backends import BACKENDS, options_from_config, preload_safe
+        from app.model_registry import ModelRegistry
+
+        options = options_from_config(Config)
+        if preload_safe(Config.INFERENCE_BACKEND, options):
+            return
+        _, model_dir = ModelRegistry(Config.MODEL_PATH).resolve()
+        for name, overrides in (('numpy', {}), ('tflite', {'num_threads': 1})):
+            if BACKENDS[name](model_dir, **dict(options, **overrides)).is_available():
+                logger.warning(f"⚠️ INFERENCE_BACKEND={Config.INFERENCE_BACKEND} cannot be shared with forked "
+                               f"workers; preloading the {name} backend instead")
+                Config.INFERENCE_BACKEND = name
+                if name == 'tflite':
+                    Config.TFLITE_NUM_THREADS = 1
+                return
+        raise RuntimeError(
+            f"INFERENCE_BACKEND={Config.INFERENCE_BACKEND} cannot be preloaded and shared with forked workers, and "
+            f"the model in {model_dir} has no numpy weights or tflite export to use instead. Export them "
+            "(python -m app.numpy_inference, or the tflite export in FND-Model.py), use INFERENCE_BACKEND=server "
+            "with a model server, or set SERVE_PRELOAD=false to load a copy of the model in every worker"
+        )
+
+    def _load(self):
+        app = self.app_factory()
+        from app import db
+        from app.ai_service import ai_service
+
+        model = ai_service.model
+        if not model.fork_safe:
+            raise RuntimeError(
+                f"The {model.name} backend keeps runtime threads in the process that loaded it and cannot be "
+                "shared with forked workers; use INFERENCE_BACKEND=numpy (or tflite with TFLITE_NUM_THREADS=1), "
+                "INFERENCE_BACKEND=server with a model server, or SERVE_PRELOAD=false to load it in every worker"
+            )
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()  # Workers open their own database connections
+        return app
+
+    def _bind(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        # Every worker polls this socket; non-blocking so the ones that lose an accept() race move on
+        sock.setblocking(False)
+        return sock
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _request_recycle(self, signum, frame):
+        self._recycle_all = True
+
+    def _spawn(self, slot):
+        COUNTER.pack_into(self._served, slot * COUNTER.size, 0)
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = self._worker_main(slot)
+            except BaseException:
+                logger.exception(f"❌ Worker {slot} failed")
+            finally:
+                os._exit(code)
+        self._slots[slot] = pid
+        self._children[pid] = slot
+        self._started[slot] = time.time()
+
+    def _worker_main(self, slot):
+        # Ctrl+C reaches the whole process group; the master decides what happens
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        app = self.app or self.app_factory()
+
+        stopping = threading.Event()
+        server = None
+
+        def stop():
+            if not stopping.is_set():
+                stopping.set()
+                # shutdown() blocks until serve_forever() returns, so not on a request thread
+                threading.Thread(target=server.shutdown, name='worker-shutdown', daemon=True).start()
+
+        limit = self.max_requests + random.randint(0, self.max_requests_jitter) if self.max_requests else 0
+        counter = _RequestCounter(app, limit, stop,
+                                  lambda served: COUNTER.pack_into(self._served, slot * COUNTER.size, served))
+        server = make_server(self.host, self.port, counter, threaded=True, fd=self.socket.fileno())
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop())
+        worker_status.start(slot, limit, counter)
+
+        from app.jobs import job_runner
+        if self.jobs and slot == 0:
+            from app import routes
+            routes.start_job_runner(app)
+        logger.info(f"👷 Worker {slot} (pid {os.getpid()}) ready"
+                    + (f", recycling after {limit} requests" if limit else ""))
+
+        server.serve_forever()
+        if not counter.wait_idle(self.graceful_timeout):
+            logger.warning(f"⚠️ Worker {slot} exiting with {counter.active} request(s) still in flight")
+        job_runner.stop()  # Claimed items are released to the next worker 0 by their lease
+        logger.info(f"♻️ Worker {slot} (pid {os.getpid()}) exiting after {counter.served} requests")
+        from app.logging_config import shutdown_logging
+        shutdown_logging()  # os._exit skips atexit; flush the log queue first
+        return 0
+
+    def _supervise(self):
+        startup_report = time.time() + STARTUP_REPORT_SECONDS
+        next_report = time.time() + self.stats_interval if self.stats_interval else None
+        while not self._stopping:
+            self._reap()
+            if self._recycle_all:
+                self._recycle_all = False
+                logger.info("🔁 SIGHUP: recycling all workers")
+                self._signal_workers(signal.SIGTERM)
+            now = time.time()
+            for slot in range(self.workers):
+                if slot not in self._slots and now >= self._respawn_at.get(slot, 0):
+                    self._spawn(slot)
+            if startup_report is not None and now >= startup_report:
+                startup_report = None
+                self.log_memory()
+            if next_report is not None and now >= next_report:
+                self.log_memory()
+                next_report = now + self.stats_interval
+            time.sleep(0.2)
+        self._shutdown()
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot = self._children.pop(pid, None)
+            if slot is None:
+                continue
+            del self._slots[slot]
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0:
+                logger.warning(f"⚠️ Worker {slot} (pid {pid}) exited with code {code}")
+                if time.time() - self._started[slot] < CRASH_BACKOFF_SECONDS:
+                    self._respawn_at[slot] = time.time() + CRASH_BACKOFF_SECONDS
+
+    def _signal_workers(self, signum):
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _shutdown(self):
+        logger.info("🛑 Stopping workers...")
+        self._signal_workers(signal.SIGTERM)
+        deadline = time.time() + self.graceful_timeout + 5
+        while self._children and time.time() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        if self._children:
+            logger.warning(f"⚠️ Killing {len(self._children)} worker(s) that did not exit in time")
+            self._signal_workers(signal.SIGKILL)
+            while self._children:
+                self._reap()
+                time.sleep(0.05)
+        self.socket.close()
+        logger.info("👋 Server stopped")
+
+    def get_stats(self):
+        """Memory and requests served per process (the master first)"""
+        processes = [{'process': 'master', 'pid': os.getpid(), 'memory': process_memory()}]
+        for slot, pid in sorted(self._slots.items()):
+            processes.append({
+                'process': f'worker {slot}',
+                'pid': pid,
+                'requests_served': COUNTER.unpack_from(self._served, slot * COUNTER.size)[0],
+                'memory': process_memory(pid)
+            })
+        return processes
+
+    def log_memory(self):
+        processes = self.get_stats()
+        master = processes[0]['memory'] or {}
+        logger.info("\n📊 Per-process memory (MB):")
+        for entry in processes:
+            memory = entry['memory'] or {}
+            served = f", {entry['requests_served']} requests" if 'requests_served' in entry else ''
+            # A worker sharing the preloaded model copy-on-write stays mostly 'shared' with private well below the master's RSS
+            versus = (f", private {memory['private_mb'] / master['rss_mb']:.0%} of master rss"
+                      if entry is not processes[0] and memory and master.get('rss_mb') else '')
+            logger.info(f"   ├── {entry['process']} (pid {entry['pid']}): rss {memory.get('rss_mb')} "
+                        f"= shared {memory.get('shared_mb')} + private {memory.get('private_mb')}, "
+                        f"pss {memory.get('pss_mb')}{versus}{served}")
+        if all(entry['memory'] for entry in processes):
+            rss = sum(entry['memory']['rss_mb'] for entry in processes)
+            pss = sum(entry['memory']['pss_mb'] for entry in processes)
+            logger.info(f"   └── Total: {pss:.1f}MB actually used (PSS) vs {rss:.1f}MB summed RSS")
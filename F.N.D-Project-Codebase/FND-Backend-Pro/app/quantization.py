@@ -0,0 +1,159 @@
+"""Export quantized (int8 / float16) TFLite variants of the classifier and report their trade-offs.
+
+int8 uses dynamic-range quantization: Embedding, LSTM and Dense weights are
+stored as int8 and dequantized on the fly, activations stay float. float16
+halves weight storage with almost no accuracy loss. The report compares each
+variant against the float Keras model on the held-out test split.
+"""
+import glob
+import json
+import logging
+import os
+import statistics
+import time
+
+import numpy as np
+
+from app.compiled_inference import CompiledKerasModel
+from app.tflite_inference import TFLITE_MODEL_FILE, TFLiteClassifier
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ('int8', 'float16')
+DEFAULT_BUCKETS = (1, 8, 32)
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None when it cannot be measured"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def convert_to_tflite(model, mode, buckets=DEFAULT_BUCKETS, sequence_length=150):
+    """Convert the Keras model into one TFLite model with a batch_<n> signature per bucket
+
+    The LSTMs only lower to builtin ops with a static batch dimension, so a
+    single dynamic-batch export is not possible without the Flex delegate.
+    Frozen per-bucket functions converted together still share one copy of
+    the weight buffers; only the small batch-shaped tensors are repeated.
+    """
+    import tensorflow as tf
+    from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}', expected one of {QUANTIZATION_MODES}")
+
+    functions = []
+    for bucket in buckets:
+        serve = tf.function(lambda tokens: {'probability': model(tokens, training=False)})
+        frozen = convert_variables_to_constants_v2(
+            serve.get_concrete_function(tf.TensorSpec([bucket, sequence_length], tf.int32, name='tokens')))
+        frozen.graph.name = f'batch_{bucket}'  # Becomes the signature key
+        functions.append(frozen)
+
+    # A trackable object is what lets the converter take more than one function
+    converter = tf.lite.TFLiteConverter.from_concrete_functions(functions, tf.Module())
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def export_quantized_model(model, output_dir, mode, buckets=DEFAULT_BUCKETS, sequence_length=150):
+    """Write the multi-signature model to output_dir/model.tflite, replacing per-bucket files of older exports"""
+    os.makedirs(output_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(output_dir, 'batch_*.tflite')):
+        os.remove(stale)
+    with open(os.path.join(output_dir, TFLITE_MODEL_FILE), 'wb') as f:
+        f.write(convert_to_tflite(model, mode, buckets, sequence_length))
+    return output_dir
+
+
+def _latency_ms(predict_fn, sequence_length, batch_sizes, repeats=20):
+    """Median per-batch latency for each batch size"""
+    rng = np.random.default_rng(0)
+    latencies = {}
+    for batch_size in batch_sizes:
+        batch = rng.integers(1, 8000, size=(batch_size, sequence_length), dtype=np.int32)
+        predict_fn(batch)  # Warmup
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict_fn(batch)
+            samples.append((time.perf_counter() - start) * 1000)
+        latencies[str(batch_size)] = round(statistics.median(samples), 3)
+    return latencies
+
+
+def _score(probabilities, y_test):
+    predictions = (np.asarray(probabilities) > 0.5).astype('int32')
+    return float(np.mean(predictions == np.asarray(y_test).astype('int32')))
+
+
+def build_quantization_report(model, model_file, variant_dirs, X_test, y_test,
+                              batch_sizes=DEFAULT_BUCKETS, num_threads=None):
+    """Compare each quantized variant with the float model on accuracy, size, RSS and latency"""
+    sequence_length = X_test.shape[1]
+    # Time the float model the way AIService serves it, not through eager calls
+    compiled = CompiledKerasModel(model, buckets=batch_sizes, sequence_length=sequence_length)
+    compiled.warmup()
+    keras_predict = compiled.predict_batch
+
+    reference = keras_predict(X_test)
+    report = {
+        'test_samples': int(len(X_test)),
+        'float': {
+            'file': str(model_file),
+            'size_bytes': os.path.getsize(model_file),
+            'accuracy': _score(reference, y_test),
+            'process_rss_bytes': current_rss_bytes(),
+            'latency_ms': _latency_ms(keras_predict, sequence_length, batch_sizes)
+        },
+        'variants': {}
+    }
+
+    for mode, variant_dir in variant_dirs.items():
+        # XNNPACK packs weights on the first invoke, so warm up before measuring what loading cost
+        rss_before = current_rss_bytes()
+        classifier = TFLiteClassifier(variant_dir, num_threads=num_threads)
+        classifier.warmup()
+        rss_after = current_rss_bytes()
+
+        probabilities = classifier.predict_batch(X_test)
+        accuracy = _score(probabilities, y_test)
+        report['variants'][mode] = {
+            'directory': str(variant_dir),
+            'size_bytes': classifier.size_bytes,
+            'buckets': classifier.buckets,
+            'accuracy': accuracy,
+            'accuracy_delta': accuracy - report['float']['accuracy'],
+            'agreement_with_float': float(np.mean((probabilities > 0.5) == (reference > 0.5))),
+            'max_abs_diff': float(np.max(np.abs(probabilities - reference))),
+            'rss_delta_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            'latency_ms': _latency_ms(classifier.predict_batch, sequence_length, batch_sizes)
+        }
+    return report
+
+
+def export_quantized_artifacts(model, model_dir, model_file, X_test, y_test,
+                               modes=QUANTIZATION_MODES, buckets=DEFAULT_BUCKETS):
+    """Export every quantization mode next to the float model and write quantization_report.json"""
+    variant_dirs = {}
+    for mode in modes:
+        start = time.time()
+        variant_dirs[mode] = export_quantized_model(model, os.path.join(model_dir, f'tflite_{mode}'), mode, buckets)
+        logger.info(f"✅ Exported {mode} TFLite variant in {(time.time()-start)*1000:.2f}ms")
+
+    report = build_quantization_report(model, model_file, variant_dirs, X_test, y_test, batch_sizes=buckets)
+    report_path = os.path.join(model_dir, 'quantization_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report, report_path
@@ -0,0 +1,303 @@
+"""Per-client token-bucket rate limiting.
+
+Clients are identified by their X-API-Key (hashed) when it is one of the
+issued API_KEYS, otherwise by their IP address: the socket peer, or with
+RATE_LIMIT_PROXY_HOPS proxies in front, the address the outermost proxy saw
+(clients can prepend anything they like to X-Forwarded-For). Each client gets
+one bucket per budget: 'text' for cheap text predictions and 'expensive' for
+URL fetches and file uploads, so a scraper submitting URLs runs out long
+before it can tie up the fetchers and the model. A bucket holds up to `burst`
+tokens and refills at `per_minute` / 60 per second; a request takes one token
+or is answered 429 with Retry-After.
+
+Checking a limit is one keyed read-modify-write in the bucket store:
+
+- memory: per process (each prefork worker counts separately), bounded LRU;
+- sqlite: one file shared by every worker on the host;
+- redis: any Redis-compatible server (Redis, Valkey, KeyDB...) through a
+  Lua script, shared across hosts; needs the optional `redis` package.
+
+A store that fails (locked database, unreachable server) lets the request
+through rather than turning an outage of the limiter into one of the API.
+"""
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import time
+import weakref
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+
+from flask import make_response, request
+
+from app.metrics import RATE_LIMITED
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKENDS = ('memory', 'sqlite', 'redis')
+
+
+class Budget:
+    """Bucket size and refill rate for one class of requests"""
+
+    __slots__ = ('name', 'per_minute', 'burst', 'rate')
+
+    def __init__(self, name, per_minute, burst):
+        self.name = name
+        self.per_minute = per_minute
+        self.burst = max(1, int(burst))
+        self.rate = per_minute / 60.0  # Tokens per second
+
+    def describe(self):
+        return {'per_minute': self.per_minute, 'burst': self.burst}
+
+
+def _take(tokens, updated, now, budget, cost):
+    """Refill a bucket to `now` and take `cost` tokens if it has them; returns (allowed, tokens left)"""
+    tokens = min(budget.burst, tokens + max(0.0, now - updated) * budget.rate)
+    if tokens >= cost:
+        return True, tokens - cost
+    return False, tokens
+
+
+class MemoryBucketStore:
+    """Buckets in this process, forgetting the least recently seen clients beyond max_keys"""
+
+    name = 'memory'
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max(1, int(max_keys))
+        self._buckets = OrderedDict()  # key -> [tokens, updated]
+        self._lock = Lock()
+
+    def take(self, key, budget, cost, now):
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                state = self._buckets[key] = [float(budget.burst), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)  # Forgotten buckets come back full
+            else:
+                self._buckets.move_to_end(key)
+            allowed, state[0] = _take(state[0], state[1], now, budget, cost)
+            state[1] = now
+            return allowed, state[0]
+
+    def get_stats(self):
+        return {'clients_tracked': len(self._buckets), 'max_keys': self.max_keys}
+
+
+_open_stores = weakref.WeakSet()
+
+
+def _reopen_after_fork():
+    """An SQLite connection must not be used on both sides of a fork; children open their own"""
+    for store in list(_open_stores):
+        store._lock = Lock()
+        store._connect()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+class SQLiteBucketStore:
+    """Buckets in an SQLite file shared by every worker process on the host"""
+
+    name = 'sqlite'
+    PRUNE_INTERVAL = 1000  # Delete idle (therefore full) buckets every N checks
+
+    def __init__(self, path, idle_seconds=3600):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._checks = 0
+        self._lock = Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect()
+        _open_stores.add(self)
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=1.0)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS buckets ('
+                           'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def take(self, key, budget, cost, now):
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so the read-modify-write is atomic across processes
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens, updated = row if row is not None else (float(budget.burst), now)
+                allowed, tokens = _take(tokens, updated, now, budget, cost)
+                self._conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                                   (key, tokens, now))
+                self._checks += 1
+                if self._checks % self.PRUNE_INTERVAL == 0:
+                    self._conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self.idle_seconds,))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            return allowed, tokens
+
+    def get_stats(self):
+        with self._lock:
+            clients = self._conn.execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+        return {'path': self.path, 'buckets': clients}
+
+
+# KEYS[1] = bucket; ARGV = rate per second, burst, cost, now. Returns {allowed, tokens left}.
+TOKEN_BUCKET_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Buckets on a Redis-compatible server, updated atomically by a server-side script"""
+
+    name = 'redis'
+
+    def __init__(self, url, prefix='fnd:ratelimit:'):
+        try:
+            import redis  # type: ignore
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package (pip install redis)")
+        self.url = url
+        self.prefix = prefix
+        # redis-py reopens its pooled connections in forked workers by itself
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def take(self, key, budget, cost, now):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[budget.rate, budget.burst, cost, now])
+        return bool(allowed), float(tokens)
+
+    def get_stats(self):
+        return {'url': self.url.split('@')[-1]}  # Without credentials
+
+
+class RateLimiter:
+    """Per-client token buckets, one per budget"""
+
+    def __init__(self, store, budgets, enabled=True, proxy_hops=0, api_keys=()):
+        self.store = store
+        self.budgets = {budget.name: budget for budget in budgets}
+        self.enabled = enabled
+        self.proxy_hops = max(0, int(proxy_hops))
+        self.api_keys = frozenset(api_keys)
+        self._lock = Lock()
+        self.counters = {name: {'allowed': 0, 'limited': 0} for name in self.budgets}
+        self.store_errors = 0
+
+    @classmethod
+    def from_config(cls):
+        budgets = [
+            Budget('text', Config.RATE_LIMIT_TEXT_PER_MINUTE, Config.RATE_LIMIT_TEXT_BURST),
+            Budget('expensive', Config.RATE_LIMIT_EXPENSIVE_PER_MINUTE, Config.RATE_LIMIT_EXPENSIVE_BURST)
+        ]
+        backend = Config.RATE_LIMIT_BACKEND
+        if backend == 'memory':
+            store = MemoryBucketStore(Config.RATE_LIMIT_MAX_CLIENTS)
+        elif backend == 'sqlite':
+            # A bucket untouched for burst / rate seconds is full again, so its row can go
+            idle_seconds = max((b.burst / b.rate for b in budgets if b.rate > 0), default=3600)
+            store = SQLiteBucketStore(Config.RATE_LIMIT_SQLITE_PATH, idle_seconds=idle_seconds)
+        elif backend == 'redis':
+            store = RedisBucketStore(Config.RATE_LIMIT_REDIS_URL)
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{backend}', expected one of {', '.join(RATE_LIMIT_BACKENDS)}")
+        return cls(store, budgets, enabled=Config.RATE_LIMIT_ENABLED, proxy_hops=Config.RATE_LIMIT_PROXY_HOPS,
+                   api_keys=Config.API_KEYS)
+
+    def client_key(self, req):
+        """'key:<hash>' for an issued API key, else 'ip:<address>'
+
+        Unknown keys fall back to the IP, so inventing keys does not buy fresh buckets.
+        """
+        api_key = req.headers.get('X-API-Key')
+        if api_key and api_key in self.api_keys:
+            return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:24]
+        return f'ip:{self.client_ip(req)}'
+
+    def client_ip(self, req):
+        """The socket peer, or the address our outermost trusted proxy received the request from"""
+        if self.proxy_hops:
+            # Each proxy appends the address it saw; entries left of those are whatever the client sent
+            forwarded = [hop.strip() for hop in req.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+            if len(forwarded) >= self.proxy_hops:
+                return forwarded[-self.proxy_hops]
+        return req.remote_addr
+
+    def check(self, client, budget_name, cost=1):
+        """Take tokens for one request; returns (allowed, budget, tokens left, retry after seconds)"""
+        budget = self.budgets[budget_name]
+        try:
+            allowed, tokens = self.store.take(f'{budget_name}:{client}', budget, cost, time.time())
+        except Exception as e:
+            with self._lock:
+                self.store_errors += 1
+            logger.warning(f"⚠️ Rate limit store ({self.store.name}) failed, allowing request: {str(e)}")
+            return True, budget, None, 0
+        with self._lock:
+            self.counters[budget_name]['allowed' if allowed else 'limited'] += 1
+        if allowed:
+            return True, budget, tokens, 0
+        RATE_LIMITED.inc(budget=budget_name)
+        retry_after = math.ceil((cost - tokens) / budget.rate) if budget.rate > 0 else 60
+        return False, budget, tokens, max(1, retry_after)
+
+    def get_stats(self):
+        with self._lock:
+            counters = {name: dict(values) for name, values in self.counters.items()}
+        return {
+            'enabled': self.enabled,
+            'backend': self.store.name,
+            'proxy_hops': self.proxy_hops,
+            'api_keys': len(self.api_keys),
+            'budgets': {name: {**budget.describe(), **counters[name]} for name, budget in self.budgets.items()},
+            'store_errors': self.store_errors,
+            'store': self.store.get_stats()
+        }
+
+
+rate_limiter = RateLimiter.from_config()
+
+
+def rate_limited(classify, on_limited):
+    """View decorator: charge the request to the client's classify() budget before running the view
+
+    on_limited(budget, retry_after) builds the 429 response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not rate_limiter.enabled or request.method == 'OPTIONS':
+                return view(*args, **kwargs)
+            allowed, budget, tokens, retry_after = rate_limiter.check(rate_limiter.client_key(request), classify())
+            response = make_response(view(*args, **kwargs) if allowed else on_limited(budget, retry_after))
+            response.headers['X-RateLimit-Limit'] = str(budget.burst)
+            if tokens is not None:
+                response.headers['X-RateLimit-Remaining'] = str(int(tokens))
+            if not allowed:
+                response.headers['Retry-After'] = str(retry_after)
+            return response
+        return wrapper
+    return decorator
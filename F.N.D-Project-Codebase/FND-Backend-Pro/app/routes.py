@@ -1,18 +1,28 @@
 import sys
 import os
-from flask import Blueprint, request, jsonify, Response
-from bs4 import BeautifulSoup  # type: ignore
-import requests  # type: ignore
-import PyPDF2
-import docx
-import io
+from flask import Blueprint, request, jsonify, Response, current_app, g, stream_with_context
 from app.models import Conversation
 from app import db
+from app.admission import DeadlineExceeded, admission, admission_controlled, stage_budget
 from app.ai_service import ai_service
+from app.article_fetcher import ArticleFetchError, article_fetcher
+from app.document_parser import DocumentParseError, document_parser
+from app.jobs import JobError, items_from_json, job_runner, store_uploaded_files
+from app.logging_config import annotate_request, begin_request, verbose_logging
+from app.metrics import (CACHE_HITS, CONTENT_TYPE_LATEST, PREDICTION_ERRORS, PREDICTIONS, REQUEST_SECONDS,
+                         REQUESTS_IN_FLIGHT, STAGE_SECONDS, registry)
+from app.prefork import worker_status
+from app.rate_limit import rate_limited, rate_limiter
+from app.uploads import check_upload_size, current_rss_mb, describe_upload, read_text_upload, upload_stats
+from config import Config
+from werkzeug.exceptions import RequestEntityTooLarge
 import logging
 from datetime import datetime, timedelta
 from sqlalchemy import extract, func
 import time
+import hmac
+import json
+import zipfile
 from threading import Lock
 
 bp = Blueprint('routes', __name__)
@@ -22,6 +32,27 @@ logger = logging.getLogger(__name__)
 sse_clients = []
 sse_lock = Lock()
 
+def _parse_flag(value):
+    """Interpret a JSON bool or form string as a flag (None when absent)"""
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def _notify_sse_clients():
+    """Tell dashboard listeners that new predictions were stored"""
+    with STAGE_SECONDS.time(stage='sse_notify'), sse_lock:
+        for client in sse_clients[:]:  # Copy to avoid modification during iteration
+            try:
+                client.put("data: new_prediction\n\n")
+            except:
+                sse_clients.remove(client)  # Remove disconnected client
+
+def _record_prediction(input_type, result):
+    """Count one stored prediction for /metrics"""
+    PREDICTIONS.inc(input_type=input_type, label=result['label'])
+    if result['cache_hit']:
+        CACHE_HITS.inc()
+
 def _build_cors_preflight_response():
     response = jsonify({'status': 'success'})
     response.headers.add("Access-Control-Allow-Origin", "http://localhost:5173")
@@ -29,6 +60,90 @@ def _build_cors_preflight_response():
     response.headers.add("Access-Control-Allow-Methods", "*")
     return response
 
+def _overloaded_response(error):
+    """503 with Retry-After for a request shed by admission control (504 if its deadline ran out first)"""
+    status_code = error.status_code
+    PREDICTION_ERRORS.inc(input_type='unknown', status=status_code)
+    annotate_request(error=str(error))
+    response = jsonify({
+        'error': 'Server overloaded' if status_code == 503 else 'Prediction timed out',
+        'details': str(error),
+        'status': 'error'
+    })
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+    if status_code == 503:
+        response.headers['Retry-After'] = str(error.retry_after)
+    return response, status_code
+
+def _rate_limited_response(budget, retry_after):
+    """429 for a client that has used up its budget; rate_limited() adds Retry-After and X-RateLimit-*"""
+    annotate_request(error=f'rate limited ({budget.name})')
+    response = jsonify({
+        'error': 'Rate limit exceeded',
+        'details': f"Too many {budget.name} requests ({budget.per_minute:g}/min, burst {budget.burst}), "
+                   f"retry in {retry_after}s",
+        'status': 'error'
+    })
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+    return response, 429
+
+def _predict_budget():
+    """URL and file predictions spend the 'expensive' budget, text the 'text' one
+
+    Uploads are recognised by their Content-Type alone: touching request.files here would parse and
+    spool the body before the view's check_upload_size() gets to reject it.
+    """
+    if request.mimetype == 'multipart/form-data':
+        return 'expensive'
+    data = request.get_json(silent=True) if request.is_json else None
+    return 'expensive' if isinstance(data, dict) and 'url' in data else 'text'
+
+def _expensive_budget():
+    return 'expensive'
+
+def _extraction_limit(stage_max_chars, long_document):
+    """Characters worth fetching or parsing: no more than _truncate_content() will keep"""
+    long_document = Config.LONG_DOCUMENT_MODE if long_document is None else long_document
+    if long_document:
+        return stage_max_chars
+    return min(stage_max_chars, Config.MAX_TEXT_LENGTH) if stage_max_chars else Config.MAX_TEXT_LENGTH
+
+def _truncate_content(content, long_document, request_data):
+    """Keep the first MAX_TEXT_LENGTH characters before cleaning, tokenizing and inference
+
+    Long-document mode scores every window and is bounded by MAX_WINDOWS instead.
+    """
+    long_document = Config.LONG_DOCUMENT_MODE if long_document is None else long_document
+    if long_document or len(content) <= Config.MAX_TEXT_LENGTH:
+        return content
+    request_data['truncated_from'] = len(content)
+    return content[:Config.MAX_TEXT_LENGTH]
+
+@bp.before_app_request
+def _track_request_start():
+    g.metrics_endpoint = request.endpoint or 'unmatched'
+    g.metrics_start = time.perf_counter()
+    g.request_log = begin_request(request.method, request.path, g.metrics_endpoint,
+                                  request.headers.get('X-Request-ID', '')[:64] or None)
+    REQUESTS_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+@bp.after_app_request
+def _track_request_end(response):
+    endpoint, start = g.pop('metrics_endpoint', None), g.pop('metrics_start', None)
+    request_log = g.pop('request_log', None)
+    if endpoint is not None:
+        response.headers['X-Request-ID'] = request_log.fields['request_id']
+        def finish():
+            REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            request_log.finish(response.status_code)
+        if response.is_streamed:
+            # The server closes the response after its last byte, so /predict/batch counts in full
+            response.call_on_close(finish)
+        else:
+            finish()
+    return response
+
 @bp.route('/')
 def home():
     return """
@@ -36,13 +151,30 @@ def home():
     <p>Available endpoints:</p>
     <ul>
         <li>GET /health - System status</li>
+        <li>GET /metrics - Prometheus metrics (stage latencies, predictions, requests in flight)</li>
         <li>POST /predict - Submit text/file/URL for analysis</li>
+        <li>POST /predict/batch - Score a JSON array or NDJSON stream of texts (NDJSON results)</li>
+        <li>POST /jobs - Queue URLs, texts or a ZIP of documents for background screening</li>
+        <li>GET /jobs/&lt;id&gt; - Job progress and partial results</li>
         <li>POST /feedback - Provide feedback on predictions</li>
         <li>POST /change-feedback - Change feedback analysis</li>
         <li>POST /fetch-article - Extract article from URL</li>
+        <li>GET /admin/models - Model versions and reload state</li>
+        <li>POST /admin/reload - Load and swap in a model version</li>
     </ul>
     """
 
+@bp.app_errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    """413 for bodies over MAX_CONTENT_LENGTH, in the API's error format"""
+    response = jsonify({
+        'error': 'Request too large',
+        'details': e.description,
+        'status': 'error'
+    })
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+    return response, 413
+
 @bp.route('/health', methods=['GET', 'OPTIONS'])
 def health_check():
     if request.method == 'OPTIONS':
@@ -52,6 +184,13 @@ def health_check():
         'api': 'running',
         'database': 'ok',
         'model': ai_service.get_status(),
+        'article_fetcher': article_fetcher.get_stats(),
+        'document_parser': document_parser.get_stats(),
+        'uploads': upload_stats.get_stats(),
+        'jobs': job_runner.get_stats(),
+        'admission': admission.get_stats(),
+        'rate_limit': rate_limiter.get_stats(),
+        'server': worker_status.get_stats(),
         'timestamp': datetime.utcnow().isoformat(),
         'features': ['text_input', 'url_input', 'file_upload']
     }
@@ -59,7 +198,72 @@ def health_check():
     response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
     return response
 
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of the in-process metrics registry"""
+    return Response(registry.render(), content_type=CONTENT_TYPE_LATEST)
+
+def _admin_denied():
+    """Error response unless the request carries the configured admin token"""
+    token = current_app.config.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'error': 'Admin endpoints are disabled (ADMIN_TOKEN not set)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    return None
+
+@bp.route('/admin/models', methods=['GET'])
+def admin_models():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    return jsonify({
+        'active_version': ai_service.model_version,
+        'current_version': ai_service.registry.current_version(),
+        'versions': ai_service.registry.list_versions(),
+        'reload': ai_service.reload_state
+    })
+
+@bp.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Activate a version (optional) and swap it in once loaded and warm"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        # CURRENT is only rewritten once this reload is sure to run, and restored if it fails
+        started = ai_service.reload(data.get('version'), wait=bool(_parse_flag(data.get('wait'))), activate=True)
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    if not started:
+        return jsonify({'error': 'A reload is already in progress', 'reload': ai_service.reload_state}), 409
+    
+    status_code = 200 if ai_service.reload_state['state'] != 'loading' else 202
+    if ai_service.reload_state['state'] == 'failed':
+        status_code = 500
+    return jsonify({
+        'active_version': ai_service.model_version,
+        'reload': ai_service.reload_state,
+        'scope': _reload_scope()
+    }), status_code
+
+def _reload_scope():
+    """Which processes an /admin/reload reaches"""
+    if worker_status.mode != 'prefork':
+        return {'processes': 'this', 'note': 'The only serving process has reloaded'}
+    if Config.MODEL_WATCH_INTERVAL:
+        return {'processes': 'all', 'worker': worker_status.slot,
+                'note': f'Worker {worker_status.slot} reloaded; the other workers follow CURRENT within '
+                        f'MODEL_WATCH_INTERVAL ({Config.MODEL_WATCH_INTERVAL:g}s)'}
+    return {'processes': 'this', 'worker': worker_status.slot,
+            'note': f'Only worker {worker_status.slot} reloaded; the other workers, and any forked later, keep '
+                    'the model serve.py started with. Set MODEL_WATCH_INTERVAL or restart serve.py to switch them all'}
+
 @bp.route('/fetch-article', methods=['POST', 'OPTIONS'])
+@rate_limited(_expensive_budget, _rate_limited_response)
 def fetch_article():
     """Endpoint to fetch article content from URL"""
     if request.method == 'OPTIONS':
@@ -67,39 +271,23 @@ def fetch_article():
     
     try:
         data = request.get_json()
-        url = data.get('url')
-        
-        if not url:
-            return jsonify({'error': 'URL is required'}), 400
+        content = article_fetcher.fetch_article(data.get('url'))
         
-        # Fetch the webpage with timeout
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Parse the content
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'footer', 'iframe', 'header']):
-            element.decompose()
-        
-        # Get text from paragraphs and headings
-        paragraphs = soup.find_all(['p', 'h1', 'h2', 'h3'])
-        content = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
-        
-        if not content:
-            return jsonify({'error': 'Could not extract article content'}), 400
-            
         response = jsonify({
-            'content': content[:10000],  # Limit to 10,000 chars
+            'content': content,
             'status': 'success'
         })
         response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
         return response
         
+    except ArticleFetchError as e:
+        logger.error(f"Failed to fetch article: {str(e)}")
+        response = jsonify({
+            'error': str(e) if e.status_code == 400 else 'Failed to fetch article content',
+            'details': str(e)
+        })
+        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+        return response, e.status_code
     except Exception as e:
         logger.error(f"Failed to fetch article: {str(e)}")
         response = jsonify({
@@ -110,6 +298,8 @@ def fetch_article():
         return response, 500
 
 @bp.route('/predict', methods=['POST', 'OPTIONS'])
+@rate_limited(_predict_budget, _rate_limited_response)
+@admission_controlled(_overloaded_response)
 def predict():
     """Enhanced prediction endpoint with multiple input methods"""
     if request.method == 'OPTIONS':
@@ -126,9 +316,16 @@ def predict():
     try:
         content = ""
         input_type = "text"  # Default
+        long_document = None  # None = Config.LONG_DOCUMENT_MODE
+        aggregator = None
         
-        # Handle file upload
+        # Handle file upload (size checked from the headers before the body is parsed)
+        if request.mimetype == 'multipart/form-data':
+            check_upload_size(request)
+            rss_before_mb = current_rss_mb()  # Before Werkzeug reads the body
         if 'file' in request.files:
+            long_document = _parse_flag(request.form.get('long_document'))
+            aggregator = request.form.get('aggregator')
             file = request.files['file']
             if not file.filename:
                 raise ValueError("No file selected")
@@ -136,21 +333,34 @@ def predict():
             filename = file.filename.lower()
             input_type = "file"
             request_data['input_method'] = 'file_upload'
+            upload = describe_upload(file)
             
             if filename.endswith('.txt'):
-                content = file.read().decode('utf-8')
-            elif filename.endswith('.pdf'):
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-                content = '\n'.join([page.extract_text() for page in pdf_reader.pages])
-            elif filename.endswith('.docx'):
-                doc = docx.Document(io.BytesIO(file.read()))
-                content = '\n'.join([para.text for para in doc.paragraphs])
+                content = read_text_upload(file, _extraction_limit(Config.DOCUMENT_MAX_CHARS, long_document))
+            elif filename.endswith(('.pdf', '.docx')):
+                # Parsed in a worker process under CPU/memory/time limits; this thread just waits.
+                # Small uploads go over as bytes, spooled ones as a file handle.
+                source = file.stream if upload['spooled_to_disk'] else file.stream.read()
+                content, job = document_parser.parse(
+                    filename.rsplit('.', 1)[1], source, timeout=stage_budget('parse'),
+                    max_chars=_extraction_limit(Config.DOCUMENT_MAX_CHARS, long_document))
+                request_data['parse_time'] = job['parse_ms'] / 1000
+                upload['parser_peak_rss_mb'] = job['peak_rss_mb']
+                upload['parser_peak_growth_mb'] = job['peak_growth_mb']
             else:
                 raise ValueError("Unsupported file type. Only TXT, PDF, and DOCX are supported")
+            # Growth of this worker's RSS while the upload was read and parsed (other requests add to it too)
+            rss_after_mb = current_rss_mb()
+            if rss_before_mb is not None and rss_after_mb is not None:
+                upload['rss_growth_mb'] = round(rss_after_mb - rss_before_mb, 1)
+            upload_stats.record(upload)
+            request_data['upload'] = upload
         
         # Handle JSON input (text or URL content)
         elif request.is_json:
             data = request.get_json()
+            long_document = _parse_flag(data.get('long_document'))
+            aggregator = data.get('aggregator')
             if 'url' in data:
                 input_type = "url"
                 request_data['input_method'] = 'url'
@@ -158,15 +368,16 @@ def predict():
                 if not url:
                     raise ValueError("URL is required")
                 
-                # Fetch content from URL
-                fetch_response = requests.post(
-                    f"http://localhost:5000/fetch-article",
-                    json={'url': url},
-                    headers={'Content-Type': 'application/json'}
-                )
-                if not fetch_response.ok:
-                    raise ValueError("Failed to fetch URL content")
-                content = fetch_response.json().get('content', '')
+                # Fetch content from URL in-process (shared pooled session, no HTTP call back into this server)
+                try:
+                    content = article_fetcher.fetch_article(
+                        url, timeout=stage_budget('fetch'),
+                        max_chars=_extraction_limit(Config.FETCH_MAX_CHARS, long_document))
+                except ArticleFetchError as e:
+                    if e.status_code == 504:
+                        raise DeadlineExceeded(f"Prediction timed out after {Config.PREDICTION_TIMEOUT}s "
+                                               f"(during fetch): {str(e)}")
+                    raise ValueError(f"Failed to fetch URL content: {str(e)}")
             else:
                 # Get input_type from frontend payload if available
                 input_type = data.get('input_type', 'text')
@@ -176,14 +387,17 @@ def predict():
         else:
             raise ValueError("Invalid request format")
         
+        content = _truncate_content(content, long_document, request_data)
         request_data['content_length'] = len(content)
         if not content.strip():
             raise ValueError("No content provided for analysis")
         
         # Get prediction with timing
         predict_start = time.time()
-        label, confidence = ai_service.predict(content)
+        result = ai_service.predict_detailed(content, long_document=long_document, aggregator=aggregator)
+        label, confidence = result['label'], result['confidence']
         request_data['processing_time'] = time.time() - predict_start
+        request_data['cache_hit'] = result['cache_hit']
         
         # Save to database
         db_start = time.time()
@@ -194,37 +408,79 @@ def predict():
             edited_prediction=None,
             confidence=confidence,
             feedback=None,
-            processing_time=request_data['processing_time']
+            processing_time=request_data['processing_time'],
+            cache_hit=result['cache_hit'],
+            model_version=result['model_version']
         )
         db.session.add(conversation)
         db.session.commit()
         request_data['db_time'] = time.time() - db_start
+        STAGE_SECONDS.observe(request_data['db_time'], stage='db_commit')
+        _record_prediction(input_type, result)
+        annotate_request(input_type=input_type, prediction=label, confidence=round(confidence, 4),
+                         cache_hit=result['cache_hit'], model_version=result['model_version'],
+                         content_length=request_data['content_length'], id=conversation.id)
         
         # Notify SSE clients of new prediction
-        with sse_lock:
-            for client in sse_clients[:]:  # Copy to avoid modification during iteration
-                try:
-                    client.put("data: new_prediction\n\n")
-                except:
-                    sse_clients.remove(client)  # Remove disconnected client
+        _notify_sse_clients()
         
         request_data['total_time'] = time.time() - start_time
-        logger.info(f"Prediction completed (ID: {conversation.id})")
+        if verbose_logging():
+            logger.info(f"Prediction completed (ID: {conversation.id})")
         
-        response = jsonify({
+        payload = {
             'prediction': label,
             'confidence': confidence,
             'id': conversation.id,
             'input_type': input_type,
+            'cache_hit': result['cache_hit'],
+            'model_version': result['model_version'],
             'status': 'success',
             'request_data': request_data
-        })
+        }
+        if 'stage' in result:
+            payload['stage'] = result['stage']
+        if 'windows' in result:
+            payload['windows'] = result['windows']
+            payload['aggregator'] = result['aggregator']
+        response = jsonify(payload)
         response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
         return response
         
+    except RequestEntityTooLarge as e:
+        logger.warning(f"Upload rejected: {e.description}")
+        request_data['total_time'] = time.time() - start_time
+        PREDICTION_ERRORS.inc(input_type=input_type, status=413)
+        annotate_request(input_type=input_type, error=e.description)
+        response = jsonify({
+            'error': 'File too large',
+            'details': e.description,
+            'status': 'error',
+            'request_data': request_data
+        })
+        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+        return response, 413
+        
+    except DocumentParseError as e:
+        logger.error(f"Document parse error: {str(e)}")
+        request_data['total_time'] = time.time() - start_time
+        PREDICTION_ERRORS.inc(input_type=input_type, status=e.status_code)
+        annotate_request(input_type=input_type, error=str(e))
+        response = jsonify({
+            'error': 'Failed to parse document',
+            'details': str(e),
+            'status': 'error',
+            'request_data': request_data
+        })
+        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+        return response, e.status_code
+        
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         request_data['total_time'] = time.time() - start_time
+        status_code = getattr(e, 'status_code', 500)  # e.g. 503 while the model server is unreachable
+        PREDICTION_ERRORS.inc(input_type=input_type, status=status_code)
+        annotate_request(input_type=input_type, error=str(e))
         response = jsonify({
             'error': 'Failed to process prediction',
             'details': str(e),
@@ -232,7 +488,230 @@ def predict():
             'request_data': request_data
         })
         response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
-        return response, 500
+        return response, status_code
+
+def _iter_ndjson_items():
+    """Yield (index, item) line by line from an NDJSON request stream
+
+    Unparseable lines are yielded as exceptions so they become per-item errors.
+    """
+    index = 0
+    for line in request.stream:
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except ValueError as e:
+            yield index, ValueError(f"Invalid JSON line: {str(e)}")
+        index += 1
+
+def _batch_item_text(item):
+    """Text and input type of one batch item (a string or {"text": ..., "input_type": ...})"""
+    if isinstance(item, Exception):
+        raise item
+    if isinstance(item, str):
+        text, input_type = item, 'text'
+    elif isinstance(item, dict):
+        text, input_type = item.get('text', item.get('content')), item.get('input_type', 'text')
+    else:
+        raise ValueError("Each item must be a string or an object with a 'text' field")
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("No content provided for analysis")
+    return text.strip()[:Config.MAX_TEXT_LENGTH], input_type
+
+def _score_batch_chunk(chunk):
+    """Predict and store one chunk of (index, item); returns one result dict per item"""
+    lines, valid = [], []
+    for index, item in chunk:
+        reference = item.get('ref') if isinstance(item, dict) else None
+        try:
+            text, input_type = _batch_item_text(item)
+            valid.append((index, reference, text, input_type))
+        except ValueError as e:
+            lines.append({'index': index, 'ref': reference, 'status': 'error', 'error': str(e)})
+    if not valid:
+        return lines
+
+    predict_start = time.time()
+    results = ai_service.predict_batch_detailed([text for _, _, text, _ in valid])
+    processing_time = (time.time() - predict_start) / len(valid)
+
+    # One INSERT round trip and one commit for the whole chunk
+    conversations = [
+        Conversation(
+            input_text=text[:5000],  # Limit to 5000 chars
+            input_type=input_type,
+            prediction=result['label'],
+            confidence=result['confidence'],
+            processing_time=processing_time,
+            cache_hit=result['cache_hit'],
+            model_version=result['model_version']
+        )
+        for (_, _, text, input_type), result in zip(valid, results)
+    ]
+    with STAGE_SECONDS.time(stage='db_commit'):
+        db.session.add_all(conversations)
+        db.session.commit()
+
+    for (index, reference, _, input_type), result, conversation in zip(valid, results, conversations):
+        _record_prediction(input_type, result)
+        line = {
+            'index': index,
+            'ref': reference,
+            'id': conversation.id,
+            'prediction': result['label'],
+            'confidence': result['confidence'],
+            'input_type': input_type,
+            'cache_hit': result['cache_hit'],
+            'model_version': result['model_version'],
+            'status': 'success'
+        }
+        if 'stage' in result:
+            line['stage'] = result['stage']
+        lines.append(line)
+    lines.sort(key=lambda line: line['index'])
+    return lines
+
+@bp.route('/predict/batch', methods=['POST', 'OPTIONS'])
+@rate_limited(_expensive_budget, _rate_limited_response)
+def predict_batch():
+    """Score many texts; results stream back as NDJSON, one line per item, as each chunk completes"""
+    if request.method == 'OPTIONS':
+        return _build_cors_preflight_response()
+    
+    chunk_size = current_app.config['BATCH_PREDICT_CHUNK_SIZE']
+    max_items = current_app.config['BATCH_PREDICT_MAX_ITEMS']
+    
+    # Streamed bodies are read lazily, so check the declared size before the response starts
+    if request.content_length is not None and request.max_content_length is not None \
+            and request.content_length > request.max_content_length:
+        raise RequestEntityTooLarge()
+    
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = _iter_ndjson_items()
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('items', data.get('texts'))
+        if not isinstance(data, list):
+            response = jsonify({
+                'error': 'Invalid request format',
+                'details': 'Expected a JSON array of texts or an application/x-ndjson body',
+                'status': 'error'
+            })
+            response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+            return response, 400
+        items = enumerate(data)
+    
+    def generate():
+        start_time = time.time()
+        summary = {'total': 0, 'succeeded': 0, 'failed': 0, 'truncated': False}
+        try:
+            chunk = []
+            for index, item in items:
+                if index >= max_items:
+                    summary['truncated'] = True
+                    break
+                chunk.append((index, item))
+                if len(chunk) >= chunk_size:
+                    yield from _emit_chunk(chunk, summary)
+                    chunk = []
+            if chunk:
+                yield from _emit_chunk(chunk, summary)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Batch prediction error: {str(e)}")
+            summary['error'] = str(e)
+        summary['status'] = 'error' if 'error' in summary else 'complete'
+        summary['total_time'] = time.time() - start_time
+        annotate_request(items=summary['total'], failed=summary['failed'], batch_status=summary['status'])
+        yield json.dumps({'summary': summary}) + '\n'
+        if verbose_logging():
+            logger.info(f"Batch prediction completed ({summary['succeeded']}/{summary['total']} items)")
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _emit_chunk(chunk, summary):
+    try:
+        lines = _score_batch_chunk(chunk)
+    except Exception as e:
+        # A failed chunk only fails its own items; later chunks still run
+        db.session.rollback()
+        logger.error(f"Batch chunk of {len(chunk)} items failed: {str(e)}")
+        lines = [{'index': index, 'ref': item.get('ref') if isinstance(item, dict) else None,
+                  'status': 'error', 'error': str(e)} for index, item in chunk]
+    for line in lines:
+        summary['total'] += 1
+        summary['succeeded' if line['status'] == 'success' else 'failed'] += 1
+        yield json.dumps(line) + '\n'
+    if any(line['status'] == 'success' for line in lines):
+        _notify_sse_clients()
+
+def start_job_runner(app):
+    """Start the background job threads (resuming any unfinished jobs)"""
+    job_runner.start(app, score_chunk=_score_batch_chunk, on_scored=_notify_sse_clients)
+
+@bp.route('/jobs', methods=['POST', 'OPTIONS'])
+@rate_limited(_expensive_budget, _rate_limited_response)
+def create_job():
+    """Queue a screening job: JSON {"urls"|"texts"|"items": [...]} or multipart files / a ZIP"""
+    if request.method == 'OPTIONS':
+        return _build_cors_preflight_response()
+    
+    try:
+        if not Config.JOBS_ENABLED:
+            raise JobError("Background jobs are disabled on this server", 503)
+        if request.files:
+            items = store_uploaded_files(request.files.getlist('file') + request.files.getlist('files'),
+                                         Config.JOBS_FILES_DIR)
+        else:
+            items = items_from_json(request.get_json(silent=True))
+        if not items:
+            raise JobError("No URLs, texts or documents to screen")
+        if len(items) > Config.JOB_MAX_ITEMS:
+            raise JobError(f"A job can hold at most {Config.JOB_MAX_ITEMS} items", 413)
+        
+        job_id = job_runner.submit(items)
+        logger.info(f"Job {job_id} queued with {len(items)} items")
+        response = jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'total': len(items),
+            'status_url': f"/jobs/{job_id}"
+        })
+        response.headers['Location'] = f"/jobs/{job_id}"
+        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+        return response, 202
+    
+    except (JobError, zipfile.BadZipFile) as e:
+        logger.error(f"Job submission error: {str(e)}")
+        response = jsonify({
+            'error': 'Failed to create job',
+            'details': str(e),
+            'status': 'error'
+        })
+        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+        return response, getattr(e, 'status_code', 400)
+
+@bp.route('/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+def get_job(job_id):
+    """Progress and finished results of a job (?offset=&limit= page through results)"""
+    if request.method == 'OPTIONS':
+        return _build_cors_preflight_response()
+    
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    job = job_runner.store.get_job(job_id, offset=offset, limit=limit)
+    if job is None:
+        response = jsonify({'error': 'Job not found', 'details': job_id, 'status': 'error'})
+        response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+        return response, 404
+    response = jsonify(job)
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+    return response
 
 @bp.route('/feedback', methods=['POST', 'OPTIONS'])
 def feedback():
@@ -0,0 +1,117 @@
+"""TFLite (XNNPACK) inference backend for quantized classifier artifacts.
+
+The converter needs a static batch dimension to lower the LSTMs, so a
+quantized variant is one model.tflite with a signature per batch-size bucket
+(batch_1, batch_8, ...) sharing a single copy of the weights. Rows are padded
+up to the nearest bucket, mirroring CompiledKerasModel.
+"""
+import logging
+import os
+import re
+import time
+from threading import Lock
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TFLITE_MODEL_FILE = 'model.tflite'
+BUCKET_SIGNATURE_PATTERN = re.compile(r'batch_(\d+)$')
+
+
+def load_interpreter_class():
+    """Prefer the standalone LiteRT/tflite runtimes so TensorFlow is not imported"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class _BucketRunner:
+    """The signature of one fixed (bucket, sequence_length) input"""
+
+    def __init__(self, interpreter, key, lock):
+        self.key = key
+        self.runner = interpreter.get_signature_runner(key)
+        (self.input_name, input_details), = self.runner.get_input_details().items()
+        self.input_dtype = input_details['dtype']
+        self.batch_size, self.sequence_length = (int(d) for d in input_details['shape'])
+        self.output_name = next(iter(self.runner.get_output_details()))
+        self.calls = 0
+        self.lock = lock  # Signatures share the interpreter, which is not thread-safe
+
+    def run(self, chunk):
+        with self.lock:
+            outputs = self.runner(**{self.input_name: chunk.astype(self.input_dtype, copy=False)})
+            self.calls += 1
+            return outputs[self.output_name][:, 0].copy()
+
+
+class TFLiteClassifier:
+    """Quantized classifier served through one TFLite interpreter, one signature per bucket"""
+
+    def __init__(self, model_dir, num_threads=None):
+        self.model_path = os.path.join(model_dir, TFLITE_MODEL_FILE)
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"No {TFLITE_MODEL_FILE} found in: {model_dir} (re-export the quantized variants)")
+
+        self.model_dir = model_dir
+        self.interpreter = load_interpreter_class()(model_path=self.model_path, num_threads=num_threads)
+        keys = {}
+        for key in self.interpreter.get_signature_list():
+            match = BUCKET_SIGNATURE_PATTERN.match(key)
+            if match:
+                keys[int(match.group(1))] = key
+        if not keys:
+            raise ValueError(f"{self.model_path} has no batch_<n> signatures")
+
+        self.buckets = sorted(keys)
+        lock = Lock()
+        self._runners = {b: _BucketRunner(self.interpreter, keys[b], lock) for b in self.buckets}
+        self.sequence_length = self._runners[self.buckets[0]].sequence_length
+        self._warmup_ms = {}
+
+    @property
+    def size_bytes(self):
+        return os.path.getsize(self.model_path)
+
+    def _bucket_for(self, rows):
+        for bucket in self.buckets:
+            if bucket >= rows:
+                return bucket
+        return self.buckets[-1]
+
+    def warmup(self):
+        for bucket, runner in self._runners.items():
+            start = time.time()
+            runner.run(np.zeros((bucket, self.sequence_length), dtype=np.int32))
+            self._warmup_ms[bucket] = round((time.time() - start) * 1000, 2)
+
+    def predict_batch(self, padded):
+        """Return P(true) for each row, running chunks through the nearest bucket"""
+        padded = np.asarray(padded, dtype=np.int32)
+        largest = self.buckets[-1]
+        outputs = []
+        for offset in range(0, len(padded), largest):
+            chunk = padded[offset:offset + largest]
+            rows = len(chunk)
+            bucket = self._bucket_for(rows)
+            if rows < bucket:
+                chunk = np.concatenate([chunk, np.zeros((bucket - rows, chunk.shape[1]), dtype=np.int32)])
+            outputs.append(self._runners[bucket].run(chunk)[:rows])
+        return np.concatenate(outputs) if outputs else np.zeros(0, dtype=np.float32)
+
+    def get_stats(self):
+        return {
+            str(bucket): {
+                'state': 'warm' if bucket in self._warmup_ms or runner.calls else 'cold',
+                'warmup_ms': self._warmup_ms.get(bucket),
+                'calls': runner.calls
+            }
+            for bucket, runner in self._runners.items()
+        }
@@ -0,0 +1,148 @@
+"""Upload handling for /predict: size caps, spooling and per-request memory report.
+
+Flask enforces MAX_CONTENT_LENGTH for the whole body; /predict additionally
+rejects file uploads whose Content-Length exceeds UPLOAD_MAX_BYTES before
+the multipart body is read. File parts are spooled: kept in memory up to
+UPLOAD_SPOOL_THRESHOLD bytes, written to a temporary file beyond that, and
+handed to the parsers as file handles rather than copied into bytes.
+"""
+import io
+import logging
+import os
+import sys
+import threading
+from tempfile import SpooledTemporaryFile
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SpooledRequest(Request):
+    """Request whose multipart file parts roll over to disk past UPLOAD_SPOOL_THRESHOLD"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=Config.UPLOAD_SPOOL_THRESHOLD, mode='rb+')
+
+
+def check_upload_size(request):
+    """Reject an oversized upload from its headers, before any of the body is read"""
+    if request.content_length is not None and request.content_length > Config.UPLOAD_MAX_BYTES:
+        upload_stats.record_rejected()
+        raise RequestEntityTooLarge(
+            f"Upload of {request.content_length} bytes exceeds the {Config.UPLOAD_MAX_BYTES} byte limit"
+        )
+
+
+def describe_upload(file_storage):
+    """Size of an uploaded file and where its bytes are held"""
+    stream = file_storage.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    # SpooledTemporaryFile keeps a BytesIO until it rolls over to a real file
+    in_memory = isinstance(getattr(stream, '_file', stream), io.BytesIO)
+    if size > Config.UPLOAD_MAX_BYTES:
+        # Chunked uploads carry no Content-Length; catch them once the part is spooled
+        upload_stats.record_rejected()
+        raise RequestEntityTooLarge(f"Upload of {size} bytes exceeds the {Config.UPLOAD_MAX_BYTES} byte limit")
+    return {'bytes': size, 'spooled_to_disk': not in_memory, 'in_memory_bytes': size if in_memory else 0}
+
+
+def read_text_upload(file_storage, max_chars):
+    """Decode a .txt upload from its handle, reading no more than max_chars characters"""
+    reader = io.TextIOWrapper(file_storage.stream, encoding='utf-8')
+    try:
+        return reader.read(max_chars or -1)
+    finally:
+        reader.detach()  # Leave the spooled file for Werkzeug to close
+
+
+def current_rss_mb():
+    """Resident set size of this process right now (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def reset_peak_rss():
+    """Restart this process's peak RSS (VmHWM) from its current RSS; False where the kernel can't"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_since_reset_mb():
+    """Peak resident set size since the last reset_peak_rss() (None where unavailable)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def process_peak_rss_mb():
+    """Peak resident set size of this process over its lifetime (None where unavailable)"""
+    if resource is None:
+        return None
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class UploadStats:
+    """Counts of accepted, rejected and disk-spooled uploads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.rejected_too_large = 0
+        self.spooled_to_disk = 0
+        self.bytes_received = 0
+        self.largest_upload_bytes = 0
+        self.peak_in_memory_bytes = 0
+
+    def record(self, upload):
+        with self._lock:
+            self.uploads += 1
+            self.spooled_to_disk += int(upload['spooled_to_disk'])
+            self.bytes_received += upload['bytes']
+            self.largest_upload_bytes = max(self.largest_upload_bytes, upload['bytes'])
+            self.peak_in_memory_bytes = max(self.peak_in_memory_bytes, upload['in_memory_bytes'])
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected_too_large += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'uploads': self.uploads,
+                'rejected_too_large': self.rejected_too_large,
+                'spooled_to_disk': self.spooled_to_disk,
+                'bytes_received': self.bytes_received,
+                'largest_upload_bytes': self.largest_upload_bytes,
+                'peak_in_memory_bytes': self.peak_in_memory_bytes,
+                'process_peak_rss_mb': process_peak_rss_mb(),
+                'max_upload_bytes': Config.UPLOAD_MAX_BYTES,
+                'spool_threshold_bytes': Config.UPLOAD_SPOOL_THRESHOLD
+            }
+
+
+upload_stats = UploadStats()
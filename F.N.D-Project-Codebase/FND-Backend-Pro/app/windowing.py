@@ -0,0 +1,66 @@
+"""Sliding-window scoring for documents longer than the model's 150-token input.
+
+pad_sequences truncates from the front, so without windowing the model only
+ever sees the last 150 tokens of a long article. Here the token stream is cut
+into overlapping windows that are scored in one batch and then combined.
+"""
+import numpy as np
+
+AGGREGATORS = ('mean', 'most_fake', 'length_weighted')
+
+
+def build_windows(ids, window=150, stride=100, max_windows=16):
+    """Split token ids into overlapping windows
+
+    Returns an int32 (W, window) array (pre-padded like pad_sequences) and the
+    (start, end) token span of each window. The final window is aligned to the
+    end of the document so the tail is always covered. When there are more than
+    max_windows candidates, evenly spaced ones are kept so the whole document is
+    still sampled at a bounded cost.
+    """
+    total = len(ids)
+    stride = max(1, min(int(stride), window))
+    if total <= window:
+        starts = [0]
+    else:
+        starts = list(range(0, total - window + 1, stride))
+        if starts[-1] + window < total:
+            starts.append(total - window)
+        if len(starts) > max_windows:
+            keep = np.unique(np.linspace(0, len(starts) - 1, max(1, int(max_windows))).round().astype(int))
+            starts = [starts[i] for i in keep]
+
+    windows = np.zeros((len(starts), window), dtype=np.int32)
+    spans = []
+    for row, start in enumerate(starts):
+        chunk = ids[start:start + window]
+        if len(chunk):
+            windows[row, window - len(chunk):] = chunk
+        spans.append((start, start + len(chunk)))
+    return windows, spans
+
+
+def aggregate(scores, spans, method='mean'):
+    """Combine per-window P(true) scores into one document score
+
+    mean            - plain average of the windows
+    most_fake       - the most fake-looking window decides (lowest P(true))
+    length_weighted - each window is weighted by the tokens it adds beyond the
+                      previous window, so overlap is not counted twice
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if method == 'mean':
+        return float(scores.mean())
+    if method == 'most_fake':
+        return float(scores.min())
+    if method == 'length_weighted':
+        weights = []
+        covered_until = 0
+        for start, end in spans:
+            weights.append(max(end - max(start, covered_until), 0))
+            covered_until = max(covered_until, end)
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.sum() == 0:
+            return float(scores.mean())
+        return float(np.average(scores, weights=weights))
+    raise ValueError(f"Unknown aggregator '{method}', expected one of {AGGREGATORS}")
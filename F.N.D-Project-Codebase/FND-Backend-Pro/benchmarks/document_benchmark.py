@@ -0,0 +1,131 @@
+"""Benchmark full-document extraction against the budget-aware extractors.
+
+Run from FND-Backend-Pro:
+
+    python benchmarks/document_benchmark.py [--pages 100] [--max-chars 10000] [--pdf file.pdf] [--docx file.docx]
+
+Without --pdf/--docx it generates a text PDF and a DOCX of roughly --pages
+pages. "full" is the previous upload path (every PDF page / the whole
+python-docx tree, joined, then truncated); "budget" is app.document_extract.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.document_extract import extract_document_text  # noqa: E402
+
+LINES_PER_PAGE = 45
+PARAGRAPHS_PER_PAGE = 9
+SENTENCE = 'Officials confirmed the report on the economy while experts questioned the viral claims. '
+
+
+def make_pdf(pages):
+    """Minimal uncompressed PDF with LINES_PER_PAGE lines of Helvetica text per page"""
+    objects = [b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    pages_id = 2 + 2 * pages
+    page_ids = []
+    for number in range(pages):
+        lines = b' '.join(b"(Page %d line %d: %s) '" % (number, line, SENTENCE[:70].encode())
+                          for line in range(LINES_PER_PAGE))
+        stream = b'BT /F1 10 Tf 40 800 Td 14 TL ' + lines + b' ET'
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] /Contents %d 0 R '
+                       b'/Resources << /Font << /F1 1 0 R >> >> >>' % (pages_id, len(objects)))
+        page_ids.append(len(objects))
+    objects.append(b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(b'%d 0 R' % i for i in page_ids), pages))
+    objects.append(b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    out.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+    out.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, len(objects), xref))
+    return out.getvalue()
+
+
+def make_docx(pages):
+    import docx
+
+    document = docx.Document()
+    for number in range(pages * PARAGRAPHS_PER_PAGE):
+        if number % PARAGRAPHS_PER_PAGE == 0:
+            document.add_heading(f'Section {number // PARAGRAPHS_PER_PAGE}', level=2)
+        paragraph = document.add_paragraph(f'Paragraph {number}. ' + SENTENCE * 3)
+        paragraph.add_run(' Emphasis.').bold = True
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def extract_full(kind, data, max_chars):
+    """The upload path before budget-aware extraction"""
+    if kind == 'pdf':
+        import PyPDF2
+
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+        content = '\n'.join([page.extract_text() for page in pdf_reader.pages])
+    else:
+        import docx
+
+        doc = docx.Document(io.BytesIO(data))
+        content = '\n'.join([para.text for para in doc.paragraphs])
+    return content[:max_chars]
+
+
+def measure(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings), peak / (1024 * 1024), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full and budget-aware document extraction')
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--max-chars', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--pdf', help='existing PDF to use instead of a generated one')
+    parser.add_argument('--docx', help='existing DOCX to use instead of a generated one')
+    args = parser.parse_args()
+
+    documents = []
+    for kind, path, build in (('pdf', args.pdf, make_pdf), ('docx', args.docx, make_docx)):
+        if path:
+            with open(path, 'rb') as f:
+                documents.append((kind, os.path.basename(path), f.read()))
+        else:
+            documents.append((kind, f'generated {args.pages}-page {kind}', build(args.pages)))
+
+    print(f"{'document':<34} {'method':<14} {'median ms':>10} {'peak MB':>9}")
+    for kind, name, data in documents:
+        full_ms, full_mb, full_text = measure(lambda: extract_full(kind, data, args.max_chars), args.repeats)
+        budget_ms, budget_mb, budget_text = measure(
+            lambda: extract_document_text(kind, io.BytesIO(data), args.max_chars), args.repeats)
+        unbounded_ms, unbounded_mb, _ = measure(
+            lambda: extract_document_text(kind, io.BytesIO(data), 0), args.repeats)
+        label = f"{name} ({len(data) // 1024} KB)"
+        print(f"{label:<34} {'full':<14} {full_ms:>10.1f} {full_mb:>9.1f}")
+        print(f"{'':<34} {'budget':<14} {budget_ms:>10.1f} {budget_mb:>9.1f}")
+        print(f"{'':<34} {'no budget':<14} {unbounded_ms:>10.1f} {unbounded_mb:>9.1f}")
+        print(f"{'':<34} ⚡ {full_ms / budget_ms:.1f}x faster, same text: {full_text == budget_text}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark the BeautifulSoup extractor against the streaming one on saved pages.
+
+Save article pages as .html files in one directory (e.g. with
+`curl -o pages/site1.html <url>`) and run from FND-Backend-Pro:
+
+    python benchmarks/extract_benchmark.py pages/ [--max-chars 10000] [--repeats 5]
+
+Without a directory, --synthetic N generates news-like pages with the usual
+scripts, navigation and footer around the article body.
+"""
+import argparse
+import glob
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.html_extract import extract_fast, extract_with_soup  # noqa: E402
+
+WORDS = ('government officials report new figures economy election health study claims '
+         'sources confirmed statement minister police market viral video experts').split()
+
+
+def synthetic_page(rng, paragraphs):
+    def sentence():
+        return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + '.'
+
+    def paragraph():
+        return ' '.join(sentence() for _ in range(rng.randint(2, 5)))
+
+    parts = ['<!DOCTYPE html><html><head><title>News</title>',
+             '<script>' + 'var tracking = {"id": 1, "tags": ["a<b"]};' * 200 + '</script>',
+             '<style>' + 'p { margin: 0 } .nav a { color: red }' * 200 + '</style></head><body>',
+             '<header><h1>Site name</h1><p>Subscribe now</p></header>',
+             '<nav>' + ''.join(f'<a href="/s{i}">Section {i}</a>' for i in range(60)) + '</nav>',
+             '<article><h1>' + sentence() + '</h1>']
+    for i in range(paragraphs):
+        if i % 6 == 0:
+            parts.append(f'<h2>{sentence()}</h2>')
+        parts.append(f'<div class="ad"><iframe src="/ad{i}"></iframe></div><p>{paragraph()} '
+                     f'<a href="/x">link</a> &amp; <b>more</b></p>')
+    parts.append('</article><aside>' + '<div><a href="/r">Related story</a></div>' * 50 + '</aside>')
+    parts.append('<footer><p>Copyright</p></footer></body></html>')
+    return ''.join(parts)
+
+
+def load_pages(args):
+    if args.directory:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.directory, '*.htm*'))):
+            with open(path, 'rb') as f:
+                pages.append((os.path.basename(path), f.read().decode('utf-8', 'replace')))
+        return pages
+    rng = random.Random(0)
+    return [(f'synthetic-{i}', synthetic_page(rng, rng.randint(10, 300))) for i in range(args.synthetic)]
+
+
+def time_extractor(extract, pages, max_chars, repeats):
+    per_page_ms = []
+    outputs = []
+    for _, html in pages:
+        runs = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            text = extract(html, max_chars)
+            runs.append((time.perf_counter() - start) * 1000)
+        per_page_ms.append(statistics.median(runs))
+        outputs.append(text)
+    return per_page_ms, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare article extractors on saved HTML pages')
+    parser.add_argument('directory', nargs='?', help='directory of saved .html pages')
+    parser.add_argument('--synthetic', type=int, default=50, help='pages to generate when no directory is given')
+    parser.add_argument('--max-chars', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    if not pages:
+        sys.exit(f"No .html files found in {args.directory}")
+    total_kb = sum(len(html) for _, html in pages) / 1024
+    print(f"📄 {len(pages)} pages, {total_kb:.0f} KB total, max_chars={args.max_chars}\n")
+
+    soup_ms, soup_text = time_extractor(extract_with_soup, pages, args.max_chars, args.repeats)
+    fast_ms, fast_text = time_extractor(extract_fast, pages, args.max_chars, args.repeats)
+
+    print(f"{'extractor':<10} {'median ms':>10} {'p95 ms':>10} {'total ms':>10} {'pages/s':>10}")
+    for name, timings in (('soup', soup_ms), ('fast', fast_ms)):
+        ordered = sorted(timings)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(f"{name:<10} {statistics.median(timings):>10.3f} {p95:>10.3f} {sum(timings):>10.1f} "
+              f"{len(timings) / (sum(timings) / 1000):>10.1f}")
+
+    identical = sum(a == b for a, b in zip(soup_text, fast_text))
+    print(f"\n⚡ Speedup: {sum(soup_ms) / sum(fast_ms):.1f}x   "
+          f"identical output: {identical}/{len(pages)} pages")
+    for (name, _), a, b in zip(pages, soup_text, fast_text):
+        if a != b:
+            print(f"   differs: {name} (soup {len(a)} chars, fast {len(b)} chars)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Measure the per-request logging cost of each logging mode.
+
+Run from FND-Backend-Pro:
+
+    python benchmarks/logging_benchmark.py [--requests 20000] [--rounds 5]
+
+Model inference and the database commit vary by milliseconds between
+requests, which hides a cost measured in microseconds, so this replays the
+logging traffic of one /predict call instead: the request record is begun,
+the per-stage timings are observed, the emoji lines AIService.predict_detailed
+and the route emit are logged (when the request is sampled) and the record
+is finished. Output goes to a temporary file. "pretty sync" is the previous
+behaviour; "off" (logging disabled) is the baseline.
+
+"request thread" is CPU time spent on the calling thread, which is what a
+request pays; "wall" also includes time lost to the listener thread, which
+this tight loop never leaves idle the way a real request waiting on the
+model or the database does.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from app.logging_config import begin_request, configure_logging, shutdown_logging, verbose_logging  # noqa: E402
+from app.metrics import STAGE_SECONDS  # noqa: E402
+
+# (label, LOG_FORMAT, LOG_ASYNC, LOG_VERBOSE_SAMPLE_RATE); None = logging disabled
+MODES = [
+    ('off', None, None, None),
+    ('pretty sync', 'pretty', False, 1.0),
+    ('pretty async', 'pretty', True, 1.0),
+    ('json sync', 'json', False, 0.01),
+    ('json async', 'json', True, 0.01),
+]
+STAGES = (('preprocess', 0.0002), ('tokenize', 0.00005), ('infer', 0.012), ('db_commit', 0.004), ('sse_notify', 0.00001))
+
+ai_logger = logging.getLogger('app.ai_service')
+routes_logger = logging.getLogger('app.routes')
+
+
+def one_request(number):
+    """The log calls one successful /predict request makes"""
+    entry = begin_request('POST', '/predict', 'routes.predict')
+    verbose = verbose_logging()
+    if verbose:
+        ai_logger.info("\n🔮 Making prediction...")
+        ai_logger.debug(f"✨ Text cleaned in {0.2:.2f}ms")
+    for stage, seconds in STAGES:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    if verbose:
+        ai_logger.info(f"\n🎯 Prediction Result:")
+        ai_logger.info(f"   ├── Label: {'✅ TRUE'}")
+        ai_logger.info(f"   ├── Confidence: {0.8731:.2%}")
+        ai_logger.info(f"   └── Total time: {16.4:.2f}ms")
+        routes_logger.info(f"Prediction completed (ID: {number})")
+    entry.fields.update(input_type='text', prediction='true', confidence=0.8731, cache_hit=False,
+                        model_version='d1431d39532a', content_length=87, id=number)
+    entry.finish(200)
+
+
+def run_mode(mode, log_file, requests):
+    label, log_format, async_handler, sample_rate = mode
+    if log_format is None:
+        logging.disable(logging.CRITICAL)
+        configure_logging('pretty', 'INFO', False, 1.0, stream=log_file, force=True)
+    else:
+        logging.disable(logging.NOTSET)
+        configure_logging(log_format, 'INFO', async_handler, sample_rate, stream=log_file, force=True)
+    start, start_cpu = time.perf_counter(), time.thread_time()
+    for number in range(requests):
+        one_request(number)
+    elapsed, elapsed_cpu = time.perf_counter() - start, time.thread_time() - start_cpu
+    shutdown_logging()  # Drain the listener outside the timed section
+    logging.disable(logging.NOTSET)
+    return elapsed_cpu / requests * 1e6, elapsed / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-request logging overhead across modes')
+    parser.add_argument('--requests', type=int, default=20000, help='requests per mode per round')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='fnd-logbench-') as workdir:
+        log_path = os.path.join(workdir, 'bench.log')
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            run_mode(MODES[1], log_file, 1000)  # Warm up
+            best = {mode[0]: (float('inf'), float('inf')) for mode in MODES}
+            for _ in range(args.rounds):
+                for mode in MODES:
+                    cpu, wall = run_mode(mode, log_file, args.requests)
+                    best[mode[0]] = (min(best[mode[0]][0], cpu), min(best[mode[0]][1], wall))
+
+    base_cpu, base_wall = best['off']
+    print(f"{'mode':<14} {'request thread us':>18} {'overhead us':>12} {'wall us':>9} {'overhead us':>12}")
+    for label, (cpu, wall) in best.items():
+        print(f"{label:<14} {cpu:>18.1f} {cpu - base_cpu:>12.1f} {wall:>9.1f} {wall - base_wall:>12.1f}")
+    before, after = best['pretty sync'][0] - base_cpu, best['json async'][0] - base_cpu
+    if after > 0:
+        print(f"\n⚡ json async costs the request thread {before / after:.1f}x less than pretty sync")
+
+
+if __name__ == '__main__':
+    main()
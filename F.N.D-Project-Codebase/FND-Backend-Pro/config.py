@@ -25,7 +25,20 @@ class Config:
     # Model configuration
     MODEL_PATH = os.getenv('MODEL_PATH', './saved_model')
     TOKENIZER_FILE = os.getenv('TOKENIZER_FILE', 'tokenizer.pkl')
+    COMPACT_TOKENIZER_FILE = os.getenv('COMPACT_TOKENIZER_FILE', 'tokenizer.json')
     MODEL_FILE = os.getenv('MODEL_FILE', 'true_fake_news_classifier.keras')
+    NUMPY_WEIGHTS_FILE = os.getenv('NUMPY_WEIGHTS_FILE', 'model_weights.npz')
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'keras')  # 'keras', 'numpy', 'tflite', 'server' or 'auto'
+    BACKEND_CANDIDATES = [b.strip() for b in os.getenv('BACKEND_CANDIDATES', 'keras,tflite,numpy').split(',') if b.strip()]
+    BACKEND_REFERENCE = os.getenv('BACKEND_REFERENCE', 'keras')  # auto mode compares candidates against this
+    BACKEND_TOLERANCE = float(os.getenv('BACKEND_TOLERANCE', 0.02))  # max abs probability difference
+    TFLITE_MODEL_DIR = os.getenv('TFLITE_MODEL_DIR', 'tflite_int8')  # or tflite_float16
+    TFLITE_NUM_THREADS = int(os.getenv('TFLITE_NUM_THREADS', 0)) or None
+    MODEL_VERSION = os.getenv('MODEL_VERSION')  # Defaults to the registry version or a hash of the model artifact
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 0))  # seconds, 0 = only reload via /admin/reload
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')  # Required in X-Admin-Token; admin endpoints are disabled without it
+    COMPILED_INFERENCE = os.getenv('COMPILED_INFERENCE', 'true').lower() == 'true'
+    INFERENCE_BUCKETS = [int(b) for b in os.getenv('INFERENCE_BUCKETS', '1,4,16,32').split(',') if b.strip()]
     
     # Validate model paths
     @property
@@ -42,6 +55,125 @@ class Config:
             raise FileNotFoundError(f"Model not found at: {path}")
         return str(path)
     
+    # Article fetching (shared pooled session; separate connect/read timeouts in seconds)
+    FETCH_CONNECT_TIMEOUT = float(os.getenv('FETCH_CONNECT_TIMEOUT', 3.05))
+    FETCH_READ_TIMEOUT = float(os.getenv('FETCH_READ_TIMEOUT', 10))
+    FETCH_POOL_CONNECTIONS = int(os.getenv('FETCH_POOL_CONNECTIONS', 20))  # hosts kept in the pool
+    FETCH_POOL_MAXSIZE = int(os.getenv('FETCH_POOL_MAXSIZE', 4))  # keep-alive connections per host
+    FETCH_MAX_RETRIES = int(os.getenv('FETCH_MAX_RETRIES', 1))
+    FETCH_MAX_CHARS = int(os.getenv('FETCH_MAX_CHARS', 10000))
+    FETCH_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', 2 * 1024 * 1024))  # stop reading the body here
+    FETCH_EXTRACTOR = os.getenv('FETCH_EXTRACTOR', 'fast')  # 'fast' (streaming) or 'soup' (BeautifulSoup tree)
+    
+    # Fetched-article cache (URL -> extracted text, revalidated with ETag/Last-Modified)
+    ARTICLE_CACHE_ENABLED = os.getenv('ARTICLE_CACHE_ENABLED', 'true').lower() == 'true'
+    ARTICLE_CACHE_SIZE = int(os.getenv('ARTICLE_CACHE_SIZE', 1000))
+    ARTICLE_CACHE_FRESH_TTL = int(os.getenv('ARTICLE_CACHE_FRESH_TTL', 300))  # seconds served without revalidating
+    ARTICLE_CACHE_MAX_AGE = int(os.getenv('ARTICLE_CACHE_MAX_AGE', 7 * 86400))  # seconds kept for revalidation
+    ARTICLE_CACHE_DISK_PATH = os.getenv('ARTICLE_CACHE_DISK_PATH', '')  # empty = memory only
+    ARTICLE_CACHE_DISK_SIZE = int(os.getenv('ARTICLE_CACHE_DISK_SIZE', 20000))
+    
+    # Request/upload size limits (Flask answers 413 past MAX_CONTENT_LENGTH)
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 100 * 1024 * 1024))  # any request body, incl. /predict/batch
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 20 * 1024 * 1024))  # files posted to /predict
+    UPLOAD_SPOOL_THRESHOLD = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', 1024 * 1024))  # larger uploads go to a temp file
+    
+    # PDF/DOCX parsing runs in a pool of worker processes with per-job limits
+    DOCUMENT_PARSER_WORKERS = int(os.getenv('DOCUMENT_PARSER_WORKERS', 2))
+    DOCUMENT_PARSE_CPU_SECONDS = int(os.getenv('DOCUMENT_PARSE_CPU_SECONDS', 10))
+    DOCUMENT_PARSE_TIMEOUT = float(os.getenv('DOCUMENT_PARSE_TIMEOUT', 15))  # wall-clock seconds
+    DOCUMENT_PARSE_MEMORY_MB = int(os.getenv('DOCUMENT_PARSE_MEMORY_MB', 512))  # address space per worker
+    DOCUMENT_PARSER_MAX_JOBS = int(os.getenv('DOCUMENT_PARSER_MAX_JOBS', 100))  # recycle workers after N jobs
+    DOCUMENT_MAX_CHARS = int(os.getenv('DOCUMENT_MAX_CHARS', 10000))  # stop extracting once this much text is read
+    DOCUMENT_MAX_TOKENS = int(os.getenv('DOCUMENT_MAX_TOKENS', 0))  # whitespace-separated words, 0 = no token limit
+    
+    # Background jobs (POST /jobs): SQLite job store, runner threads, batch scoring
+    JOBS_ENABLED = os.getenv('JOBS_ENABLED', 'true').lower() == 'true'
+    JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', 'jobs.db')
+    JOBS_FILES_DIR = os.getenv('JOBS_FILES_DIR', 'job_files')  # uploaded documents waiting to be parsed
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', 32))  # items claimed and scored together
+    JOB_FETCH_CONCURRENCY = int(os.getenv('JOB_FETCH_CONCURRENCY', 8))  # parallel URL fetches / parses
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 300))  # claimed items are retried after this
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    JOB_MAX_ITEMS = int(os.getenv('JOB_MAX_ITEMS', 10000))
+    JOB_MAX_EXTRACTED_BYTES = int(os.getenv('JOB_MAX_EXTRACTED_BYTES', 512 * 1024 * 1024))  # all documents of a job, unzipped
+    
+    # Logging: 'pretty' (emoji lines) or 'json' (one record per line, one summary record per request)
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'pretty').lower()
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_ASYNC = os.getenv('LOG_ASYNC', 'true').lower() == 'true'  # format and write on a listener thread
+    # Share of requests whose per-stage prediction logs are emitted (the request record is always kept)
+    LOG_VERBOSE_SAMPLE_RATE = float(os.getenv('LOG_VERBOSE_SAMPLE_RATE', '1.0' if LOG_FORMAT == 'pretty' else '0.01'))
+    
+    # Production server (python serve.py): forked workers sharing the model the master preloaded
+    SERVE_HOST = os.getenv('SERVE_HOST', '0.0.0.0')
+    SERVE_PORT = int(os.getenv('SERVE_PORT', 5000))
+    SERVE_WORKERS = int(os.getenv('SERVE_WORKERS', 0))  # 0 = one per CPU core
+    SERVE_PRELOAD = os.getenv('SERVE_PRELOAD', 'true').lower() == 'true'  # keras/auto load per worker regardless
+    SERVE_MAX_REQUESTS = int(os.getenv('SERVE_MAX_REQUESTS', 10000))  # recycle a worker after this many, 0 = never
+    SERVE_MAX_REQUESTS_JITTER = int(os.getenv('SERVE_MAX_REQUESTS_JITTER', 1000))  # so workers don't recycle together
+    SERVE_GRACEFUL_TIMEOUT = float(os.getenv('SERVE_GRACEFUL_TIMEOUT', 30))  # seconds for in-flight requests on exit
+    SERVE_STATS_INTERVAL = float(os.getenv('SERVE_STATS_INTERVAL', 300))  # per-worker memory report, 0 = off
+    
     # Performance settings
-    MAX_TEXT_LENGTH = 5000  # characters
-    PREDICTION_TIMEOUT = 30  # seconds
\ No newline at end of file
+    MAX_TEXT_LENGTH = int(os.getenv('MAX_TEXT_LENGTH', 5000))  # characters scored; the rest is dropped before cleaning
+    PREDICTION_TIMEOUT = float(os.getenv('PREDICTION_TIMEOUT', 30))  # seconds per /predict, shared by its stages
+    
+    # Admission control for /predict: bounded concurrency and wait queue, the rest gets 503 + Retry-After
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', 16))  # pipelines running at once per worker
+    ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 32))  # requests waiting for a slot
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 5))  # seconds, also bounded by the deadline
+    
+    # Per-client rate limits (token buckets keyed by X-API-Key or IP): 'text' for text input, 'expensive' for URLs/files
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # memory (per worker), sqlite (per host) or redis
+    RATE_LIMIT_TEXT_PER_MINUTE = float(os.getenv('RATE_LIMIT_TEXT_PER_MINUTE', 120))
+    RATE_LIMIT_TEXT_BURST = int(os.getenv('RATE_LIMIT_TEXT_BURST', 30))
+    RATE_LIMIT_EXPENSIVE_PER_MINUTE = float(os.getenv('RATE_LIMIT_EXPENSIVE_PER_MINUTE', 20))
+    RATE_LIMIT_EXPENSIVE_BURST = int(os.getenv('RATE_LIMIT_EXPENSIVE_BURST', 5))
+    RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', 100000))  # memory backend: least recently seen dropped
+    RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', 'rate_limits.db')
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    # Number of reverse proxies in front of the app that append to X-Forwarded-For (0 = use the socket address)
+    RATE_LIMIT_PROXY_HOPS = int(os.getenv('RATE_LIMIT_PROXY_HOPS', 0))
+    # Issued API keys (comma-separated) that get their own bucket; any other X-API-Key counts against the IP
+    API_KEYS = frozenset(k.strip() for k in os.getenv('API_KEYS', '').split(',') if k.strip())
+    
+    # Thread/batch profile written by `python -m app.autotune`, applied by create_app
+    TUNING_PROFILE = os.getenv('TUNING_PROFILE', 'tuning_profile.json')
+    
+    # /predict/batch: items are scored and stored CHUNK_SIZE at a time
+    BATCH_PREDICT_CHUNK_SIZE = int(os.getenv('BATCH_PREDICT_CHUNK_SIZE', 256))
+    BATCH_PREDICT_MAX_ITEMS = int(os.getenv('BATCH_PREDICT_MAX_ITEMS', 100000))
+    
+    # Micro-batching settings (concurrent /predict calls share one model call)
+    BATCHING_ENABLED = os.getenv('BATCHING_ENABLED', 'true').lower() == 'true'
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', 32))
+    BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', 5))
+    
+    # Model server (python -m app.model_server): INFERENCE_BACKEND=server workers send it token ids
+    MODEL_SERVER_SOCKET = os.getenv('MODEL_SERVER_SOCKET', 'model_server.sock')  # Unix domain socket path
+    MODEL_SERVER_BACKEND = os.getenv('MODEL_SERVER_BACKEND', 'keras')  # the runtime the server process loads
+    MODEL_SERVER_BATCH_SIZE = int(os.getenv('MODEL_SERVER_BATCH_SIZE', 64))  # rows per model call, across workers
+    MODEL_SERVER_MAX_WAIT_MS = float(os.getenv('MODEL_SERVER_MAX_WAIT_MS', 2))
+    MODEL_SERVER_TIMEOUT = float(os.getenv('MODEL_SERVER_TIMEOUT', 30))  # seconds a worker waits for a reply
+    
+    # Prediction cache (keyed by cleaned text + model version)
+    PREDICTION_CACHE_ENABLED = os.getenv('PREDICTION_CACHE_ENABLED', 'true').lower() == 'true'
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 10000))
+    PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', 0)) or None  # seconds, 0 = no expiry
+    PREDICTION_CACHE_DISK_PATH = os.getenv('PREDICTION_CACHE_DISK_PATH', '')  # empty = memory only
+    PREDICTION_CACHE_DISK_SIZE = int(os.getenv('PREDICTION_CACHE_DISK_SIZE', 100000))
+    
+    # Two-stage cascade: TF-IDF + LogisticRegression answers confident inputs, the LSTM the rest
+    CASCADE_ENABLED = os.getenv('CASCADE_ENABLED', 'false').lower() == 'true'
+    LINEAR_MODEL_FILE = os.getenv('LINEAR_MODEL_FILE', 'linear_model.npz')
+    CASCADE_LOW = float(os.getenv('CASCADE_LOW', 0.1))  # linear P(true) in [LOW, HIGH] goes to the LSTM
+    CASCADE_HIGH = float(os.getenv('CASCADE_HIGH', 0.9))
+    
+    # Long-document mode: score overlapping 150-token windows instead of only the last 150 tokens
+    LONG_DOCUMENT_MODE = os.getenv('LONG_DOCUMENT_MODE', 'false').lower() == 'true'
+    WINDOW_STRIDE = int(os.getenv('WINDOW_STRIDE', 100))  # tokens between window starts
+    MAX_WINDOWS = int(os.getenv('MAX_WINDOWS', 16))
+    WINDOW_AGGREGATOR = os.getenv('WINDOW_AGGREGATOR', 'mean')  # mean, most_fake or length_weighted
\ No newline at end of file
@@ -1,7 +1,8 @@
 # Updated run.py with enhanced logging
 from app import create_app
-from app.ai_service import ai_service
+from app.logging_config import configure_logging
 from app.models import verify_database
+from config import Config
 import logging
 import sys
 import os
@@ -9,25 +10,20 @@ from time import sleep
 from datetime import datetime
 
 def setup_logging():
-    """Configure beautiful logging with colors and emojis"""
-    logging.addLevelName(logging.INFO, "ℹ️ INFO")
-    logging.addLevelName(logging.WARNING, "⚠️ WARN")
-    logging.addLevelName(logging.ERROR, "❌ ERROR")
-    logging.addLevelName(logging.DEBUG, "🐛 DEBUG")
+    """Configure beautiful logging with colors and emojis (JSON lines when LOG_FORMAT=json)"""
+    if Config.LOG_FORMAT == 'pretty':
+        logging.addLevelName(logging.INFO, "ℹ️ INFO")
+        logging.addLevelName(logging.WARNING, "⚠️ WARN")
+        logging.addLevelName(logging.ERROR, "❌ ERROR")
+        logging.addLevelName(logging.DEBUG, "🐛 DEBUG")
     
-    formatter = logging.Formatter(
-        '\n%(asctime)s - %(levelname)s - %(message)s',
+    # The one root handler; create_app reuses it instead of adding a second
+    configure_logging(
+        fmt='\n%(asctime)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
-    handler = logging.StreamHandler()
-    handler.setFormatter(formatter)
-    
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
-    
-    return logger
+    return logging.getLogger()
 
 def print_banner():
     """Print beautiful startup banner"""
@@ -68,10 +64,18 @@ def verify_system():
     try:
         logging.info("\n🧠 Checking AI model files...")
         from config import Config
-        model_path = os.path.join(Config.MODEL_PATH, Config.MODEL_FILE)
-        tokenizer_path = os.path.join(Config.MODEL_PATH, Config.TOKENIZER_FILE)
+        from app.model_registry import ModelRegistry
+        # Versioned layout keeps the artifacts in versions/<CURRENT>/, the legacy one in MODEL_PATH itself
+        version, model_dir = ModelRegistry(Config.MODEL_PATH).resolve()
+        if version:
+            logging.info(f"📦 Active model version: {version}")
+        model_path = os.path.join(model_dir, Config.MODEL_FILE)
+        tokenizer_path = os.path.join(model_dir, Config.TOKENIZER_FILE)
+        if not os.path.exists(tokenizer_path):
+            tokenizer_path = os.path.join(model_dir, Config.COMPACT_TOKENIZER_FILE)
         
-        if not os.path.exists(model_path):
+        # Other backends check their own artifacts when AIService loads them
+        if Config.INFERENCE_BACKEND == 'keras' and not os.path.exists(model_path):
             logging.error(f"❌ Model file not found at: {model_path}")
             return False
         if not os.path.exists(tokenizer_path):
@@ -104,9 +108,9 @@ if __name__ == '__main__':
         logging.info("\n💾 Database initialization:")
         verify_database(app)
         
-        # Initialize AI service
+        # Initialize AI service (loaded by create_app once the tuning profile is applied)
         logging.info("\n🧠 Initializing AI model:")
-        if not ai_service.is_ready():
+        if not app.ai_service.is_ready():
             logging.error("❌ AI service failed to initialize")
             sys.exit(1)
         logging.info("✅ AI model ready")
@@ -0,0 +1,59 @@
+# Production entry point: model loaded once, requests served by forked workers
+from app import create_app
+from app.models import verify_database
+from app.prefork import PreforkServer
+from config import Config
+from run import print_banner, setup_logging, verify_system
+import argparse
+import logging
+import os
+import sys
+
+
+class ServeConfig(Config):
+    # The job runner starts in worker 0 after the fork, not in the master
+    JOBS_ENABLED = False
+
+
+def build_app():
+    """Create the app and verify the database; runs in the master (or each worker with --no-preload)"""
+    app = create_app(ServeConfig)
+    verify_database(app)
+    if not app.ai_service.is_ready():
+        raise RuntimeError("AI service failed to initialize")
+    return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serve the Fake News Detection API with pre-forked workers')
+    parser.add_argument('--host', default=Config.SERVE_HOST)
+    parser.add_argument('--port', type=int, default=Config.SERVE_PORT)
+    parser.add_argument('--workers', type=int, default=Config.SERVE_WORKERS, help='0 = one per CPU core')
+    parser.add_argument('--max-requests', type=int, default=Config.SERVE_MAX_REQUESTS,
+                        help='recycle a worker after this many requests, 0 = never')
+    parser.add_argument('--no-preload', action='store_true', help='load the model in every worker instead')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    logger = setup_logging()
+    print_banner()
+
+    if not hasattr(os, 'fork'):
+        logging.error("❌ serve.py needs fork(); use run.py on this platform")
+        sys.exit(1)
+    if not verify_system():
+        sys.exit(1)
+
+    server = PreforkServer.from_config(build_app)
+    server.host, server.port = args.host, args.port
+    server.workers = args.workers or os.cpu_count() or 1
+    server.max_requests = args.max_requests
+    server.preload = server.preload and not args.no_preload
+
+    try:
+        server.run()
+    except Exception as e:
+        logging.error(f"\n❌❌❌ Server startup failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Config refuses to import without a SECRET_KEY; module-level stores must not write into the checkout
+_scratch = tempfile.mkdtemp(prefix='fnd-tests-')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('JOBS_DB_PATH', os.path.join(_scratch, 'jobs.db'))
+os.environ.setdefault('JOBS_FILES_DIR', os.path.join(_scratch, 'job_files'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
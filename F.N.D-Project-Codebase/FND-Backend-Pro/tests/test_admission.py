@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from app.admission import (AdmissionController, Deadline, DeadlineExceeded, OverloadedError, stage_budget,
+                           start_deadline)
+
+
+def test_admits_up_to_max_in_flight_without_waiting():
+    controller = AdmissionController(max_in_flight=2, max_queue=0, queue_timeout=1)
+    assert controller.acquire() == 0.0
+    assert controller.acquire() == 0.0
+    assert controller.get_stats()['in_flight'] == 2
+
+
+def test_sheds_when_the_queue_is_full():
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+    controller.acquire()
+    with pytest.raises(OverloadedError) as raised:
+        controller.acquire()
+    assert raised.value.status_code == 503
+    assert raised.value.retry_after >= 1
+    assert controller.get_stats()['shed_queue_full'] == 1
+
+
+def test_sheds_after_the_queue_timeout():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.05)
+    controller.acquire()
+    start = time.monotonic()
+    with pytest.raises(OverloadedError):
+        controller.acquire()
+    assert time.monotonic() - start < 1
+    stats = controller.get_stats()
+    assert stats['shed_queue_timeout'] == 1 and stats['queue_depth'] == 0
+
+
+def test_release_hands_the_slot_to_waiters_in_order():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=5)
+    controller.acquire()
+    order = []
+
+    def wait(name):
+        controller.acquire()
+        order.append(name)
+        controller.release(0.01)
+
+    waiters = []
+    for name in ('first', 'second', 'third'):
+        thread = threading.Thread(target=wait, args=(name,))
+        thread.start()
+        waiters.append(thread)
+        while controller.get_stats()['queue_depth'] < len(waiters):
+            time.sleep(0.001)
+
+    controller.release(0.01)
+    for thread in waiters:
+        thread.join(5)
+    assert order == ['first', 'second', 'third']
+    assert controller.get_stats()['in_flight'] == 0
+
+
+def test_retry_after_grows_with_the_queue():
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+    controller.acquire()
+    controller.release(3.0)  # Recent requests took 3s each
+    controller.acquire()
+    with pytest.raises(OverloadedError) as raised:
+        controller.acquire()
+    assert raised.value.retry_after == 3
+
+
+def test_admit_releases_on_errors():
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+    with pytest.raises(ValueError):
+        with controller.admit():
+            raise ValueError('view failed')
+    assert controller.get_stats()['in_flight'] == 0
+
+
+def test_deadline_budget_is_capped_by_the_stage_timeout():
+    deadline = Deadline(10)
+    assert deadline.budget('fetch', cap=2) == 2
+    assert 9 < deadline.budget('inference') <= 10
+
+
+def test_expired_deadline_raises_504():
+    deadline = Deadline(0.001)
+    time.sleep(0.01)
+    with pytest.raises(DeadlineExceeded, match='before parse') as raised:
+        deadline.budget('parse')
+    assert raised.value.status_code == 504
+
+
+def test_stage_budget_without_a_deadline_is_the_cap():
+    start_deadline(None)
+    assert stage_budget('fetch', cap=3) == 3
+    start_deadline(5)
+    try:
+        assert stage_budget('fetch', cap=30) <= 5
+    finally:
+        start_deadline(None)
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.batching import MicroBatcher
+
+
+def row(value):
+    return np.full(4, value, dtype=np.int32)
+
+
+def first_column(batch):
+    return batch[:, 0] / 100.0
+
+
+def test_concurrent_requests_share_a_batch():
+    sizes = []
+
+    def infer(batch):
+        sizes.append(len(batch))
+        return first_column(batch)
+
+    batcher = MicroBatcher(infer, max_batch_size=8, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(row(i)) for i in range(8)]
+        assert [f.result(5) for f in futures] == [i / 100.0 for i in range(8)]
+        assert sizes == [8]
+    finally:
+        batcher.stop(5)
+
+
+def test_batches_are_capped_at_max_batch_size():
+    sizes = []
+    gate = threading.Event()
+
+    def infer(batch):
+        gate.wait(5)
+        sizes.append(len(batch))
+        return first_column(batch)
+
+    batcher = MicroBatcher(infer, max_batch_size=4, max_wait_ms=20)
+    try:
+        futures = [batcher.submit(row(i)) for i in range(10)]
+        gate.set()
+        [f.result(5) for f in futures]
+        assert max(sizes) <= 4 and sum(sizes) == 10
+    finally:
+        batcher.stop(5)
+
+
+def test_inference_errors_reach_every_caller_in_the_batch():
+    def infer(batch):
+        raise ValueError('model exploded')
+
+    batcher = MicroBatcher(infer, max_batch_size=4, max_wait_ms=20)
+    try:
+        futures = [batcher.submit(row(i)) for i in range(3)]
+        for future in futures:
+            with pytest.raises(ValueError, match='model exploded'):
+                future.result(5)
+    finally:
+        batcher.stop(5)
+
+
+def test_stop_drains_queued_requests():
+    started = threading.Event()
+    release = threading.Event()
+
+    def infer(batch):
+        started.set()
+        release.wait(5)
+        return first_column(batch)
+
+    batcher = MicroBatcher(infer, max_batch_size=1, max_wait_ms=0)
+    first = batcher.submit(row(1))
+    started.wait(5)
+    queued = [batcher.submit(row(i)) for i in range(2, 5)]  # Waiting behind the running batch
+    stopper = threading.Thread(target=batcher.stop, args=(5,))
+    stopper.start()
+    release.set()
+    stopper.join(5)
+    assert first.result(1) == 0.01
+    assert [f.result(1) for f in queued] == [0.02, 0.03, 0.04]
+
+
+def test_submit_after_stop_fails_at_once():
+    batcher = MicroBatcher(first_column, max_batch_size=4, max_wait_ms=1)
+    batcher.stop(5)
+    with pytest.raises(RuntimeError, match='shutting down'):
+        batcher.submit(row(1))
+
+
+def test_no_request_hangs_when_stop_races_with_submits():
+    batcher = MicroBatcher(first_column, max_batch_size=8, max_wait_ms=1)
+    futures, refused = [], []
+    lock = threading.Lock()
+
+    def client():
+        for i in range(200):
+            try:
+                future = batcher.submit(row(i))
+            except RuntimeError:
+                with lock:
+                    refused.append(i)
+                return
+            with lock:
+                futures.append(future)
+
+    clients = [threading.Thread(target=client) for _ in range(8)]
+    for thread in clients:
+        thread.start()
+    time.sleep(0.01)
+    batcher.stop(5)
+    for thread in clients:
+        thread.join(5)
+
+    # Every accepted request is answered, either with a result or the shutdown error
+    for future in futures:
+        try:
+            future.result(2)
+        except RuntimeError:
+            pass
+    assert all(future.done() for future in futures)
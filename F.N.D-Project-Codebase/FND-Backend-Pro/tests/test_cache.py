@@ -0,0 +1,93 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.cache import ArticleCache, LRUCache, PredictionCache, SQLiteCache
+
+
+@pytest.fixture
+def disk_path(tmp_path):
+    return str(tmp_path / 'cache.db')
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_lru_expires_entries_after_ttl():
+    cache = LRUCache(max_entries=10, ttl=60)
+    cache.set('old', 1, stored_at=time.time() - 61)
+    assert cache.get('old') is None
+
+
+def test_sqlite_evicts_beyond_max_entries(disk_path, monkeypatch):
+    monkeypatch.setattr(SQLiteCache, 'EVICTION_INTERVAL', 1)
+    cache = SQLiteCache(disk_path, max_entries=3)
+    for i in range(5):
+        cache.set(f'k{i}', i)
+    assert len(cache) == 3
+    assert cache.get('k0') is None and cache.get('k4') == (4, pytest.approx(time.time(), abs=5))
+
+
+def test_prediction_disk_tier_survives_a_restart(disk_path):
+    key = PredictionCache.make_key('some cleaned text', 'v1')
+    PredictionCache(disk_path=disk_path).set(key, {'prediction': 'FAKE'})
+
+    restarted = PredictionCache(disk_path=disk_path)
+    assert restarted.get(key) == {'prediction': 'FAKE'}
+    assert restarted.memory.get(key) == {'prediction': 'FAKE'}  # Promoted to the memory tier
+    assert restarted.get_stats()['hits'] == 1
+
+
+def test_prediction_keys_depend_on_model_version():
+    assert PredictionCache.make_key('text', 'v1') != PredictionCache.make_key('text', 'v2')
+
+
+def test_prediction_disk_read_error_is_a_miss(disk_path):
+    cache = PredictionCache(disk_path=disk_path)
+    cache.disk._conn.execute('DROP TABLE predictions')
+    assert cache.get('missing') is None
+    assert cache.misses == 1
+
+
+def test_prediction_disk_write_error_keeps_the_memory_tier(disk_path):
+    cache = PredictionCache(disk_path=disk_path)
+    cache.disk._conn.execute('DROP TABLE predictions')
+    cache.set('key', {'prediction': 'TRUE'})
+    assert cache.get('key') == {'prediction': 'TRUE'}
+
+
+def article(validated_at, **extra):
+    return {'text': 'body', 'title': 'title', 'etag': '"v1"', 'validated_at': validated_at, **extra}
+
+
+def test_article_freshness_and_disk_tier(disk_path):
+    cache = ArticleCache(fresh_ttl=300, disk_path=disk_path)
+    cache.set('https://example.com/a#comments', article(time.time()))
+
+    restarted = ArticleCache(fresh_ttl=300, disk_path=disk_path)
+    entry = restarted.get('https://example.com/a')  # Fragments do not change the key
+    assert entry['etag'] == '"v1"' and restarted.is_fresh(entry)
+
+    stale = article(time.time() - 600)
+    assert not restarted.is_fresh(stale)
+
+
+def test_article_disk_read_error_is_a_miss(disk_path):
+    cache = ArticleCache(disk_path=disk_path)
+    cache.disk._conn.execute('DROP TABLE articles')
+    assert cache.get('https://example.com/a') is None
+
+
+def test_sqlite_errors_are_not_swallowed_by_the_store_itself(disk_path):
+    cache = SQLiteCache(disk_path, table='predictions')
+    cache._conn.execute('DROP TABLE predictions')
+    with pytest.raises(sqlite3.Error):
+        cache.get('key')
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from app.cascade import LinearTextClassifier, export_linear_model, uncertain_mask, verify_against_sklearn
+
+feature_extraction = pytest.importorskip('sklearn.feature_extraction.text')
+linear_model = pytest.importorskip('sklearn.linear_model')
+
+TRAIN = [
+    ("Government confirms new budget figures in official report", 1),
+    ("Senate committee publishes audit of public spending", 1),
+    ("Researchers publish peer reviewed study on vaccine safety", 1),
+    ("City council approves road repairs after public hearing", 1),
+    ("SHOCKING secret cure doctors don't want you to know", 0),
+    ("Celebrity reveals miracle diet, experts stunned!!!", 0),
+    ("You won't believe what this secret government file hides", 0),
+    ("Miracle pill melts fat overnight, click now", 0),
+]
+SAMPLES = [
+    "Official report confirms the budget",
+    "secret miracle cure revealed",
+    "nothing in the vocabulary here zzz",
+    "",
+    "Budget budget budget audit AUDIT",
+]
+
+
+def fit(**options):
+    tfidf = feature_extraction.TfidfVectorizer(**options)
+    texts, labels = zip(*TRAIN)
+    lr_model = linear_model.LogisticRegression().fit(tfidf.fit_transform(texts), labels)
+    return tfidf, lr_model
+
+
+@pytest.mark.parametrize('options', [{}, {'sublinear_tf': True}, {'lowercase': False}, {'norm': None},
+                                     {'use_idf': False}, {'stop_words': 'english', 'max_features': 20}])
+def test_matches_sklearn(options, tmp_path):
+    tfidf, lr_model = fit(**options)
+    classifier = LinearTextClassifier.load(export_linear_model(tfidf, lr_model, str(tmp_path / 'linear_model.npz')))
+    expected = lr_model.predict_proba(tfidf.transform(SAMPLES))[:, 1]
+    np.testing.assert_allclose(classifier.predict_proba(SAMPLES), expected, atol=1e-9)
+    assert verify_against_sklearn(tfidf, lr_model, classifier, SAMPLES) < 1e-6
+
+
+def test_rejects_features_it_cannot_reproduce(tmp_path):
+    tfidf, lr_model = fit(ngram_range=(1, 2))
+    with pytest.raises(ValueError):
+        export_linear_model(tfidf, lr_model, str(tmp_path / 'linear_model.npz'))
+
+
+def test_uncertain_mask_keeps_the_band_inclusive():
+    mask = uncertain_mask([0.05, 0.2, 0.5, 0.8, 0.95], 0.2, 0.8)
+    assert mask.tolist() == [False, True, True, True, False]
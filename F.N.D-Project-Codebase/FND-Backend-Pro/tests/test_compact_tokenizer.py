@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.compact_tokenizer import CompactTokenizer, export_compact_tokenizer
+
+text = pytest.importorskip('tensorflow.keras.preprocessing.text')
+sequence = pytest.importorskip('tensorflow.keras.preprocessing.sequence')
+
+CORPUS = [
+    "Breaking: Senate passes the budget bill after a late-night vote!",
+    "Scientists confirm the moon is NOT made of cheese, despite viral posts.",
+    "The budget vote was delayed; senators blamed a procedural error.",
+    "Viral post claims cheese cures colds -- doctors disagree.",
+    "Local team wins the championship in overtime, fans celebrate downtown.",
+]
+
+SAMPLES = CORPUS + [
+    "",
+    "!!! ??? ...",
+    "UNSEEN words only here",
+    "the the the budget budget",
+    "tabs\tand\nnewlines, plus unicode: café naïve",
+    " ".join(["budget vote senate"] * 40),  # Longer than maxlen, so truncation matters
+]
+
+
+def fitted(**options):
+    tokenizer = text.Tokenizer(**options)
+    tokenizer.fit_on_texts(CORPUS)
+    return tokenizer
+
+
+@pytest.mark.parametrize('options', [{}, {'num_words': 12}, {'num_words': 12, 'oov_token': '<OOV>'},
+                                     {'lower': False}])
+def test_matches_keras(options):
+    tokenizer = fitted(**options)
+    compact = CompactTokenizer.from_keras(tokenizer)
+    assert compact.texts_to_sequences(SAMPLES) == tokenizer.texts_to_sequences(SAMPLES)
+    expected = sequence.pad_sequences(tokenizer.texts_to_sequences(SAMPLES), maxlen=20)
+    np.testing.assert_array_equal(compact.encode_batch(SAMPLES, 20), expected)
+
+
+def test_prunes_words_that_can_never_be_emitted():
+    tokenizer = fitted(num_words=12)
+    compact = CompactTokenizer.from_keras(tokenizer)
+    assert len(compact.words) == 11
+    assert len(tokenizer.word_index) > 11
+
+
+def test_save_and_load_round_trip(tmp_path):
+    tokenizer = fitted(num_words=12, oov_token='<OOV>')
+    path = str(tmp_path / 'tokenizer.json')
+    reloaded = export_compact_tokenizer(tokenizer, path, sample_texts=SAMPLES, maxlen=20)
+    assert reloaded.oov_index == tokenizer.word_index['<OOV>']
+    np.testing.assert_array_equal(CompactTokenizer.load(path).encode_batch(SAMPLES, 20),
+                                  reloaded.encode_batch(SAMPLES, 20))
@@ -0,0 +1,197 @@
+import errno
+import io
+import os
+import zipfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.jobs import JobError, JobStore, store_uploaded_files
+from config import Config
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def patch_headers(data, offset_local, offset_central, value):
+    """Overwrite a 2-byte field in every local and central directory header"""
+    data = bytearray(data)
+    for signature, offset in ((b'PK\x03\x04', offset_local), (b'PK\x01\x02', offset_central)):
+        start = data.find(signature)
+        while start != -1:
+            data[start + offset:start + offset + 2] = value.to_bytes(2, 'little')
+            start = data.find(signature, start + 4)
+    return bytes(data)
+
+
+def upload(name, data):
+    return FileStorage(stream=io.BytesIO(data), filename=name)
+
+
+@pytest.fixture
+def files_dir(tmp_path):
+    return str(tmp_path / 'job_files')
+
+
+def leftovers(files_dir):
+    return os.listdir(files_dir) if os.path.isdir(files_dir) else []
+
+
+def test_zip_members_are_saved_under_generated_names(files_dir):
+    items = store_uploaded_files([upload('docs.zip', make_zip({'../evil.txt': 'a', 'b/c.txt': 'b', 'x.png': 'c'}))],
+                                 files_dir)
+    assert [ref for _, _, ref in items] == ['../evil.txt', 'b/c.txt']
+    assert all(os.path.dirname(os.path.dirname(path)) == files_dir for _, path, _ in items)
+
+
+def test_zip_bomb_rejected_from_declared_sizes(files_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_MAX_EXTRACTED_BYTES', 5 * 1024 * 1024)
+    bomb = make_zip({f'{i}.txt': b'0' * (1024 * 1024) for i in range(30)})
+    assert len(bomb) < 100 * 1024
+    with pytest.raises(JobError) as raised:
+        store_uploaded_files([upload('bomb.zip', bomb)], files_dir)
+    assert raised.value.status_code == 413
+    assert leftovers(files_dir) == []
+
+
+def test_running_total_caps_the_whole_job(files_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_MAX_EXTRACTED_BYTES', 2500)
+    with pytest.raises(JobError) as raised:
+        store_uploaded_files([upload(f'{i}.txt', b'x' * 1000) for i in range(3)], files_dir)
+    assert raised.value.status_code == 413
+    assert leftovers(files_dir) == []
+
+
+def test_understated_member_size_does_not_bypass_the_cap(files_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_MAX_EXTRACTED_BYTES', 2500)
+    archive = make_zip({'a.txt': b'x' * 2000, 'b.txt': b'y' * 2000}, zipfile.ZIP_STORED)
+    # Claim 10 bytes per member in the central directory (offset 24 = uncompressed size, low half)
+    archive = patch_headers(archive, 22, 24, 10)
+    with pytest.raises(JobError):
+        store_uploaded_files([upload('liar.zip', archive)], files_dir)
+    assert leftovers(files_dir) == []
+
+
+def test_encrypted_member_is_a_400(files_dir):
+    archive = patch_headers(make_zip({'a.txt': 'secret'}), 6, 8, 0x1)  # general purpose flag: encrypted
+    with pytest.raises(JobError, match='Encrypted') as raised:
+        store_uploaded_files([upload('locked.zip', archive)], files_dir)
+    assert raised.value.status_code == 400
+    assert leftovers(files_dir) == []
+
+
+def test_unsupported_compression_is_a_400(files_dir):
+    archive = patch_headers(make_zip({'a.txt': 'text'}), 8, 10, 99)  # compression method 99 (AES)
+    with pytest.raises(JobError) as raised:
+        store_uploaded_files([upload('aes.zip', archive)], files_dir)
+    assert raised.value.status_code == 400
+    assert leftovers(files_dir) == []
+
+
+def test_corrupt_archive_is_a_400(files_dir):
+    with pytest.raises(JobError) as raised:
+        store_uploaded_files([upload('broken.zip', b'PK\x03\x04 not really a zip')], files_dir)
+    assert raised.value.status_code == 400
+    assert leftovers(files_dir) == []
+
+
+def test_disk_full_is_a_413_and_cleans_up(files_dir):
+    class FullDisk(io.BytesIO):
+        def read(self, size=-1):
+            raise OSError(errno.ENOSPC, 'No space left on device')
+
+    files = [upload('a.txt', b'first'), FileStorage(stream=FullDisk(), filename='b.txt')]
+    with pytest.raises(JobError) as raised:
+        store_uploaded_files(files, files_dir)
+    assert raised.value.status_code == 413
+    assert leftovers(files_dir) == []
+
+
+def test_unexpected_errors_propagate_after_cleanup(files_dir):
+    class Broken(io.BytesIO):
+        def read(self, size=-1):
+            raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        store_uploaded_files([upload('a.txt', b'ok'), FileStorage(stream=Broken(), filename='b.txt')], files_dir)
+    assert leftovers(files_dir) == []
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.db'))
+
+
+def texts(count):
+    return [('text', f'item {i}', None) for i in range(count)]
+
+
+def success(job_id, index):
+    return job_id, index, {'index': index, 'status': 'success', 'prediction': 'TRUE'}
+
+
+def test_claims_are_leased_to_one_owner(store):
+    job_id = store.create_job(texts(3))
+    claimed = store.claim('host:1', limit=2, lease_seconds=60, max_attempts=3)
+    assert [item['index'] for item in claimed] == [0, 1]
+    assert [item['index'] for item in store.claim('host:2', 10, 60, 3)] == [2]
+    assert store.claim('host:3', 10, 60, 3) == []
+    assert store.get_job(job_id)['status'] == 'running'
+
+
+def test_expired_leases_are_claimed_again(store):
+    store.create_job(texts(2))
+    store.claim('host:1', 10, lease_seconds=-1, max_attempts=3)  # Lease already over
+    assert [item['index'] for item in store.claim('host:2', 10, 60, 3)] == [0, 1]
+
+
+def test_job_completes_with_partial_results_along_the_way(store):
+    job_id = store.create_job(texts(3))
+    store.claim('host:1', 10, 60, 3)
+    store.complete([success(job_id, 0), (job_id, 1, {'index': 1, 'status': 'error', 'error': 'bad'})])
+    job = store.get_job(job_id)
+    assert (job['status'], job['succeeded'], job['failed'], job['pending']) == ('running', 1, 1, 1)
+    assert [result['index'] for result in job['results']] == [0, 1]
+
+    store.complete([success(job_id, 2)])
+    job = store.get_job(job_id)
+    assert job['status'] == 'complete' and job['progress'] == 1.0 and job['finished_at']
+
+
+def test_items_of_dead_owners_resume_without_waiting_for_the_lease(store):
+    job_id = store.create_job(texts(2))
+    store.claim('host:dead', 1, 3600, 3)
+    store.claim('host:alive', 1, 3600, 3)
+    assert store.release_orphans(lambda owner: owner != 'host:dead') == 1
+
+    resumed = store.claim('host:new', 10, 60, 3)
+    assert [item['index'] for item in resumed] == [0]
+    assert store.get_job(job_id)['pending'] == 2
+
+
+def test_resume_survives_reopening_the_database(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    job_id = JobStore(path).create_job(texts(2))
+    first = JobStore(path)
+    first.claim('host:gone', 10, 3600, 3)
+
+    restarted = JobStore(path)
+    restarted.release_orphans(lambda owner: False)
+    claimed = restarted.claim('host:new', 10, 60, 3)
+    restarted.complete([success(job_id, item['index']) for item in claimed])
+    assert restarted.get_job(job_id)['status'] == 'complete'
+
+
+def test_items_that_keep_failing_are_given_up(store):
+    job_id = store.create_job(texts(1))
+    for _ in range(2):
+        assert len(store.claim('host:1', 10, lease_seconds=-1, max_attempts=2)) == 1
+    assert store.claim('host:1', 10, 60, max_attempts=2) == []
+    job = store.get_job(job_id)
+    assert job['status'] == 'complete' and job['failed'] == 1
+    assert job['results'][0]['error'] == 'Gave up after 2 attempts'
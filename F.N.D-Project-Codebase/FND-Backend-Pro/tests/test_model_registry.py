@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from app.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    for version in ('v1', 'v2'):
+        os.makedirs(tmp_path / 'versions' / version)
+    return ModelRegistry(str(tmp_path))
+
+
+def test_current_defaults_to_the_newest_version(registry):
+    assert registry.current_version() == 'v2'
+    assert registry.resolve() == ('v2', os.path.join(registry.versions_dir, 'v2'))
+
+
+def test_activate_returns_what_current_named_before(registry):
+    assert registry.activate('v1') is None
+    assert registry.activate('v2') == 'v1'
+    assert registry.current_version() == 'v2'
+
+
+def test_restore_undoes_activate(registry):
+    registry.activate('v1')
+    registry.restore(registry.activate('v2'))
+    assert registry.current_version() == 'v1'
+
+    registry.restore(None)  # CURRENT did not exist before the first activate
+    assert not os.path.exists(registry.current_file)
+
+
+def test_activating_a_missing_version_leaves_current_alone(registry):
+    registry.activate('v1')
+    with pytest.raises(FileNotFoundError):
+        registry.activate('v3')
+    assert registry.current_version() == 'v1'
+
+
+def test_flat_layout_is_unversioned(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.resolve() == (None, str(tmp_path))
@@ -0,0 +1,99 @@
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app import model_server
+from app.model_server import INFO, PREDICT, RESULT, ModelServerClient, _frame, _read_frame
+
+
+class FakeServer:
+    """Answers PREDICT with 0.5 per row and INFO with a counter, or never answers INFO when hung"""
+
+    def __init__(self, path):
+        self.hung = threading.Event()
+        self.info_calls = 0
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                kind, request_id, rows, _ = _read_frame(conn)
+                if kind == INFO:
+                    if self.hung.is_set():
+                        continue
+                    self.info_calls += 1
+                    conn.sendall(_frame(INFO, request_id, 0, json.dumps({'calls': self.info_calls}).encode()))
+                elif kind == PREDICT:
+                    conn.sendall(_frame(RESULT, request_id, rows, np.full(rows, 0.5, dtype='<f4').tobytes()))
+        except (ConnectionError, OSError):
+            conn.close()
+
+
+@pytest.fixture
+def server(tmp_path):
+    fake = FakeServer(str(tmp_path / 'model.sock'))
+    yield fake, str(tmp_path / 'model.sock')
+    fake.listener.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_predict_round_trip(server):
+    _, path = server
+    client = ModelServerClient(path, timeout=5).connect()
+    assert client.predict_batch(np.zeros((3, 150), dtype=np.int32)).tolist() == [0.5, 0.5, 0.5]
+
+
+def test_stats_are_cached_between_refreshes(server, monkeypatch):
+    fake, path = server
+    client = ModelServerClient(path, timeout=5).connect()
+    stats = client.get_stats()
+    assert stats['server_state'] == 'reachable' and stats['server'] == {'calls': 1}
+    for _ in range(5):
+        client.get_stats()
+    assert fake.info_calls == 1
+
+    monkeypatch.setattr(model_server, 'INFO_MAX_AGE_SECONDS', 0)
+    client.get_stats()
+    wait_for(lambda: client.get_stats()['server'] == {'calls': 2})
+
+
+def test_hung_server_does_not_stall_stats(server, monkeypatch):
+    fake, path = server
+    monkeypatch.setattr(model_server, 'INFO_MAX_AGE_SECONDS', 0)
+    monkeypatch.setattr(model_server, 'INFO_TIMEOUT_SECONDS', 0.1)
+    client = ModelServerClient(path, timeout=30).connect()
+    fake.hung.set()
+
+    start = time.monotonic()
+    stats = client.get_stats()
+    assert time.monotonic() - start < 0.05
+    assert stats['server'] == {'calls': 1}  # The last known description
+    wait_for(lambda: client.get_stats()['server_state'] == 'unreachable')
+
+
+def test_missing_server_is_unreachable(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_server, 'INFO_MAX_AGE_SECONDS', 0)
+    client = ModelServerClient(str(tmp_path / 'nobody.sock'), connect_timeout=0.1)
+    assert client.get_stats()['server_state'] == 'unknown'
+    wait_for(lambda: client.get_stats()['server_state'] == 'unreachable')
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from app.numpy_inference import NumpyLSTMClassifier, export_and_verify, export_weights, load_weights
+
+tf = pytest.importorskip('tensorflow')
+
+VOCAB = 60
+MAXLEN = 20
+
+
+@pytest.fixture(scope='module')
+def model():
+    """A small untrained model with the production layer layout (Dropout included)"""
+    tf.keras.utils.set_random_seed(7)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(MAXLEN,), dtype='int32'),
+        tf.keras.layers.Embedding(VOCAB, 8),
+        tf.keras.layers.LSTM(12, return_sequences=True),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.LSTM(6),
+        tf.keras.layers.Dense(1, activation='sigmoid')
+    ])
+    # Untrained gates sit near 0.5; larger weights exercise the saturated ends of sigmoid/tanh
+    model.set_weights([w * 4 for w in model.get_weights()])
+    return model
+
+
+def sample(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    padded = rng.integers(1, VOCAB, size=(rows, MAXLEN), dtype=np.int32)
+    padded[::3, :MAXLEN // 2] = 0  # Pre-padded rows, like short headlines
+    return padded
+
+
+def test_matches_keras(model, tmp_path):
+    engine = NumpyLSTMClassifier.load(export_weights(model, str(tmp_path / 'weights.npz')))
+    padded = sample(33)
+    expected = model.predict(padded, verbose=0)[:, 0]
+    np.testing.assert_allclose(engine.predict_batch(padded), expected, atol=1e-5)
+
+
+def test_single_row_matches_batch(model, tmp_path):
+    engine = NumpyLSTMClassifier.load(export_weights(model, str(tmp_path / 'weights.npz')))
+    padded = sample(5)
+    batch = engine.predict_batch(padded)
+    rows = np.concatenate([engine.predict_batch(padded[i:i + 1]) for i in range(len(padded))])
+    np.testing.assert_allclose(rows, batch, atol=1e-6)
+
+
+def test_weights_are_memory_mapped(model, tmp_path):
+    weights = load_weights(export_weights(model, str(tmp_path / 'weights.npz')))
+    assert all(isinstance(array, np.memmap) for array in weights.values())
+    in_memory = load_weights(str(tmp_path / 'weights.npz'), mmap=False)
+    for name, array in weights.items():
+        np.testing.assert_array_equal(array, in_memory[name])
+
+
+def test_export_and_verify_reports_deviation(model, tmp_path):
+    _, max_diff = export_and_verify(model, str(tmp_path / 'weights.npz'), sample_size=16, maxlen=MAXLEN)
+    assert max_diff < 1e-4
+
+
+def test_rejects_out_of_vocabulary_ids(model, tmp_path):
+    engine = NumpyLSTMClassifier.load(export_weights(model, str(tmp_path / 'weights.npz')))
+    with pytest.raises(ValueError):
+        engine.predict_batch(np.full((1, MAXLEN), VOCAB, dtype=np.int32))
+
+
+def test_rejects_other_architectures(tmp_path):
+    model = tf.keras.Sequential([tf.keras.Input(shape=(MAXLEN,)), tf.keras.layers.Dense(1)])
+    with pytest.raises(ValueError, match='Unsupported architecture'):
+        export_weights(model, str(tmp_path / 'weights.npz'))
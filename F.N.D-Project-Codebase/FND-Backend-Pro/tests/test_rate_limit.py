@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+
+from app import rate_limit
+from app.rate_limit import Budget, MemoryBucketStore, RateLimiter, SQLiteBucketStore, rate_limited
+
+PROXY = '10.0.0.2'
+
+
+def _limited(budget, retry_after):
+    return jsonify({'error': 'Rate limit exceeded', 'status': 'error'}), 429
+
+
+def make_limiter(store=None, **kwargs):
+    budgets = [Budget('text', 60, 10), Budget('expensive', 60, 5)]
+    return RateLimiter(store or MemoryBucketStore(), budgets, **kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(**kwargs):
+        limiter = make_limiter(**kwargs)
+        monkeypatch.setattr(rate_limit, 'rate_limiter', limiter)
+        app = Flask(__name__)
+
+        @app.route('/work', methods=['POST', 'OPTIONS'])
+        @rate_limited(lambda: 'expensive', _limited)
+        def work():
+            return jsonify({'status': 'success'})
+
+        return app.test_client()
+    return install
+
+
+def statuses(client, count, headers=lambda i: {}, remote_addr='198.51.100.1'):
+    return [client.post('/work', headers=headers(i), environ_base={'REMOTE_ADDR': remote_addr}).status_code
+            for i in range(count)]
+
+
+def test_burst_then_429_with_headers(client):
+    c = client()
+    assert statuses(c, 5) == [200] * 5
+    response = c.post('/work', environ_base={'REMOTE_ADDR': '198.51.100.1'})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert response.headers['X-RateLimit-Limit'] == '5'
+    assert response.headers['X-RateLimit-Remaining'] == '0'
+
+
+def test_preflight_is_not_charged(client):
+    c = client()
+    for _ in range(10):
+        c.open('/work', method='OPTIONS', environ_base={'REMOTE_ADDR': '198.51.100.1'})
+    assert statuses(c, 5) == [200] * 5
+
+
+def test_rotating_unknown_api_keys_share_the_ip_bucket(client):
+    c = client(api_keys={'issued'})
+    codes = statuses(c, 50, headers=lambda i: {'X-API-Key': f'k{i}'})
+    assert codes.count(200) == 5
+
+
+def test_issued_api_key_gets_its_own_bucket(client):
+    c = client(api_keys={'issued'})
+    assert statuses(c, 5) == [200] * 5
+    assert statuses(c, 5, headers=lambda i: {'X-API-Key': 'issued'}) == [200] * 5
+    assert statuses(c, 1, headers=lambda i: {'X-API-Key': 'issued'}) == [429]
+
+
+def test_spoofed_forwarded_for_is_ignored_without_proxies(client):
+    c = client()
+    codes = statuses(c, 50, headers=lambda i: {'X-Forwarded-For': f'203.0.113.{i}'})
+    assert codes.count(200) == 5
+
+
+def test_spoofed_forwarded_for_behind_proxy_keys_on_trusted_hop(client):
+    c = client(proxy_hops=1)
+    # The client prepends a fresh address each time; our proxy appends the one it actually saw
+    codes = statuses(c, 50, headers=lambda i: {'X-Forwarded-For': f'203.0.113.{i}, 192.0.2.7'}, remote_addr=PROXY)
+    assert codes.count(200) == 5
+    # A different real client behind the same proxy has its own budget
+    assert statuses(c, 1, headers=lambda i: {'X-Forwarded-For': '192.0.2.8'}, remote_addr=PROXY) == [200]
+
+
+def test_bucket_refills_at_rate():
+    store, budget = MemoryBucketStore(), Budget('t', 60, 2)
+    assert [store.take('k', budget, 1, 100.0)[0] for _ in range(3)] == [True, True, False]
+    assert store.take('k', budget, 1, 101.0)[0] is True
+    assert store.take('k', budget, 1, 101.0)[0] is False
+
+
+def test_memory_store_forgets_least_recently_seen():
+    store, budget = MemoryBucketStore(max_keys=2), Budget('t', 60, 2)
+    for key in 'abc':
+        store.take(key, budget, 1, 0.0)
+    assert list(store._buckets) == ['b', 'c']
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / 'limits.db')
+    first, second, budget = SQLiteBucketStore(path), SQLiteBucketStore(path), Budget('t', 60, 3)
+    taken = [store.take('k', budget, 1, 50.0)[0] for store in (first, second, first, second)]
+    assert taken == [True, True, True, False]
+
+
+def test_store_failure_lets_requests_through():
+    class BrokenStore(MemoryBucketStore):
+        def take(self, *args):
+            raise sqlite3.OperationalError('database is locked')
+
+    limiter = make_limiter(BrokenStore())
+    allowed, budget, tokens, retry_after = limiter.check('ip:1', 'text')
+    assert allowed and tokens is None
+    assert limiter.get_stats()['store_errors'] == 1
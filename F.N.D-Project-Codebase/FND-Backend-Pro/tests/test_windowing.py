@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from app.windowing import aggregate, build_windows
+
+
+def test_short_document_is_one_pre_padded_window():
+    windows, spans = build_windows(list(range(1, 11)), window=150)
+    assert windows.shape == (1, 150)
+    assert windows[0, -10:].tolist() == list(range(1, 11)) and not windows[0, :-10].any()
+    assert spans == [(0, 10)]
+
+
+def test_last_window_is_aligned_to_the_end():
+    _, spans = build_windows(list(range(1, 351)), window=150, stride=100)
+    assert spans == [(0, 150), (100, 250), (200, 350)]
+    _, spans = build_windows(list(range(1, 331)), window=150, stride=100)
+    assert spans[-1] == (180, 330)
+
+
+def test_window_count_is_capped_evenly():
+    _, spans = build_windows(list(range(1, 5001)), window=150, stride=100, max_windows=4)
+    assert len(spans) == 4
+    assert spans[0][0] == 0 and spans[-1][1] == 5000
+
+
+@pytest.mark.parametrize('method, expected', [('mean', 0.5), ('most_fake', 0.2)])
+def test_aggregators(method, expected):
+    assert aggregate([0.2, 0.5, 0.8], [(0, 150), (100, 250), (200, 350)], method) == pytest.approx(expected)
+
+
+def test_length_weighted_does_not_count_overlap_twice():
+    # The second window only adds 50 new tokens
+    score = aggregate([1.0, 0.0], [(0, 150), (100, 200)], 'length_weighted')
+    assert score == pytest.approx(150 / 200)
+
+
+def test_unknown_aggregator_is_rejected():
+    with pytest.raises(ValueError, match='most_fake'):
+        aggregate(np.array([0.5]), [(0, 10)], 'max')